@@ -1,5 +1,16 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
+
+
+def _install_search(sender, using, **kwargs):
+    # SQLite table rebuilds in later migrations drop the FTS triggers; put them back
+    from .search import install
+    install(using)
+
 
 class BlogConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'blog'
+
+    def ready(self):
+        post_migrate.connect(_install_search, sender=self, dispatch_uid='blog_search_install')
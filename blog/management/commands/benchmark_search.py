@@ -0,0 +1,86 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils.text import slugify
+
+from blog.models import Post
+from blog.search import POST_INDEX
+from portfolio.fulltext import IcontainsBackend
+
+WORDS = (
+    'django python cache query index latency throughput profile render template search '
+    'backend database sqlite postgres vector rank token stream worker queue image pdf '
+    'deploy docker server client browser network request response session cookie static '
+    'media thumbnail gallery project portfolio resume design layout mobile accessible '
+    'testing fixture migration schema model signal middleware settings logging metrics'
+).split()
+
+# Filler vocabulary so term frequencies follow a Zipf-like curve, as in real prose
+SYLLABLES = ('ka', 'lo', 'mi', 'ne', 'ru', 'si', 'ta', 'vo', 'ze', 'pa')
+FILLER = [a + b + c for a in SYLLABLES for b in SYLLABLES for c in SYLLABLES]
+
+CATEGORIES = ('Engineering', 'Tutorial', 'Computer science', 'Notes', 'Career')
+
+# Common, mid-frequency and rare terms, a two-word query and a miss
+QUERIES = ('django', 'search', 'thumbnail', 'metrics', 'postgres index', 'nonexistentterm')
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the full-text search backend with the legacy icontains scan on a synthetic "
+        "corpus. Posts are inserted inside a transaction that is rolled back afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=50000, help='Synthetic posts to generate')
+        parser.add_argument('--words', type=int, default=200, help='Words per post body')
+        parser.add_argument('--repeat', type=int, default=5, help='Runs per query (median is reported)')
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **opts):
+        rng = random.Random(opts['seed'])
+        vocabulary = list(FILLER)
+        # Spread the searchable words from common (rank ~10) to rare (rank ~1000)
+        for i, word in enumerate(WORDS):
+            vocabulary.insert(10 + i * 20, word)
+        weights = [1 / (rank + 1) for rank in range(len(vocabulary))]
+        with transaction.atomic():
+            self._generate(rng, opts['posts'], opts['words'], vocabulary, weights)
+            backends = [IcontainsBackend(POST_INDEX), POST_INDEX.backend()]
+            self.stdout.write(f"{opts['posts']} posts; median of {opts['repeat']} runs (count + first page)")
+            self.stdout.write(f"{'query':<20}" + ''.join(f'{b.name:>22}' for b in backends))
+            for q in QUERIES:
+                cells = []
+                for backend in backends:
+                    timings = []
+                    for _ in range(opts['repeat']):
+                        start = time.perf_counter()
+                        qs = backend.search(Post.objects.filter(published=True), q)
+                        n = qs.count()
+                        list(qs[:6])
+                        timings.append((time.perf_counter() - start) * 1000)
+                    cells.append(f'{statistics.median(timings):>10.1f} ms ({n:>6})')
+                self.stdout.write(f'{q:<20}' + ''.join(f'{c:>22}' for c in cells))
+            transaction.set_rollback(True)
+
+    def _generate(self, rng, count, words, vocabulary, weights):
+        batch = []
+        for i in range(count):
+            category = rng.choice(CATEGORIES)
+            batch.append(Post(
+                title=' '.join(rng.choices(vocabulary, weights, k=6)).capitalize(),
+                slug=f'bench-{i}',
+                author=rng.choice(('Denis', 'Guest', 'Editor')),
+                content=' '.join(rng.choices(vocabulary, weights, k=words)),
+                category=category,
+                category_slug=slugify(category),
+                tags=', '.join(rng.sample(WORDS, 3)),
+            ))
+            if len(batch) == 1000:
+                Post.objects.bulk_create(batch)
+                batch = []
+        if batch:
+            Post.objects.bulk_create(batch)
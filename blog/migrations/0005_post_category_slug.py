@@ -0,0 +1,28 @@
+# Generated by Django 5.2.6 on 2026-10-18 10:05
+
+from django.db import migrations, models
+from django.utils.text import slugify
+
+
+def backfill_category_slugs(apps, schema_editor):
+    Post = apps.get_model('blog', 'Post')
+    posts = list(Post.objects.exclude(category='').only('pk', 'category'))
+    for p in posts:
+        p.category_slug = slugify(p.category)
+    Post.objects.bulk_update(posts, ['category_slug'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0004_alter_post_key'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='category_slug',
+            field=models.SlugField(blank=True, editable=False, max_length=120),
+        ),
+        migrations.RunPython(backfill_category_slugs, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.6 on 2026-10-18 14:09
+
+from django.db import migrations, models
+from django.utils.text import slugify
+
+
+def backfill_tag_items(apps, schema_editor):
+    Post = apps.get_model('blog', 'Post')
+    Tag = apps.get_model('blog', 'Tag')
+    post_slugs = {}
+    names = {}
+    for pk, text in Post.objects.exclude(tags='').values_list('pk', 'tags').iterator():
+        slugs = set()
+        for t in (x.strip() for x in text.split(',')):
+            s = slugify(t)
+            if s:
+                names.setdefault(s, t)
+                slugs.add(s)
+        post_slugs[pk] = slugs
+    Tag.objects.bulk_create([Tag(name=n, slug=s) for s, n in names.items()], ignore_conflicts=True)
+    tag_ids = dict(Tag.objects.values_list('slug', 'pk'))
+    Through = Post.tag_items.through
+    Through.objects.bulk_create(
+        [Through(post_id=pk, tag_id=tag_ids[s]) for pk, slugs in post_slugs.items() for s in slugs],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0005_post_category_slug'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('slug', models.SlugField(max_length=120, unique=True)),
+            ],
+            options={
+                'ordering': ['name'],
+            },
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='tag_items',
+            field=models.ManyToManyField(blank=True, editable=False, related_name='posts', to='blog.tag'),
+        ),
+        migrations.RunPython(backfill_tag_items, migrations.RunPython.noop),
+    ]
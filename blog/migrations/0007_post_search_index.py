@@ -0,0 +1,24 @@
+# Generated by Django 5.2.6 on 2026-10-18 15:20
+
+from django.db import migrations
+
+
+def install_search(apps, schema_editor):
+    from blog.search import install
+    install(schema_editor.connection.alias)
+
+
+def uninstall_search(apps, schema_editor):
+    from blog.search import uninstall
+    uninstall(schema_editor.connection.alias)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0006_tag_post_tag_items'),
+    ]
+
+    operations = [
+        migrations.RunPython(install_search, uninstall_search),
+    ]
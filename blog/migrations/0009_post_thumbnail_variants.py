@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0008_post_thumbnail_metadata'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='thumbnail_variants',
+            field=models.JSONField(blank=True, editable=False, help_text='Resized AVIF/WebP copies (portfolio.derivatives)', null=True),
+        ),
+    ]
@@ -2,6 +2,19 @@ from django.db import models
 import uuid
 from django.utils import timezone
 from django.urls import reverse
+from django.utils.text import slugify
+
+class Tag(models.Model):
+    """Normalized blog tag, derived from the comma-separated Post.tags text."""
+    name = models.CharField(max_length=100)
+    slug = models.SlugField(max_length=120, unique=True)
+
+    class Meta:
+        ordering = ['name']
+
+    def __str__(self):
+        return self.name
+
 
 class Post(models.Model):
     title = models.CharField(max_length=200)
@@ -10,18 +23,62 @@ class Post(models.Model):
     author = models.CharField(max_length=100)
     content = models.TextField()
     category = models.CharField(max_length=100, blank=True, help_text="Optional category e.g. Engineering, Tutorial")
+    # slugify(category), kept in sync on save so category pages filter on an index
+    category_slug = models.SlugField(max_length=120, blank=True, editable=False)
     tags = models.TextField(blank=True, help_text="Comma-separated tags, e.g. django, performance, testing")
+    # Normalized copy of `tags`, rebuilt on save; tag pages and sitemaps query this
+    tag_items = models.ManyToManyField(Tag, related_name='posts', blank=True, editable=False)
     thumbnail = models.ImageField(upload_to='blog/', blank=True, null=True)
+    # Filled from the file on upload (portfolio.images) so pages never open it to size it
+    thumbnail_width = models.PositiveIntegerField(blank=True, null=True, editable=False)
+    thumbnail_height = models.PositiveIntegerField(blank=True, null=True, editable=False)
+    thumbnail_bytes = models.PositiveIntegerField(blank=True, null=True, editable=False)
+    thumbnail_color = models.CharField(max_length=7, blank=True, editable=False, help_text="Dominant colour, #rrggbb")
+    thumbnail_placeholder = models.TextField(blank=True, editable=False, help_text="Tiny blurred preview as a data: URI, shown while the image loads")
+    thumbnail_variants = models.JSONField(blank=True, null=True, editable=False, help_text="Resized AVIF/WebP copies (portfolio.derivatives)")
     created_at = models.DateTimeField(default=timezone.now)
     updated_at = models.DateTimeField(auto_now=True)
     published = models.BooleanField(default=True)
+    # Set on save whenever the post goes from unpublished to published; the new-posts
+    # digest (portfolio.digest) picks posts by it
+    published_at = models.DateTimeField(blank=True, null=True, editable=False)
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Published listings and prev/next links
+            models.Index(fields=['published', 'created_at'], name='post_published_created_idx'),
+            # The digest's "published since the watermark" query
+            models.Index(fields=['published', 'published_at'], name='post_published_at_idx'),
+        ]
 
     def __str__(self):
         return self.title
 
+    def save(self, *args, **kwargs):
+        self.category_slug = slugify(self.category or '')
+        if not self.published:
+            self.published_at = None
+        elif self.published_at is None:
+            self.published_at = timezone.now()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            derived = {'category': 'category_slug', 'published': 'published_at'}
+            kwargs['update_fields'] = {*update_fields, *(derived[f] for f in update_fields if f in derived)}
+        super().save(*args, **kwargs)
+        if update_fields is None or 'tags' in update_fields:
+            self.sync_tag_items()
+
+    def sync_tag_items(self):
+        """Point tag_items at the Tag rows for the current `tags` text, creating missing ones."""
+        names = {}
+        for t in self.tag_list:
+            names.setdefault(slugify(t), t)
+        names.pop('', None)
+        if names:
+            Tag.objects.bulk_create([Tag(name=n, slug=s) for s, n in names.items()], ignore_conflicts=True)
+        self.tag_items.set(Tag.objects.filter(slug__in=names))
+
     def get_absolute_url(self):
         return reverse('blog:post_detail', args=[self.slug])
 
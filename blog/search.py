@@ -0,0 +1,24 @@
+"""Full-text search over blog posts (see portfolio.fulltext for the backends)."""
+from portfolio.fulltext import FullTextIndex
+
+# A hit in the title counts most, then tags/category, then author, then the body
+POST_INDEX = FullTextIndex('blog_post', (
+    ('title', 'A', 10.0),
+    ('content', 'D', 1.0),
+    ('author', 'C', 2.0),
+    ('tags', 'B', 5.0),
+    ('category', 'B', 3.0),
+), tiebreak=('-created_at',))
+
+
+def install(using='default'):
+    return POST_INDEX.install(using)
+
+
+def uninstall(using='default'):
+    POST_INDEX.uninstall(using)
+
+
+def search_posts(queryset, q):
+    """Filter `queryset` (of Post) to matches for `q`, best match first."""
+    return POST_INDEX.search(queryset, q)
@@ -1,7 +1,7 @@
 from django.urls import path
 from . import views
 from .feeds import LatestPostsFeed
-from django.views.decorators.cache import cache_page
+from portfolio.caching import cache_page_tagged
 
 app_name = 'blog'
 
@@ -9,6 +9,6 @@ urlpatterns = [
     path('', views.post_list, name='post_list'),
     path('category/<slug:category>/', views.post_list_by_category, name='post_list_by_category'),
     path('tag/<slug:tag>/', views.post_list_by_tag, name='post_list_by_tag'),
-    path('rss.xml', cache_page(60 * 60 * 24)(LatestPostsFeed()), name='post_feed'),
+    path('rss.xml', cache_page_tagged(tags=('post',))(LatestPostsFeed()), name='post_feed'),
     path('<slug:slug>/', views.post_detail, name='post_detail'),
 ]
@@ -1,27 +1,24 @@
 from django.shortcuts import render, get_object_or_404
 from django.core.paginator import Paginator
-from django.db.models import Q
 from .models import Post
-from django.utils.text import slugify
-from django.views.decorators.cache import cache_page
+from .search import search_posts
+from portfolio.caching import cache_page_tagged
+from portfolio.conditional import conditional_page
 
-@cache_page(60 * 10)
+@conditional_page(Post.objects.filter(published=True), tags=('post',))
+@cache_page_tagged(tags=('post',))
 def post_list(request):
     q = request.GET.get('q', '').strip()
     posts_qs = Post.objects.filter(published=True)
     if q:
-        posts_qs = posts_qs.filter(
-            Q(title__icontains=q) |
-            Q(content__icontains=q) |
-            Q(author__icontains=q) |
-            Q(tags__icontains=q) |
-            Q(category__icontains=q)
-        )
+        # Ranked full-text search (FTS5 / tsvector), best match first
+        posts_qs = search_posts(posts_qs, q)
     paginator = Paginator(posts_qs, 6)
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
     return render(request, 'blog/post_list.html', {'page_obj': page_obj, 'q': q, 'posts': page_obj.object_list})
 
+@conditional_page(Post.objects.filter(published=True), tags=('post',))
 def post_detail(request, slug):
     post = get_object_or_404(Post, slug=slug, published=True)
     # Rough reading time: 200 wpm
@@ -33,14 +30,13 @@ def post_detail(request, slug):
     return render(request, 'blog/post_detail.html', {'post': post, 'reading_time': reading_time, 'newer': newer, 'older': older})
 
 
-@cache_page(60 * 10)
+@conditional_page(Post.objects.filter(published=True), tags=('post',))
+@cache_page_tagged(tags=('post',))
 def post_list_by_category(request, category):
     """Pretty URL filter by category slug, reusing the same template."""
-    posts_qs = Post.objects.filter(published=True)
     cat_slug = (category or '').strip().lower()
-    # Filter in Python to match slugified category values reliably
-    filtered = [p for p in posts_qs if p.category and slugify(p.category) == cat_slug]
-    paginator = Paginator(filtered, 6)
+    posts_qs = Post.objects.filter(published=True, category_slug=cat_slug) if cat_slug else Post.objects.none()
+    paginator = Paginator(posts_qs, 6)
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
     ctx = {
@@ -53,17 +49,13 @@ def post_list_by_category(request, category):
     return render(request, 'blog/post_list.html', ctx)
 
 
-@cache_page(60 * 10)
+@conditional_page(Post.objects.filter(published=True), tags=('post',))
+@cache_page_tagged(tags=('post',))
 def post_list_by_tag(request, tag):
     """Pretty URL filter by tag slug, reusing the same template."""
-    posts_qs = Post.objects.filter(published=True)
     tag_slug = (tag or '').strip().lower()
-    filtered = []
-    for p in posts_qs:
-        tags = getattr(p, 'tag_list', []) or []
-        if any(slugify(t) == tag_slug for t in tags):
-            filtered.append(p)
-    paginator = Paginator(filtered, 6)
+    posts_qs = Post.objects.filter(published=True, tag_items__slug=tag_slug) if tag_slug else Post.objects.none()
+    paginator = Paginator(posts_qs, 6)
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
     ctx = {
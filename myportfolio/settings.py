@@ -184,13 +184,34 @@ if not os.environ.get('EMAIL_BACKEND') and EMAIL_HOST:
 if DEFAULT_FROM_EMAIL == 'no-reply@example.com' and EMAIL_HOST_USER:
     DEFAULT_FROM_EMAIL = EMAIL_HOST_USER
 
-# Simple cache for rate-limiting middleware; local-memory by default
+# Cache for pages, tag versions, the PROFILE snapshot and rate limiting. Local memory is
+# per process, so with several workers (or run_media_worker) set a shared backend, e.g.
+# CACHE_BACKEND=django.core.cache.backends.redis.RedisCache CACHE_LOCATION=redis://127.0.0.1:6379
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', ''),
     }
 }
 
+# Mixed into page ETags (portfolio.conditional); change it on deploys that alter templates
+ETAG_SALT = os.environ.get('ETAG_SALT', '')
+
+# Run background jobs (portfolio.jobs) inline when they are queued instead of leaving them
+# for `manage.py run_media_worker`; handy for local development without a worker
+JOBS_EAGER = os.environ.get('JOBS_EAGER', 'False') == 'True'
+
+# Rendered About-page PDFs (portfolio.pdfs), one file per content version
+PDF_CACHE_DIR = Path(os.environ.get('PDF_CACHE_DIR', BASE_DIR / 'var' / 'pdf'))
+
+# Public origin of the site (e.g. https://example.com) for links built outside a request,
+# such as the new-posts digest (portfolio.digest)
+SITE_URL = os.environ.get('SITE_URL', '')
+
+# Origin PDFs are re-rendered for in the background; when empty, the origin of the last
+# download is used
+PDF_SITE_URL = os.environ.get('PDF_SITE_URL', SITE_URL)
+
 # reCAPTCHA settings (optional)
 RECAPTCHA_SECRET = os.environ.get('RECAPTCHA_SECRET')
 RECAPTCHA_SITE_KEY = os.environ.get('RECAPTCHA_SITE_KEY')
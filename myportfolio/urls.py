@@ -22,6 +22,7 @@ from django.conf.urls.static import static
 from django.contrib.sitemaps.views import sitemap
 from django.views.generic import TemplateView
 from django.views.decorators.cache import cache_page
+from portfolio.caching import cache_page_tagged
 from portfolio.sitemaps import StaticViewSitemap, PostSitemap, ProjectSitemap, BlogCategorySitemap, BlogTagSitemap
 
 urlpatterns = [
@@ -34,7 +35,7 @@ urlpatterns = [
     path('admin/', admin.site.urls),
     path('', include('portfolio.urls')),
     path('blog/', include('blog.urls')),
-    path('sitemap.xml', cache_page(60 * 60 * 24)(sitemap), {'sitemaps': {
+    path('sitemap.xml', cache_page_tagged(tags=('post', 'project'))(sitemap), {'sitemaps': {
         'static': StaticViewSitemap,
         'blog': PostSitemap,
         'projects': ProjectSitemap,
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Message, Project, Testimonial, Tag, Profile, ExperienceItem, EducationItem, CertificationItem, AwardItem, SiteSettings, AchievementItem, SkillItem, GalleryItem, Subscription, Service
+from .models import Message, Project, Testimonial, Tag, Profile, ExperienceItem, EducationItem, CertificationItem, AwardItem, SiteSettings, AchievementItem, SkillItem, GalleryItem, Subscription, Service, Job, OutboundEmail, Campaign, CampaignDelivery
 from django.core.mail import send_mail
 from django.conf import settings
 from django.shortcuts import redirect
@@ -7,6 +7,12 @@ from django.urls import path
 from django.template.response import TemplateResponse
 from django import forms
 from django.utils.html import format_html
+from django.utils import timezone
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Q
+from .caching import invalidate_tags
+from .derivatives import variant_url
+from .newsletter import start_campaign
 
 
 class ReplyForm(forms.Form):
@@ -56,7 +62,8 @@ class ProjectAdmin(admin.ModelAdmin):
 	def thumb(self, obj):
 		if getattr(obj, 'image', None):
 			try:
-				url = obj.image.url
+				# Smallest derivative that is sharp at 2x, not the full-size upload
+				url = variant_url(obj.image, 96)
 				return format_html('<img src="{}" alt="" style="width:48px;height:auto;border-radius:6px;box-shadow:0 1px 6px rgba(0,0,0,.2)">', url)
 			except Exception:
 				return ''
@@ -390,7 +397,7 @@ class GalleryItemAdmin(admin.ModelAdmin):
 	def thumb(self, obj):
 		if getattr(obj, 'image', None):
 			try:
-				return format_html('<img src="{}" alt="" style="width:64px;height:48px;object-fit:cover;border-radius:6px;box-shadow:0 1px 6px rgba(0,0,0,.2)">', obj.image.url)
+				return format_html('<img src="{}" alt="" style="width:64px;height:48px;object-fit:cover;border-radius:6px;box-shadow:0 1px 6px rgba(0,0,0,.2)">', variant_url(obj.image, 128))
 			except Exception:
 				return ''
 		return ''
@@ -420,10 +427,12 @@ class GalleryItemAdmin(admin.ModelAdmin):
 
 	def publish_selected(self, request, queryset):
 		updated = queryset.update(is_published=True)
+		invalidate_tags('gallery')
 		self.message_user(request, f"{updated} item(s) published.")
 
 	def unpublish_selected(self, request, queryset):
 		updated = queryset.update(is_published=False)
+		invalidate_tags('gallery')
 		self.message_user(request, f"{updated} item(s) unpublished.")
 
 
@@ -434,3 +443,90 @@ class SubscriptionAdmin(admin.ModelAdmin):
 	search_fields = ('email',)
 	readonly_fields = ('created_at','token')
 
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+	list_display = ('kind','key','status','attempts','run_after','updated_at')
+	list_filter = ('status','kind')
+	search_fields = ('key','last_error')
+	readonly_fields = ('kind','key','payload','status','attempts','max_attempts','run_after','locked_at','last_error','created_at','updated_at')
+	actions = ['retry_selected']
+
+	def has_add_permission(self, request):
+		return False
+
+	def retry_selected(self, request, queryset):
+		retried = 0
+		for job in queryset.filter(status=Job.STATUS_FAILED):
+			try:
+				with transaction.atomic():
+					retried += Job.objects.filter(pk=job.pk).update(status=Job.STATUS_PENDING, attempts=0, run_after=timezone.now(), last_error='')
+			except IntegrityError:
+				pass  # a newer pending job for the same target exists
+		self.message_user(request, f"{retried} job(s) queued for retry.")
+	retry_selected.short_description = 'Retry failed jobs'
+
+
+@admin.register(OutboundEmail)
+class OutboundEmailAdmin(admin.ModelAdmin):
+	list_display = ('subject','status','attempts','send_after','sent_at','created_at')
+	list_filter = ('status',)
+	search_fields = ('subject','to','last_error')
+	readonly_fields = ('subject','body','html_body','from_email','to','attachments','status','attempts','max_attempts','send_after','locked_at','last_error','sent_at','created_at','updated_at')
+	actions = ['retry_selected']
+
+	def has_add_permission(self, request):
+		return False
+
+	def retry_selected(self, request, queryset):
+		retried = queryset.filter(status=OutboundEmail.STATUS_FAILED).update(
+			status=OutboundEmail.STATUS_PENDING, attempts=0, send_after=timezone.now(), last_error='')
+		self.message_user(request, f"{retried} email(s) queued for retry.")
+	retry_selected.short_description = 'Retry failed emails'
+
+
+@admin.register(Campaign)
+class CampaignAdmin(admin.ModelAdmin):
+	list_display = ('subject','status','sent_count','recipient_count','started_at','finished_at')
+	list_filter = ('status',)
+	search_fields = ('subject',)
+	readonly_fields = ('status','site_url','started_at','finished_at','created_at','updated_at')
+	actions = ['start_sending']
+
+	def get_queryset(self, request):
+		qs = super().get_queryset(request)
+		return qs.annotate(
+			_recipients=Count('deliveries'),
+			_sent=Count('deliveries', filter=Q(deliveries__status=CampaignDelivery.STATUS_SENT)),
+		)
+
+	def recipient_count(self, obj):
+		return obj._recipients
+	recipient_count.short_description = 'Recipients'
+
+	def sent_count(self, obj):
+		return obj._sent
+	sent_count.short_description = 'Sent'
+
+	def get_readonly_fields(self, request, obj=None):
+		# The body is frozen once sending has started
+		if obj and obj.status != Campaign.STATUS_DRAFT:
+			return self.readonly_fields + ('subject','body','body_html')
+		return self.readonly_fields
+
+	def start_sending(self, request, queryset):
+		started = sum(start_campaign(c, request.build_absolute_uri('/')) for c in queryset.filter(status=Campaign.STATUS_DRAFT))
+		self.message_user(request, f"{started} campaign(s) queued; `manage.py send_campaigns` delivers them.")
+	start_sending.short_description = 'Send to all active subscribers'
+
+
+@admin.register(CampaignDelivery)
+class CampaignDeliveryAdmin(admin.ModelAdmin):
+	list_display = ('email','campaign','status','attempts','sent_at')
+	list_filter = ('status','campaign')
+	search_fields = ('email','last_error')
+	readonly_fields = ('campaign','subscription','email','status','attempts','last_error','sent_at')
+
+	def has_add_permission(self, request):
+		return False
@@ -1,6 +1,25 @@
 from django.apps import AppConfig
+from django.db import connections
+from django.db.models.signals import post_migrate
+
+
+def _prepare_search(sender, using, **kwargs):
+    # (Re)create the documents full-text index and fill the index on first migrate
+    from .models import SearchDocument
+    from .search import DOCUMENT_INDEX, rebuild
+    if SearchDocument._meta.db_table not in connections[using].introspection.table_names():
+        return
+    DOCUMENT_INDEX.install(using)
+    if not SearchDocument.objects.using(using).exists():
+        rebuild(using)
 
 
 class PortfolioConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'portfolio'
+
+    def ready(self):
+        # Register cache invalidation receivers
+        from . import signals  # noqa: F401
+        from . import checks  # noqa: F401
+        post_migrate.connect(_prepare_search, sender=self, dispatch_uid='portfolio_search_prepare')
@@ -0,0 +1,165 @@
+"""Tag-based response caching.
+
+Each cached page declares the content tags it depends on ('post', 'project', ...).
+Every tag has a version stored in the cache and the versions a page was rendered with
+are stored alongside it, so bumping a tag (done by model signals, see portfolio.signals)
+makes exactly the pages that use it stale. With a shared cache backend entries can
+therefore live for a long time without serving outdated content beyond a single rebuild.
+A per-process cache (the local-memory default) only sees the bumps made by its own
+process, so there entries keep a short lifetime that bounds how stale other workers get.
+"""
+import time
+import uuid
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.cache import get_cache_key, has_vary_header, learn_cache_key
+
+TAG_VERSION_CACHE_KEY = 'portfolio:tagv:{}'
+
+# Every page extends base.html, which renders PROFILE and SITE
+BASE_TAGS = ('profile', 'site')
+
+# Default lifetime of a tagged page with a shared cache; invalidation happens through tag versions
+PAGE_CACHE_SECONDS = 60 * 60 * 24
+
+# Default lifetime with a per-process cache, which misses other processes' invalidations
+LOCAL_PAGE_CACHE_SECONDS = 60 * 10
+
+# Backends whose entries live in one process only
+PROCESS_LOCAL_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+# How long a stale copy is kept past its soft expiry to be served during a rebuild
+PAGE_STALE_SECONDS = 60 * 10
+
+# Upper bound on a single rebuild; the lock expires on its own if a worker dies
+REBUILD_LOCK_SECONDS = 30
+
+PAGE_KEY_PREFIX = 'tagged'
+
+
+def is_shared_cache(alias='default'):
+    """True when the `alias` cache is seen by every process (Redis, Memcached, database...)."""
+    return settings.CACHES[alias]['BACKEND'] not in PROCESS_LOCAL_BACKENDS
+
+
+def page_cache_seconds():
+    """Default lifetime of a tagged page for the configured cache backend."""
+    return PAGE_CACHE_SECONDS if is_shared_cache() else LOCAL_PAGE_CACHE_SECONDS
+
+
+def tag_versions(tags):
+    """Return the current version of each tag (in order), creating missing ones."""
+    keys = [TAG_VERSION_CACHE_KEY.format(t) for t in tags]
+    found = cache.get_many(keys)
+    missing = [k for k in keys if k not in found]
+    if missing:
+        for k in missing:
+            cache.add(k, uuid.uuid4().hex, None)
+        found.update(cache.get_many(missing))
+    return [found.get(k, '') for k in keys]
+
+
+def invalidate_tags(*tags):
+    """Bump the given tags now and again after commit, so pages rendered from
+    pre-commit data during the write are not kept."""
+    def bump():
+        cache.set_many({TAG_VERSION_CACHE_KEY.format(t): uuid.uuid4().hex for t in tags}, None)
+    bump()
+    transaction.on_commit(bump)
+
+
+def _is_cacheable(request, response):
+    # Same rules as Django's UpdateCacheMiddleware
+    if response.streaming or response.status_code != 200:
+        return False
+    if response.cookies and has_vary_header(response, 'Cookie'):
+        return False
+    cache_control = response.get('Cache-Control', '').lower()
+    if any(d in cache_control for d in ('private', 'no-cache', 'no-store')):
+        return False
+    return not has_vary_header(response, '*')
+
+
+def _is_personalized(request):
+    """True when the rendered page carries per-visitor content and must not be shared:
+    flash messages were displayed, or a CSRF token was embedded (get_token() was called).
+    Forms on shared pages get their token client-side instead (see views.csrf_token)."""
+    storage = getattr(request, '_messages', None)
+    if storage is not None and getattr(storage, 'used', False):
+        return True
+    return bool(request.META.get('CSRF_COOKIE_NEEDS_UPDATE'))
+
+
+def has_pending_messages(request):
+    # Visitors with queued flash messages get a fresh render so they see them
+    return CookieStorage.cookie_name in request.COOKIES
+
+
+def cache_page_tagged(timeout=None, tags=()):
+    """Like cache_page, but the entry goes stale as soon as any of `tags` is invalidated.
+    BASE_TAGS are always included. `timeout` defaults to page_cache_seconds().
+
+    Entries are stored with the tag versions and a soft-expiry timestamp next to the
+    response. When an entry is stale (expired or tags bumped), the first request to take
+    the rebuild lock regenerates it while concurrent requests keep getting the stale copy,
+    so a hot page is rebuilt once instead of once per worker.
+
+    Entries are one shared anonymous body: renders that show flash messages or embed a
+    CSRF token are not stored, and requests with pending messages bypass the cache.
+    Usage: @cache_page_tagged(tags=('post',))
+    """
+    all_tags = tuple(dict.fromkeys(tuple(tags) + BASE_TAGS))
+
+    def decorator(view_func):
+        @wraps(view_func)
+        def _wrapped(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD') or has_pending_messages(request):
+                return view_func(request, *args, **kwargs)
+            versions = tuple(tag_versions(all_tags))
+            page_timeout = timeout if timeout is not None else page_cache_seconds()
+            cache_key = get_cache_key(request, PAGE_KEY_PREFIX, 'GET', cache=cache)
+            entry = cache.get(cache_key) if cache_key is not None else None
+            lock_key = None
+            if entry is not None:
+                if entry['versions'] == versions and entry['soft_expires'] > time.time():
+                    return entry['response']
+                lock_key = f'{cache_key}.lock'
+                if not cache.add(lock_key, 1, REBUILD_LOCK_SECONDS):
+                    # Someone else is rebuilding; serve the stale copy meanwhile
+                    return entry['response']
+
+            def release():
+                if lock_key is not None:
+                    cache.delete(lock_key)
+
+            try:
+                response = view_func(request, *args, **kwargs)
+            except Exception:
+                release()
+                raise
+            if request.method != 'GET' or not _is_cacheable(request, response):
+                release()
+                return response
+
+            def store(r):
+                if _is_personalized(request):
+                    release()
+                    return
+                key = learn_cache_key(request, r, page_timeout + PAGE_STALE_SECONDS, PAGE_KEY_PREFIX, cache=cache)
+                entry = {'versions': versions, 'soft_expires': time.time() + page_timeout, 'response': r}
+                cache.set(key, entry, page_timeout + PAGE_STALE_SECONDS)
+                release()
+            if hasattr(response, 'render') and callable(response.render):
+                response.add_post_render_callback(store)
+            else:
+                store(response)
+            return response
+        return _wrapped
+    return decorator
@@ -0,0 +1,20 @@
+"""System checks for the settings the background workers rely on."""
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+
+from .caching import is_shared_cache
+
+
+@register(Tags.caches, deploy=True)
+def check_shared_cache(app_configs, **kwargs):
+    """Jobs run in `manage.py run_media_worker` and invalidate cached pages and the PROFILE
+    snapshot from that process; the web workers only see it through a shared cache."""
+    if getattr(settings, 'JOBS_EAGER', False) or is_shared_cache():
+        return []
+    return [Error(
+        'The default cache is local to each process, so pages cached by the web workers '
+        'are not refreshed when run_media_worker finishes a job.',
+        hint='Set CACHE_BACKEND and CACHE_LOCATION to a shared cache (Redis, Memcached or '
+             'the database cache), or set JOBS_EAGER=True to run jobs in the web process.',
+        id='portfolio.E001',
+    )]
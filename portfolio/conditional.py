@@ -0,0 +1,111 @@
+"""Conditional GET (ETag / Last-Modified) for public content pages.
+
+A page declares the querysets its HTML is built from. Their latest `updated_at` and row
+counts are read in a single UNION ALL aggregate query: Last-Modified is the newest
+timestamp, and the strong ETag hashes every (timestamp, count) pair with the request path,
+so edits, additions and deletions all change it. Clients holding a current copy get a 304
+without the view or its templates running.
+
+With a shared cache the aggregate is memoized under the page's cache tags (see
+portfolio.caching), so revalidating an unchanged page costs no queries; a per-process cache
+would miss other processes' tag bumps, so there it is read on every revalidation. Changes to models without their own
+`updated_at` are folded into one that has it by portfolio.signals (profile items touch
+their Profile, tag assignments touch the Project or Tag).
+"""
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import DateTimeField, F, Func, IntegerField, Value
+from django.views.decorators.http import condition
+
+from .caching import BASE_TAGS, PAGE_CACHE_SECONDS, has_pending_messages, is_shared_cache, tag_versions
+from .models import Profile, SiteSettings
+
+# Every page extends base.html, which renders PROFILE and SITE
+BASE_SOURCES = (Profile.objects.all(), SiteSettings.objects.all())
+
+STATE_CACHE_KEY = 'portfolio:content_state:{}:{}'
+
+
+def content_state(sources):
+    """Return [(latest updated_at, row count), ...] for `sources`, in order, in one query."""
+    parts = [
+        qs.order_by().values(
+            s=Value(i, output_field=IntegerField()),
+            # Plain functions rather than aggregates, so no GROUP BY is added
+            m=Func(F('updated_at'), function='MAX', output_field=DateTimeField()),
+            n=Func(F('pk'), function='COUNT', output_field=IntegerField()),
+        )
+        for i, qs in enumerate(sources)
+    ]
+    rows = parts[0].union(*parts[1:], all=True) if len(parts) > 1 else parts[0]
+    by_source = {r['s']: (r['m'], r['n']) for r in rows}
+    return [by_source.get(i, (None, 0)) for i in range(len(parts))]
+
+
+def conditional_page(*sources, tags=(), staff_sees_more=False):
+    """Add ETag/Last-Modified to the 200 responses of a view built from `sources` (plus
+    BASE_SOURCES) and answer matching If-None-Match / If-Modified-Since requests with 304.
+
+    `tags` are the cache tags bumped when `sources` change (BASE_TAGS are always included).
+    With `staff_sees_more` (the view shows staff unpublished content) staff requests get
+    neither validators nor 304s. Place it above cache_page_tagged so revalidations skip the
+    page cache too.
+    Usage: @conditional_page(Post.objects.filter(published=True), tags=('post',))
+    """
+    all_sources = tuple(sources) + BASE_SOURCES
+    all_tags = tuple(dict.fromkeys(tuple(tags) + BASE_TAGS))
+
+    def current_state(view_name):
+        if not is_shared_cache():
+            return content_state(all_sources)
+        versions = ':'.join(tag_versions(all_tags))
+        key = STATE_CACHE_KEY.format(view_name, hashlib.md5(versions.encode()).hexdigest())
+        state = cache.get(key)
+        if state is None:
+            state = content_state(all_sources)
+            cache.set(key, state, PAGE_CACHE_SECONDS)
+        return state
+
+    def validators(request, view_name):
+        # condition() asks for the ETag and Last-Modified separately; compute once
+        if not hasattr(request, '_content_validators'):
+            state = current_state(view_name)
+            stamps = [m for m, _ in state if m is not None]
+            digest = hashlib.sha256(repr((
+                getattr(settings, 'ETAG_SALT', ''),
+                request.get_full_path(),
+                [(m.isoformat() if m else '', n) for m, n in state],
+            )).encode()).hexdigest()[:32]
+            request._content_validators = (digest, max(stamps) if stamps else None)
+        return request._content_validators
+
+    def decorator(view_func):
+        view_name = f'{view_func.__module__}.{view_func.__qualname__}'
+
+        def etag(request, *args, **kwargs):
+            return validators(request, view_name)[0]
+
+        def last_modified(request, *args, **kwargs):
+            return validators(request, view_name)[1]
+
+        conditional_view = condition(etag_func=etag, last_modified_func=last_modified)(view_func)
+
+        @wraps(view_func)
+        def _wrapped(request, *args, **kwargs):
+            # A 304 would hide queued flash messages, so render those requests in full
+            if request.method not in ('GET', 'HEAD') or has_pending_messages(request):
+                return view_func(request, *args, **kwargs)
+            if staff_sees_more and (request.user.is_staff or request.user.is_superuser):
+                return view_func(request, *args, **kwargs)
+            response = conditional_view(request, *args, **kwargs)
+            if response.status_code not in (200, 304):
+                # The validators describe the content, not an error page
+                for header in ('ETag', 'Last-Modified'):
+                    if header in response:
+                        del response[header]
+            return response
+        return _wrapped
+    return decorator
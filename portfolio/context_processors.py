@@ -1,49 +1,66 @@
 from django.conf import settings
 from django.apps import apps
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils.functional import SimpleLazyObject
 
-def analytics(request):
+from .caching import page_cache_seconds
+from .derivatives import image_payload
+
+# Cache key for the precomputed PROFILE dict; rebuilt lazily after signals delete it
+PROFILE_SNAPSHOT_CACHE_KEY = 'portfolio:profile_snapshot'
+
+def _calendly_url(request):
     # Keep backward compatibility for templates still referencing CALENDLY_URL
     cal = getattr(settings, 'CALENDLY_URL', '')
     try:
         SiteSettings = apps.get_model('portfolio', 'SiteSettings')
-        obj = SiteSettings.objects.first()
+        obj = SiteSettings.get_solo(request)
         if obj and getattr(obj, 'calendly_url', ''):
             cal = obj.calendly_url
     except Exception:
         pass
+    return cal
+
+
+def analytics(request):
     return {
         'GA_MEASUREMENT_ID': getattr(settings, 'GA_MEASUREMENT_ID', None),
-        'CALENDLY_URL': cal,
+        'CALENDLY_URL': SimpleLazyObject(lambda: _calendly_url(request)),
     }
 
-def profile(request):
-    """Expose profile data to templates from settings.PROFILE with safe defaults."""
-    profile = getattr(settings, 'PROFILE', {}) or {}
+def richest_profile(Profile):
+    """Return the Profile with the most experience/education/certification/award items
+    (latest updated wins ties), scored in a single query via correlated COUNT subqueries."""
+    score = Value(0)
+    for related in ('experience_items', 'education_items', 'certification_items', 'award_items'):
+        Item = Profile._meta.get_field(related).related_model
+        counts = (
+            Item.objects.filter(profile=OuterRef('pk')).order_by()
+            .values('profile').annotate(n=Count('pk')).values('n')
+        )
+        score = score + Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+    return Profile.objects.annotate(content_score=score).order_by('-content_score', '-updated_at').first()
+
+
+def build_profile_snapshot(request=None):
+    """Build the PROFILE dict from the DB Profile (and related items) with settings.PROFILE fallbacks."""
+    profile = dict(getattr(settings, 'PROFILE', {}) or {})
     # Try to load DB Profile if available
     try:
         Profile = apps.get_model('portfolio', 'Profile')
         SiteSettings = apps.get_model('portfolio', 'SiteSettings')
         # Prefer explicitly selected active_profile when set
         db_obj = None
-        ss = SiteSettings.objects.first()
+        ss = SiteSettings.get_solo(request)
         if ss and getattr(ss, 'active_profile_id', None):
-            db_obj = ss.active_profile
+            # Load fresh rather than through the shared SiteSettings instance's FK cache
+            db_obj = Profile.objects.filter(pk=ss.active_profile_id).first()
         else:
             # Fallback heuristic: most content, then latest updated
-            profiles = list(Profile.objects.all())
-            if profiles:
-                def score(p):
-                    try:
-                        return (
-                            (getattr(p, 'experience_items').count() if hasattr(p, 'experience_items') else 0)
-                            + (getattr(p, 'education_items').count() if hasattr(p, 'education_items') else 0)
-                            + (getattr(p, 'certification_items').count() if hasattr(p, 'certification_items') else 0)
-                            + (getattr(p, 'award_items').count() if hasattr(p, 'award_items') else 0),
-                            p.updated_at
-                        )
-                    except Exception:
-                        return (0, getattr(p, 'updated_at', None))
-                db_obj = sorted(profiles, key=score, reverse=True)[0]
+            db_obj = richest_profile(Profile)
     except Exception:
         db_obj = None
     if db_obj:
@@ -69,6 +86,7 @@ def profile(request):
             'awards': db_obj.awards or [],
             # Avatar URL (if set)
             'avatar_url': (db_obj.avatar.url if db_obj.avatar else None),
+            'avatar_image': image_payload(db_obj.avatar),
         }
         # Merge settings fallback for any missing fields
         for k, v in (profile or {}).items():
@@ -331,17 +349,54 @@ def profile(request):
     except Exception:
         profile['experience_years_total'] = None
 
-    return {'PROFILE': profile}
+    return profile
+
+
+def get_profile_snapshot(request=None):
+    """Return the cached PROFILE dict, building and storing it on a miss.
+    The entry is dropped by signals (see portfolio.signals) whenever profile data changes.
+    It lives for PROFILE_SNAPSHOT_TIMEOUT, else as long as a cached page
+    (caching.page_cache_seconds(): short with a per-process cache, which other processes'
+    invalidations never reach); that also bounds date-derived values such as
+    experience_years_total. A snapshot set as `request._profile_snapshot` takes precedence.
+    """
+    if request is not None and hasattr(request, '_profile_snapshot'):
+        return request._profile_snapshot
+    snapshot = cache.get(PROFILE_SNAPSHOT_CACHE_KEY)
+    if snapshot is None:
+        snapshot = build_profile_snapshot(request)
+        cache.set(PROFILE_SNAPSHOT_CACHE_KEY, snapshot, getattr(settings, 'PROFILE_SNAPSHOT_TIMEOUT', None) or page_cache_seconds())
+    return snapshot
+
+
+def invalidate_profile_snapshot():
+    """Drop the cached PROFILE dict now and again once the current transaction commits,
+    so a concurrent request cannot re-cache data read before the commit."""
+    cache.delete(PROFILE_SNAPSHOT_CACHE_KEY)
+    transaction.on_commit(lambda: cache.delete(PROFILE_SNAPSHOT_CACHE_KEY))
+
+
+def profile(request):
+    """Expose profile data to templates from the cached profile snapshot.
+    Lazy: nothing is read until a template first accesses PROFILE, then memoized for the request.
+    """
+    return {'PROFILE': SimpleLazyObject(lambda: get_profile_snapshot(request))}
 
 
 def site_settings(request):
     """Expose global site settings from DB with sensible fallbacks.
     Provides SITE dict: brand_name, logo_url, og_image_url, hero texts, resume_url, contact and socials, GA ID and consent flag.
+    Lazy like PROFILE: built on first template access only.
     """
+    return {'SITE': SimpleLazyObject(lambda: build_site_settings(request))}
+
+
+def build_site_settings(request=None):
+    """Build the SITE dict from the SiteSettings singleton."""
     data = {}
     try:
         SiteSettings = apps.get_model('portfolio', 'SiteSettings')
-        obj = SiteSettings.objects.first()
+        obj = SiteSettings.get_solo(request)
     except Exception:
         obj = None
     if obj:
@@ -352,6 +407,7 @@ def site_settings(request):
             'logo_dark_url': (obj.logo_dark.url if obj.logo_dark else None),
             'favicon_url': (obj.favicon.url if obj.favicon else None),
             'home_avatar_url': (obj.home_avatar.url if getattr(obj, 'home_avatar', None) else None),
+            'home_avatar_image': image_payload(obj.home_avatar),
             'og_image_url': (obj.default_og_image.url if obj.default_og_image else None),
             'hero_heading': obj.hero_heading or None,
             'hero_subheading': obj.hero_subheading or None,
@@ -382,6 +438,7 @@ def site_settings(request):
             'logo_dark_url': None,
             'favicon_url': None,
             'home_avatar_url': None,
+            'home_avatar_image': None,
             'og_image_url': None,
             'hero_heading': None,
             'hero_subheading': None,
@@ -404,4 +461,4 @@ def site_settings(request):
             'consent_required': True,
             'primary_color': None,
         }
-    return {'SITE': data}
+    return data
@@ -0,0 +1,240 @@
+"""Responsive image derivatives.
+
+Each image listed in VARIANT_FIELDS gets resized copies at the VARIANT_WIDTHS below its
+own width (plus one at its own width, capped at the largest), encoded as AVIF, WebP and a
+JPEG/PNG fallback (AVIF and WebP only when the installed Pillow can encode them; a format
+whose encoder fails is left out). They are stored next to the original as
+`<original stem>.<content hash>.<width>w.<ext>`, so re-uploading the same bytes reuses the
+existing files and a changed image never collides with a cached old one.
+
+The list of generated files is kept on the object in `<field>_variants`:
+
+    {"source": "projects/shot.png", "hash": "3fa1c2d4e5f6", "width": 2400, "height": 1600,
+     "formats": {"avif": [[160, "projects/shot.3fa1c2d4e5f6.160w.avif"], ...],
+                 "webp": [...], "jpeg": [...]}}
+
+Generating derivatives (and measuring the image, portfolio.images) is too slow for the
+admin request that uploads it, so saving an object whose `source` no longer matches the
+stored file queues an `image` job (portfolio.jobs) instead; until it has run, pages show
+the original. `manage.py generate_image_variants` covers images uploaded earlier. The
+{% responsive_image %} tag (portfolio.templatetags.site_extras) renders the result.
+"""
+import hashlib
+import os
+from io import BytesIO
+
+from django.apps import apps
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps, features
+
+from blog.models import Post
+from .images import IMAGE_FIELDS, forget_image_metadata, touched_fields, update_image_metadata
+from .jobs import enqueue, register
+from .models import GalleryItem, Profile, Project, SiteSettings
+
+# model -> ImageFields that get derivatives (each has a `<field>_variants` JSONField)
+VARIANT_FIELDS = {
+    Project: ('image',),
+    Post: ('thumbnail',),
+    GalleryItem: ('image',),
+    Profile: ('avatar',),
+    SiteSettings: ('home_avatar',),
+}
+
+VARIANT_WIDTHS = (160, 320, 640, 960, 1280, 1920)
+
+# Best first: <source> elements are emitted in this order, the fallback goes on the <img>
+VARIANT_FORMATS = ('avif', 'webp')
+
+MIME_TYPES = {'avif': 'image/avif', 'webp': 'image/webp', 'jpeg': 'image/jpeg', 'png': 'image/png'}
+
+SAVE_OPTIONS = {
+    'avif': {'format': 'AVIF', 'quality': 50},
+    'webp': {'format': 'WEBP', 'quality': 80, 'method': 4},
+    'jpeg': {'format': 'JPEG', 'quality': 82, 'optimize': True, 'progressive': True},
+    'png': {'format': 'PNG', 'optimize': True},
+}
+
+EXTENSIONS = {'avif': 'avif', 'webp': 'webp', 'jpeg': 'jpg', 'png': 'png'}
+
+
+def variant_widths(width):
+    return [w for w in VARIANT_WIDTHS if w < width] + [min(width, VARIANT_WIDTHS[-1])]
+
+
+def _encode(img, fmt):
+    buf = BytesIO()
+    img.save(buf, **SAVE_OPTIONS[fmt])
+    return buf.getvalue()
+
+
+def available_formats():
+    """The VARIANT_FORMATS this Pillow build can encode."""
+    return [fmt for fmt in VARIANT_FORMATS if features.check(fmt)]
+
+
+def generate_variants(fieldfile):
+    """Write the derivatives of `fieldfile` (a stored ImageFieldFile) and return its
+    `<field>_variants` value, or None if the file is missing or not a readable image."""
+    storage = fieldfile.storage
+    try:
+        with storage.open(fieldfile.name, 'rb') as f:
+            data = f.read()
+        img = Image.open(BytesIO(data))
+        img.load()
+    except (OSError, ValueError, Image.DecompressionBombError):
+        return None
+    digest = hashlib.sha256(data).hexdigest()[:12]
+    variants = {'source': fieldfile.name, 'hash': digest, 'formats': {}}
+    if getattr(img, 'n_frames', 1) > 1:
+        # Animations would lose their frames; serve the original
+        variants.update(width=img.width, height=img.height)
+        return variants
+    img = ImageOps.exif_transpose(img)
+    has_alpha = img.mode in ('RGBA', 'LA', 'PA') or (img.mode == 'P' and 'transparency' in img.info)
+    img = img.convert('RGBA' if has_alpha else 'RGB')
+    variants.update(width=img.width, height=img.height)
+    stem = os.path.splitext(fieldfile.name)[0]
+    resized = {}
+    fallback = 'png' if has_alpha else 'jpeg'
+    for fmt in (*available_formats(), fallback):
+        files = []
+        try:
+            for w in variant_widths(img.width):
+                name = f'{stem}.{digest}.{w}w.{EXTENSIONS[fmt]}'
+                if not storage.exists(name):
+                    if w not in resized:
+                        resized[w] = img.resize((w, max(1, round(img.height * w / img.width))), Image.Resampling.LANCZOS)
+                    name = storage.save(name, ContentFile(_encode(resized[w], fmt)))
+                files.append([w, name])
+        except (OSError, ValueError, KeyError):
+            # The encoder is missing or choked on this image; serve the other formats
+            continue
+        variants['formats'][fmt] = files
+    if fallback not in variants['formats']:
+        # <picture> needs the fallback for its <img>; serve the original instead
+        variants['formats'] = {}
+    return variants
+
+
+def refresh_variants(instance, force=False):
+    """Regenerate the derivatives of `instance`'s images that changed since they were last
+    generated (all of them with `force`). Returns the names of the `<field>_variants`
+    attributes changed; the caller saves them."""
+    changed = []
+    for name in VARIANT_FIELDS[type(instance)]:
+        fieldfile = getattr(instance, name)
+        current = getattr(instance, f'{name}_variants')
+        if not fieldfile:
+            new = None
+        elif force or name in stale_variant_fields(instance):
+            new = generate_variants(fieldfile)
+        else:
+            continue
+        if new != current:
+            setattr(instance, f'{name}_variants', new)
+            changed.append(f'{name}_variants')
+    return changed
+
+
+def stale_variant_fields(instance):
+    """Names of `instance`'s image fields whose stored derivatives are not for the current file."""
+    stale = []
+    for name in VARIANT_FIELDS[type(instance)]:
+        fieldfile = getattr(instance, name)
+        variants = getattr(instance, f'{name}_variants') or {}
+        if fieldfile and variants.get('source') != fieldfile.name:
+            stale.append(name)
+    return stale
+
+
+def prepare_images(instance):
+    """pre_save: drop the metadata and derivatives of images that were replaced or removed."""
+    if type(instance) in IMAGE_FIELDS:
+        forget_image_metadata(instance)
+    for name in VARIANT_FIELDS[type(instance)]:
+        if not getattr(instance, name):
+            setattr(instance, f'{name}_variants', None)
+
+
+def queue_images(instance):
+    """post_save: queue the image job for `instance` if any of its images is unprocessed."""
+    if stale_variant_fields(instance):
+        label = instance._meta.label_lower
+        enqueue('image', f'{label}:{instance.pk}', {'model': label, 'pk': instance.pk})
+
+
+@register('image')
+def process_images(payload):
+    """Job handler: measure the object's image and generate its derivatives, then save
+    them with update_fields so the usual save signals refresh caches and search. Those
+    signals run in the worker process, so web processes only see the invalidation with a
+    shared cache backend (enforced by `check --deploy`, see portfolio.checks)."""
+    model = apps.get_model(payload['model'])
+    instance = model.objects.filter(pk=payload['pk']).first()
+    if instance is None:
+        return
+    # Measured first, so the dimensions, colour and placeholder are stored even when no
+    # derivative can be made
+    fields = update_image_metadata(instance) if model in IMAGE_FIELDS else []
+    fields += refresh_variants(instance)
+    if fields:
+        instance.save(update_fields=touched_fields(model, fields))
+
+
+def _current_variants(fieldfile):
+    """The stored derivatives of `fieldfile`, or {} while they are for a previous file."""
+    variants = getattr(fieldfile.instance, f'{fieldfile.field.name}_variants', None) or {}
+    return variants if variants.get('source') == fieldfile.name else {}
+
+
+def image_payload(fieldfile):
+    """Cache-friendly {'url', 'width', 'height', 'variants'} for a FieldFile, for template
+    data that is stored in the cache (PROFILE, SITE) instead of the model instance."""
+    if not fieldfile:
+        return None
+    variants = _current_variants(fieldfile)
+    return {'url': fieldfile.url, 'width': variants.get('width'), 'height': variants.get('height'),
+            'variants': variants}
+
+
+def image_source(image):
+    """Normalize an ImageFieldFile, an image_payload() dict or a bare URL to a dict of
+    url, width, height, color, placeholder and variants; None when there is no image."""
+    if not image:
+        return None
+    if isinstance(image, str):
+        return {'url': image, 'width': None, 'height': None, 'color': '', 'placeholder': '', 'variants': {}}
+    if isinstance(image, dict):
+        return {'color': '', 'placeholder': '', **image, 'variants': image.get('variants') or {}}
+    instance, name = image.instance, image.field.name
+    variants = _current_variants(image)
+    return {
+        'url': image.url,
+        # Stored dimensions only (image.width would open the file); the variants' are EXIF-rotated
+        'width': variants.get('width') or getattr(instance, f'{name}_width', None),
+        'height': variants.get('height') or getattr(instance, f'{name}_height', None),
+        'color': getattr(instance, f'{name}_color', ''),
+        'placeholder': getattr(instance, f'{name}_placeholder', ''),
+        'variants': variants,
+    }
+
+
+def variant_url(image, width, fmt='webp'):
+    """URL of the smallest `fmt` derivative at least `width` pixels wide (else the largest),
+    falling back to the original."""
+    source = image_source(image)
+    if source is None:
+        return ''
+    files = source['variants'].get('formats', {}).get(fmt)
+    if not files:
+        return source['url']
+    chosen = next((f for w, f in files if w >= width), files[-1][1])
+    return storage_url(image, chosen)
+
+
+def storage_url(image, name):
+    """URL of the derivative `name` of `image` (stored alongside the original)."""
+    storage = default_storage if isinstance(image, dict) else image.storage
+    return storage.url(name)
@@ -0,0 +1,88 @@
+"""Automatic "new posts" digest for subscribers.
+
+queue_digest() looks for blog posts published after the newest post of the previous digest
+(the watermark, Campaign.digest_until) with one query on the (published, published_at) index,
+renders the list once and starts it as a newsletter Campaign (see portfolio.newsletter),
+which `manage.py send_campaigns` delivers. The work is proportional to the number of new
+posts, and a run that finds none costs two small queries, so `manage.py send_digest` can
+run every few minutes. The first digest goes back INITIAL_DAYS.
+"""
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.template.defaultfilters import striptags, truncatewords
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from blog.models import Post
+from .models import Campaign
+from .newsletter import brand_context, start_campaign
+
+# How far back the very first digest looks
+INITIAL_DAYS = 7
+
+# Posts listed in one digest at most (the rest go in the next one)
+MAX_POSTS = 20
+
+EXCERPT_WORDS = 40
+
+
+def watermark():
+    """published_at of the newest post already sent in a digest, or None before the first."""
+    last = Campaign.objects.filter(digest_until__isnull=False).order_by('-digest_until').first()
+    return last.digest_until if last else None
+
+
+def digest_since(initial_days=INITIAL_DAYS):
+    """Where the next digest starts: the watermark, or `initial_days` ago for the first."""
+    return watermark() or timezone.now() - timedelta(days=initial_days)
+
+
+def new_posts(since, limit=MAX_POSTS):
+    """Posts published after `since`, oldest first. Posts are stamped when they are
+    published, not when they are written, so a draft published later is not missed."""
+    return list(
+        Post.objects.filter(published=True, published_at__gt=since)
+        .order_by('published_at')
+        .only('title', 'slug', 'content', 'category', 'published_at')[:limit]
+    )
+
+
+def render_digest(posts, site_url):
+    """Return (subject, text, html) listing `posts`; `site_url` makes links absolute."""
+    ctx = brand_context(site_url)
+    ctx['posts'] = [
+        {
+            'title': post.title,
+            'url': site_url + post.get_absolute_url(),
+            'category': post.category,
+            'published_at': post.published_at,
+            'excerpt': truncatewords(striptags(post.content), EXCERPT_WORDS),
+        }
+        for post in posts
+    ]
+    if len(posts) == 1:
+        subject = f"New on {ctx['brand_name']}: {posts[0].title}"
+    else:
+        subject = f"{len(posts)} new posts on {ctx['brand_name']}"
+    return (subject, render_to_string('emails/digest_body.txt', ctx).strip(),
+            render_to_string('emails/digest_body.html', ctx).strip())
+
+
+def queue_digest(site_url, initial_days=INITIAL_DAYS):
+    """Start a digest Campaign for posts published since the last one. Returns it, or None
+    when there is nothing new (or a concurrent run queued the same posts)."""
+    site_url = site_url.rstrip('/')
+    posts = new_posts(digest_since(initial_days))
+    if not posts:
+        return None
+    subject, text, html = render_digest(posts, site_url)
+    try:
+        with transaction.atomic():
+            # digest_until is unique, so overlapping runs cannot both queue these posts
+            campaign = Campaign.objects.create(
+                subject=subject, body=text, body_html=html, digest_until=posts[-1].published_at)
+            start_campaign(campaign, site_url)
+    except IntegrityError:
+        return None
+    return campaign
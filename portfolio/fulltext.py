@@ -0,0 +1,202 @@
+"""Database full-text indexes.
+
+A FullTextIndex describes the text columns of one table and picks a backend from the
+database vendor:
+  - SQLite: an FTS5 external-content table (<table>_fts) kept in sync by triggers,
+    ranked with weighted bm25() through the table's `rank` column
+  - PostgreSQL: a GIN index on a weighted to_tsvector() expression, ranked with ts_rank()
+  - anything else (or SQLite built without FTS5): an OR'd icontains scan, newest first
+
+Schema objects are created by install(), which is idempotent; migrations call it and
+post_migrate calls it again, because SQLite table rebuilds during later migrations drop
+the triggers. search() returns the queryset annotated with `search_rank` (higher is
+better) and ordered by it; rank_expression() exposes the same value for window functions.
+"""
+import re
+
+from django.db import connections
+from django.db.models import BooleanField, FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+
+_TERM_RE = re.compile(r'\w+', re.UNICODE)
+
+
+class IcontainsBackend:
+    """Portable fallback: an OR'd icontains scan over the indexed columns."""
+    name = 'icontains'
+
+    def __init__(self, index):
+        self.index = index
+
+    def install(self, connection):
+        return False
+
+    def uninstall(self, connection):
+        pass
+
+    def rank_expression(self, q):
+        return Value(0.0, output_field=FloatField())
+
+    def search(self, queryset, q):
+        match = Q()
+        for column in self.index.column_names:
+            match |= Q(**{f'{column}__icontains': q})
+        return queryset.filter(match).annotate(search_rank=self.rank_expression(q)).order_by(
+            '-search_rank', *self.index.tiebreak)
+
+
+class SqliteFtsBackend:
+    name = 'sqlite-fts5'
+
+    def __init__(self, index):
+        self.index = index
+        self.fts = f'{index.table}_fts'
+
+    def install(self, connection):
+        """Create the FTS5 table and sync triggers if missing; rebuild the index when
+        anything had to be (re)created. Returns False if SQLite lacks FTS5."""
+        table, fts = self.index.table, self.fts
+        cols = ', '.join(self.index.column_names)
+        new = ', '.join(f'new.{c}' for c in self.index.column_names)
+        old = ', '.join(f'old.{c}' for c in self.index.column_names)
+        delete_old = f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old});"
+        insert_new = f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new});"
+        triggers = {
+            f'{fts}_ai': f'AFTER INSERT ON {table} BEGIN {insert_new} END',
+            f'{fts}_ad': f'AFTER DELETE ON {table} BEGIN {delete_old} END',
+            f'{fts}_au': f'AFTER UPDATE ON {table} BEGIN {delete_old} {insert_new} END',
+        }
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT name FROM sqlite_master WHERE name IN (%s, %s, %s, %s)', [fts, *triggers])
+            existing = {row[0] for row in cursor.fetchall()}
+            if fts not in existing:
+                try:
+                    cursor.execute(
+                        f"CREATE VIRTUAL TABLE {fts} USING fts5({cols}, content='{table}', "
+                        "content_rowid='id', tokenize='porter unicode61 remove_diacritics 2')"
+                    )
+                except Exception:
+                    return False
+            missing = [name for name in triggers if name not in existing]
+            for name in missing:
+                cursor.execute(f'CREATE TRIGGER {name} {triggers[name]}')
+            if missing or fts not in existing:
+                cursor.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+            # Make the hidden `rank` column use the weighted bm25(); unlike a bm25() call it
+            # can be referenced anywhere in the query, window functions included
+            weights = ', '.join(str(w) for w in self.index.bm25_weights)
+            cursor.execute(f"INSERT INTO {fts}({fts}, rank) VALUES ('rank', 'bm25({weights})')")
+        return True
+
+    def uninstall(self, connection):
+        with connection.cursor() as cursor:
+            for suffix in ('ai', 'ad', 'au'):
+                cursor.execute(f'DROP TRIGGER IF EXISTS {self.fts}_{suffix}')
+            cursor.execute(f'DROP TABLE IF EXISTS {self.fts}')
+
+    def rank_expression(self, q):
+        # bm25 is lower-is-better; negate it so search_rank sorts like ts_rank
+        return RawSQL(f'-{self.fts}.rank', [], output_field=FloatField())
+
+    def search(self, queryset, q):
+        terms = _TERM_RE.findall(q)
+        if not terms:
+            return queryset.none()
+        # Quote every term (no FTS syntax from user input) and prefix-match it; terms are ANDed
+        match = ' '.join('"{}"*'.format(t.replace('"', '""')) for t in terms)
+        return queryset.extra(
+            tables=[self.fts],
+            where=[f'{self.fts}.rowid = {self.index.table}.id', f'{self.fts} MATCH %s'],
+            params=[match],
+        ).annotate(search_rank=self.rank_expression(q)).order_by('-search_rank', *self.index.tiebreak)
+
+
+class PostgresBackend:
+    name = 'postgres-tsvector'
+
+    def __init__(self, index):
+        self.index = index
+        self.vector = ' || '.join(
+            f"setweight(to_tsvector('{index.language}', coalesce({index.table}.{name}, '')), '{label}')"
+            for name, label, _ in index.columns
+        )
+        self.tsquery = f"websearch_to_tsquery('{index.language}', %s)"
+
+    def install(self, connection):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'CREATE INDEX IF NOT EXISTS {self.index.table}_search_gin ON {self.index.table} '
+                f'USING GIN (({self.vector}))'
+            )
+        return True
+
+    def uninstall(self, connection):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DROP INDEX IF EXISTS {self.index.table}_search_gin')
+
+    def rank_expression(self, q):
+        return RawSQL(f'ts_rank(({self.vector}), {self.tsquery})', [q], output_field=FloatField())
+
+    def search(self, queryset, q):
+        if not q.strip():
+            return queryset.none()
+        return queryset.alias(
+            _search_match=RawSQL(f'({self.vector}) @@ {self.tsquery}', [q], output_field=BooleanField()),
+        ).filter(_search_match=True).annotate(search_rank=self.rank_expression(q)).order_by(
+            '-search_rank', *self.index.tiebreak)
+
+
+_BACKENDS = {'sqlite': SqliteFtsBackend, 'postgresql': PostgresBackend}
+
+
+class FullTextIndex:
+    """Full-text index over `columns` of `table`: (column, Postgres weight A-D, bm25 weight)."""
+
+    def __init__(self, table, columns, tiebreak=('-pk',), language='english'):
+        self.table = table
+        self.columns = tuple(columns)
+        self.column_names = tuple(name for name, _, _ in self.columns)
+        self.bm25_weights = tuple(w for _, _, w in self.columns)
+        self.tiebreak = tuple(tiebreak)
+        self.language = language
+        # alias -> backend; FTS5 availability is probed once per process
+        self._resolved = {}
+
+    def _backend_for(self, connection):
+        return _BACKENDS.get(connection.vendor, IcontainsBackend)(self)
+
+    def backend(self, using='default'):
+        if using not in self._resolved:
+            connection = connections[using]
+            backend = self._backend_for(connection)
+            if isinstance(backend, SqliteFtsBackend) and not _table_exists(connection, backend.fts):
+                backend = IcontainsBackend(self)
+            self._resolved[using] = backend
+        return self._resolved[using]
+
+    def install(self, using='default'):
+        """Create or repair the index on the `using` database (skipped while the table
+        does not exist, e.g. after migrating backwards)."""
+        connection = connections[using]
+        self._resolved.pop(using, None)
+        if self.table not in connection.introspection.table_names():
+            return False
+        return self._backend_for(connection).install(connection)
+
+    def uninstall(self, using='default'):
+        connection = connections[using]
+        self._resolved.pop(using, None)
+        self._backend_for(connection).uninstall(connection)
+
+    def search(self, queryset, q):
+        """Filter `queryset` to matches for `q`, best match first."""
+        return self.backend(queryset.db).search(queryset, q)
+
+    def rank_expression(self, q, using='default'):
+        return self.backend(using).rank_expression(q)
+
+
+def _table_exists(connection, name):
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT 1 FROM sqlite_master WHERE name = %s', [name])
+        return cursor.fetchone() is not None
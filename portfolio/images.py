@@ -0,0 +1,114 @@
+"""Stored image metadata.
+
+Project.image, Post.thumbnail and GalleryItem.image each carry `<field>_width`,
+`<field>_height`, `<field>_bytes`, `<field>_color` and `<field>_placeholder` columns so
+pages can size images and paint a placeholder (a blurred micro-thumbnail over the dominant
+colour) without opening the files. They are cleared when the image
+changes and filled by the background image job (portfolio.derivatives);
+`manage.py backfill_image_metadata` fills them for files stored before they existed.
+
+They are plain columns rather than ImageField width_field/height_field: those hook
+post_init and re-read the file whenever a loaded row has no dimensions yet, which is the
+cost this avoids.
+"""
+import base64
+from io import BytesIO
+
+from PIL import Image
+
+from blog.models import Post
+from .models import GalleryItem, Project
+
+# model -> name of its ImageField
+IMAGE_FIELDS = {
+    Project: 'image',
+    Post: 'thumbnail',
+    GalleryItem: 'image',
+}
+
+METADATA_SUFFIXES = ('width', 'height', 'bytes', 'color', 'placeholder')
+
+# Edge length the image is reduced to before picking its dominant colour
+COLOR_SAMPLE = 64
+
+# Longest edge of the inline placeholder; ~150 bytes as WebP, upscaled (and so blurred) by the browser
+PLACEHOLDER_SIZE = 16
+
+EMPTY_METADATA = {'width': None, 'height': None, 'bytes': None, 'color': '', 'placeholder': ''}
+
+
+def metadata_fields(model):
+    name = IMAGE_FIELDS[model]
+    return [f'{name}_{suffix}' for suffix in METADATA_SUFFIXES]
+
+
+def touched_fields(model, fields):
+    """`fields` plus updated_at when `model` has one, for saves that bypass auto_now
+    handling (update_fields, bulk_update): conditional GET validators (portfolio.conditional)
+    are built from it, so pages showing the image must see it change."""
+    if any(f.name == 'updated_at' for f in model._meta.concrete_fields):
+        return [*fields, 'updated_at']
+    return list(fields)
+
+
+def dominant_color(img):
+    """Most common colour of `img` (a PIL image) as '#rrggbb'."""
+    if img.format == 'JPEG':
+        img.draft('RGB', (COLOR_SAMPLE, COLOR_SAMPLE))
+    sample = img.convert('RGB')
+    sample.thumbnail((COLOR_SAMPLE, COLOR_SAMPLE))
+    paletted = sample.quantize(colors=6)
+    _, index = max(paletted.getcolors())
+    r, g, b = paletted.getpalette()[index * 3:index * 3 + 3]
+    return f'#{r:02x}{g:02x}{b:02x}'
+
+
+def placeholder_uri(img):
+    """Tiny WebP of `img` as a data: URI, painted behind the <img> until it loads; '' for
+    images with transparency, where it would show through."""
+    if img.mode in ('RGBA', 'LA', 'PA') or 'transparency' in img.info:
+        return ''
+    sample = img.convert('RGB')
+    sample.thumbnail((PLACEHOLDER_SIZE, PLACEHOLDER_SIZE))
+    buf = BytesIO()
+    sample.save(buf, format='WEBP', quality=40)
+    return 'data:image/webp;base64,' + base64.b64encode(buf.getvalue()).decode('ascii')
+
+
+def read_image_metadata(fieldfile):
+    """Return {'width', 'height', 'bytes', 'color', 'placeholder'} for a stored ImageField
+    file, or None if it is missing or not a readable image."""
+    try:
+        with fieldfile.storage.open(fieldfile.name, 'rb') as f:
+            with Image.open(f) as img:
+                width, height = img.size
+                color = dominant_color(img)
+                placeholder = placeholder_uri(img)
+        size = fieldfile.storage.size(fieldfile.name)
+    except (OSError, ValueError, Image.DecompressionBombError):
+        return None
+    return {'width': width, 'height': height, 'bytes': size, 'color': color, 'placeholder': placeholder}
+
+
+def update_image_metadata(instance):
+    """Measure `instance`'s stored image into its metadata columns (cleared when there is
+    no readable image). Returns the names of the columns set."""
+    name = IMAGE_FIELDS[type(instance)]
+    fieldfile = getattr(instance, name)
+    meta = read_image_metadata(fieldfile) if fieldfile else None
+    if meta is None:
+        meta = EMPTY_METADATA
+    for suffix in METADATA_SUFFIXES:
+        setattr(instance, f'{name}_{suffix}', meta[suffix])
+    return metadata_fields(type(instance))
+
+
+def forget_image_metadata(instance):
+    """Clear the metadata columns when the image was just replaced or removed, so nothing
+    describes the old file until the new one has been measured."""
+    name = IMAGE_FIELDS[type(instance)]
+    fieldfile = getattr(instance, name)
+    if fieldfile and fieldfile._committed:
+        return
+    for suffix in METADATA_SUFFIXES:
+        setattr(instance, f'{name}_{suffix}', EMPTY_METADATA[suffix])
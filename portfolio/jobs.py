@@ -0,0 +1,121 @@
+"""Database-backed background jobs.
+
+A Job row names a handler (`kind`), what it works on (`key`) and a JSON payload. Handlers
+are plain functions taking the payload, registered with @register(kind). enqueue() adds a
+job unless an identical one is already pending; `manage.py run_media_worker` claims due
+jobs, runs their handlers in a process pool and records the outcome. A failed job is
+retried with exponential backoff until it has used `max_attempts`, then left as failed
+with its last error for the admin. A job whose worker died mid-run is claimed again once
+its lock is older than LOCK_SECONDS.
+
+With settings.JOBS_EAGER the handler runs inline as soon as the job is queued.
+"""
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Job
+
+HANDLERS = {}
+
+# Delay before the first retry; doubles with every further attempt
+RETRY_SECONDS = 30
+
+# A running job whose lock is older than this is assumed orphaned and claimed again
+LOCK_SECONDS = 60 * 10
+
+
+def register(kind):
+    def decorator(func):
+        HANDLERS[kind] = func
+        return func
+    return decorator
+
+
+def enqueue(kind, key, payload=None):
+    """Queue `kind` for `key` (or run it now with JOBS_EAGER). Returns the pending Job,
+    or None when run eagerly."""
+    payload = payload or {}
+    if getattr(settings, 'JOBS_EAGER', False):
+        HANDLERS[kind](payload)
+        return None
+    try:
+        with transaction.atomic():
+            job, created = Job.objects.get_or_create(
+                kind=kind, key=key, status=Job.STATUS_PENDING, defaults={'payload': payload})
+    except IntegrityError:
+        # Another request queued it between our lookup and insert
+        return Job.objects.filter(kind=kind, key=key, status=Job.STATUS_PENDING).first()
+    if not created and job.payload != payload:
+        Job.objects.filter(pk=job.pk, status=Job.STATUS_PENDING).update(payload=payload)
+    return job
+
+
+def claim(kinds, limit):
+    """Mark up to `limit` due jobs of `kinds` as running and return them. Each job is taken
+    with a conditional UPDATE, so concurrent workers never claim the same one."""
+    now = timezone.now()
+    due = Q(status=Job.STATUS_PENDING, run_after__lte=now) | Q(
+        status=Job.STATUS_RUNNING, locked_at__lt=now - timedelta(seconds=LOCK_SECONDS))
+    candidates = Job.objects.filter(due, kind__in=kinds).order_by('run_after', 'pk')
+    claimed = []
+    for job in candidates[:limit]:
+        taken = Job.objects.filter(pk=job.pk, status=job.status, locked_at=job.locked_at).update(
+            status=Job.STATUS_RUNNING, locked_at=now, attempts=F('attempts') + 1, updated_at=now)
+        if taken:
+            job.status, job.locked_at, job.attempts = Job.STATUS_RUNNING, now, job.attempts + 1
+            claimed.append(job)
+    return claimed
+
+
+def perform(kind, payload):
+    """Run the handler for one job; called in worker processes."""
+    close_old_connections()
+    try:
+        HANDLERS[kind](payload)
+    finally:
+        close_old_connections()
+
+
+def complete(job):
+    Job.objects.filter(pk=job.pk, locked_at=job.locked_at).update(
+        status=Job.STATUS_DONE, locked_at=None, last_error='', updated_at=timezone.now())
+
+
+def fail(job, error):
+    """Record `error` (an exception) and schedule a retry, or give up after max_attempts."""
+    now = timezone.now()
+    message = ''.join(traceback.format_exception(error)).strip()[-4000:]
+    if job.attempts >= job.max_attempts:
+        changes = {'status': Job.STATUS_FAILED}
+    else:
+        changes = {'status': Job.STATUS_PENDING,
+                   'run_after': now + timedelta(seconds=RETRY_SECONDS * 2 ** (job.attempts - 1))}
+    try:
+        with transaction.atomic():
+            Job.objects.filter(pk=job.pk, locked_at=job.locked_at).update(
+                locked_at=None, last_error=message, updated_at=now, **changes)
+    except IntegrityError:
+        # The same work was queued again meanwhile; that pending job supersedes this one
+        Job.objects.filter(pk=job.pk).update(
+            status=Job.STATUS_FAILED, locked_at=None, last_error=message, updated_at=now)
+
+
+def run_pending(kinds=None, limit=100):
+    """Claim and run due jobs in this process (tests, one-off maintenance). Returns the
+    number of jobs that succeeded."""
+    ok = 0
+    for job in claim(kinds or list(HANDLERS), limit):
+        try:
+            with transaction.atomic():
+                HANDLERS[job.kind](job.payload)
+        except Exception as exc:
+            fail(job, exc)
+        else:
+            complete(job)
+            ok += 1
+    return ok
@@ -0,0 +1,52 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.utils import timezone
+
+from portfolio.caching import invalidate_tags
+from portfolio.images import IMAGE_FIELDS, metadata_fields, touched_fields, update_image_metadata
+from portfolio.signals import CACHE_TAGS
+
+
+class Command(BaseCommand):
+    help = (
+        "Store width, height, byte size and dominant colour for images uploaded before those "
+        "columns existed (new uploads are measured on save)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Re-measure every image, not just unmeasured ones')
+        parser.add_argument('--batch-size', type=int, default=200)
+
+    def handle(self, *args, **opts):
+        touched = set()
+        for model, name in IMAGE_FIELDS.items():
+            # bulk_update skips auto_now; updated_at is set below so page validators change
+            fields = touched_fields(model, metadata_fields(model))
+            stamp = 'updated_at' in fields
+            qs = model.objects.exclude(**{f'{name}__isnull': True}).exclude(**{name: ''})
+            if not opts['force']:
+                qs = qs.filter(Q(**{f'{name}_width__isnull': True}) | Q(**{f'{name}_bytes__isnull': True})
+                               | Q(**{f'{name}_color': ''}) | Q(**{f'{name}_placeholder': ''}))
+            done = missing = 0
+            batch = []
+            for obj in qs.only('pk', name).iterator(chunk_size=opts['batch_size']):
+                update_image_metadata(obj)
+                if stamp:
+                    obj.updated_at = timezone.now()
+                if getattr(obj, f'{name}_width') is None:
+                    missing += 1
+                    self.stderr.write(f'{model.__name__} {obj.pk}: cannot read {getattr(obj, name).name}')
+                batch.append(obj)
+                if len(batch) == opts['batch_size']:
+                    model.objects.bulk_update(batch, fields)
+                    done += len(batch)
+                    batch = []
+            if batch:
+                model.objects.bulk_update(batch, fields)
+                done += len(batch)
+            if done:
+                touched.update(CACHE_TAGS[model])
+            self.stdout.write(f'{model._meta.label}: {done - missing} measured, {missing} unreadable')
+        if touched:
+            invalidate_tags(*touched)
+        self.stdout.write(self.style.SUCCESS('Done'))
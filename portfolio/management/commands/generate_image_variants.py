@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from portfolio.derivatives import VARIANT_FIELDS, refresh_variants
+from portfolio.images import touched_fields
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate resized AVIF/WebP/JPEG derivatives for images that have none yet, in this "
+        "process (uploads are handled by the image job; see run_media_worker)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Regenerate every image, not just those without derivatives')
+
+    def handle(self, *args, **opts):
+        for model, names in VARIANT_FIELDS.items():
+            has_image = Q()
+            for name in names:
+                has_image |= ~Q(**{f'{name}__isnull': True}) & ~Q(**{name: ''})
+            done = 0
+            for obj in model.objects.filter(has_image).iterator(chunk_size=100):
+                fields = refresh_variants(obj, force=opts['force'])
+                if fields:
+                    # A regular save, so caches, snapshots and search see the change
+                    obj.save(update_fields=touched_fields(model, fields))
+                    done += 1
+            self.stdout.write(f'{model._meta.label}: {done} updated')
+        self.stdout.write(self.style.SUCCESS('Done'))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from portfolio.search import DOCUMENT_INDEX, rebuild
+
+
+class Command(BaseCommand):
+    help = "Regenerate the site-wide search documents (normally maintained on save) and repair the full-text index."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default', help='Database alias to index')
+
+    def handle(self, *args, **opts):
+        DOCUMENT_INDEX.install(opts['database'])
+        count = rebuild(opts['database'])
+        self.stdout.write(self.style.SUCCESS(f'Indexed {count} documents'))
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from portfolio.pdfs import DOCUMENTS, offline_request, origin_allowed, pdf_version_of, render_pdf, site_origin
+
+
+class Command(BaseCommand):
+    help = (
+        "Render the resume and portfolio PDFs for the current content in this process, e.g. "
+        "after a deploy (content edits queue a re-render for run_media_worker)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('documents', nargs='*', help=f"Documents to render: {', '.join(DOCUMENTS)} (default: all)")
+        parser.add_argument('--origin', help='scheme://host links are built for (default: PDF_SITE_URL or the last download)')
+
+    def handle(self, *args, **opts):
+        origin = (opts['origin'] or site_origin()).rstrip('/')
+        if not origin:
+            raise CommandError('Unknown site origin; pass --origin or set PDF_SITE_URL')
+        if not origin_allowed(origin):
+            raise CommandError(f'The host of {origin} is not in ALLOWED_HOSTS')
+        unknown = set(opts['documents']) - set(DOCUMENTS)
+        if unknown:
+            raise CommandError(f"Unknown document(s): {', '.join(sorted(unknown))}")
+        for document in opts['documents'] or DOCUMENTS:
+            try:
+                path = render_pdf(document, offline_request(origin, document))
+            except Exception as exc:
+                self.stderr.write(f'{document}: {exc!r}')
+            else:
+                self.stdout.write(f'{document}: {path.name} (version {pdf_version_of(path)})')
+        self.stdout.write(self.style.SUCCESS('Done'))
@@ -0,0 +1,59 @@
+import multiprocessing
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+
+from portfolio import jobs
+
+# Job kinds this worker runs
+MEDIA_JOB_KINDS = ('image', 'pdf')
+
+
+class Command(BaseCommand):
+    help = (
+        "Process queued media jobs (image measuring and derivatives, PDF re-renders) in a "
+        "pool of worker processes. Runs until interrupted unless --once is given."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=os.cpu_count() or 2, help='Worker processes')
+        parser.add_argument('--poll', type=float, default=2.0, help='Seconds between checks for new jobs when idle')
+        parser.add_argument('--once', action='store_true', help='Exit when no due jobs are left')
+
+    def handle(self, *args, **opts):
+        processes = max(1, opts['processes'])
+        # Fresh interpreters: forked children would share the parent's database connections
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(processes, mp_context=context, initializer=django.setup) as pool:
+            running = {}
+            while True:
+                # Keep every process busy plus one queued job each, without hoarding claims
+                free = processes * 2 - len(running)
+                if free > 0:
+                    for job in jobs.claim(MEDIA_JOB_KINDS, free):
+                        running[pool.submit(jobs.perform, job.kind, job.payload)] = job
+                if not running:
+                    if opts['once']:
+                        break
+                    time.sleep(opts['poll'])
+                    continue
+                finished, _ = wait(running, timeout=opts['poll'], return_when=FIRST_COMPLETED)
+                for future in finished:
+                    job = running.pop(future)
+                    try:
+                        future.result()
+                    except BrokenProcessPool as exc:
+                        jobs.fail(job, exc)
+                        for other in running.values():
+                            jobs.fail(other, exc)
+                        raise CommandError('A worker process died; the pool cannot continue') from exc
+                    except Exception as exc:
+                        jobs.fail(job, exc)
+                        self.stderr.write(f'{job}: {exc!r}')
+                    else:
+                        jobs.complete(job)
+                        self.stdout.write(f'{job.kind} {job.key}: done')
@@ -0,0 +1,42 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from portfolio import newsletter
+from portfolio.models import Campaign
+
+
+class Command(BaseCommand):
+    help = (
+        "Send started newsletter campaigns to their subscribers in batches over one mail "
+        "connection each, at a limited rate. Interrupted runs resume where they stopped. Runs "
+        "until interrupted unless --once is given."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--campaign', type=int, help='Only this campaign (id)')
+        parser.add_argument('--batch-size', type=int, default=newsletter.BATCH_SIZE, help='Messages sent per connection')
+        parser.add_argument('--rate', type=float, default=newsletter.RATE_PER_SECOND, help='Max messages per second (0: unthrottled)')
+        parser.add_argument('--retry-failed', action='store_true', help='Queue failed deliveries again first')
+        parser.add_argument('--poll', type=float, default=30.0, help='Seconds between checks for started campaigns when idle')
+        parser.add_argument('--once', action='store_true', help='Exit when no started campaign is left')
+
+    def handle(self, *args, **opts):
+        campaigns = Campaign.objects.all()
+        if opts['campaign']:
+            campaigns = campaigns.filter(pk=opts['campaign'])
+        if opts['retry_failed']:
+            for campaign in campaigns.exclude(status=Campaign.STATUS_DRAFT):
+                retried = newsletter.retry_failed(campaign)
+                if retried:
+                    self.stdout.write(f'{campaign}: {retried} failed deliveries queued again')
+        while True:
+            sending = list(campaigns.filter(status=Campaign.STATUS_SENDING).order_by('started_at'))
+            if not sending:
+                if opts['once']:
+                    break
+                time.sleep(opts['poll'])
+                continue
+            for campaign in sending:
+                counts = newsletter.send_campaign(campaign, max(1, opts['batch_size']), opts['rate'])
+                self.stdout.write(f"{campaign}: {counts['sent']} sent, {counts['failed']} failed, {counts['skipped']} skipped")
@@ -0,0 +1,30 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from portfolio import digest
+
+
+class Command(BaseCommand):
+    help = (
+        "Queue a digest of blog posts published since the last digest to all active "
+        "subscribers (delivered by send_campaigns). Cheap when there is nothing new; meant "
+        "to run from cron every few minutes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--site-url', default=getattr(settings, 'SITE_URL', ''), help='scheme://host for links (default: SITE_URL)')
+        parser.add_argument('--initial-days', type=int, default=digest.INITIAL_DAYS, help='How far back the first digest looks')
+        parser.add_argument('--dry-run', action='store_true', help='List the posts the next digest would contain')
+
+    def handle(self, *args, **opts):
+        if not opts['site_url']:
+            raise CommandError('Set SITE_URL or pass --site-url')
+        if opts['dry_run']:
+            for post in digest.new_posts(digest.digest_since(opts['initial_days'])):
+                self.stdout.write(f'{post.published_at:%Y-%m-%d %H:%M} {post.title}')
+            return
+        campaign = digest.queue_digest(opts['site_url'], opts['initial_days'])
+        if campaign is None:
+            self.stdout.write('No new posts')
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Queued "{campaign.subject}" to {campaign.deliveries.count()} subscribers'))
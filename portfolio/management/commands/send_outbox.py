@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from portfolio import outbox
+
+
+class Command(BaseCommand):
+    help = (
+        "Send queued emails (contact notifications and acknowledgements) in batches over one "
+        "mail connection, retrying failures with backoff. Runs until interrupted unless --once "
+        "is given."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=outbox.BATCH_SIZE, help='Emails sent per connection')
+        parser.add_argument('--poll', type=float, default=5.0, help='Seconds between checks for new emails when idle')
+        parser.add_argument('--once', action='store_true', help='Exit when no due emails are left')
+
+    def handle(self, *args, **opts):
+        batch_size = max(1, opts['batch_size'])
+        while True:
+            emails = outbox.claim(batch_size)
+            if not emails:
+                if opts['once']:
+                    break
+                time.sleep(opts['poll'])
+                continue
+            sent, failed = outbox.send_emails(emails)
+            self.stdout.write(f'{sent} sent, {failed} failed')
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.6 on 2026-10-18 14:13
+
+from django.db import migrations, models
+
+
+def install_search(apps, schema_editor):
+    from portfolio.search import DOCUMENT_INDEX
+    DOCUMENT_INDEX.install(schema_editor.connection.alias)
+
+
+def uninstall_search(apps, schema_editor):
+    from portfolio.search import DOCUMENT_INDEX
+    DOCUMENT_INDEX.uninstall(schema_editor.connection.alias)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portfolio', '0042_project_service_tag_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('project', 'Projects'), ('post', 'Blog posts'), ('service', 'Services'), ('testimonial', 'Testimonials'), ('gallery', 'Gallery')], max_length=20)),
+                ('object_id', models.PositiveBigIntegerField()),
+                ('title', models.CharField(max_length=300)),
+                ('keywords', models.TextField(blank=True, help_text='Tags, technologies, category')),
+                ('body', models.TextField(blank=True)),
+                ('url', models.CharField(max_length=500)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('kind', 'object_id'), name='search_document_unique_object')],
+            },
+        ),
+        migrations.RunPython(install_search, uninstall_search),
+    ]
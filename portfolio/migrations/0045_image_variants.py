@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portfolio', '0044_image_metadata'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='galleryitem',
+            name='image_variants',
+            field=models.JSONField(blank=True, editable=False, help_text='Resized AVIF/WebP copies (portfolio.derivatives)', null=True),
+        ),
+        migrations.AddField(
+            model_name='profile',
+            name='avatar_variants',
+            field=models.JSONField(blank=True, editable=False, help_text='Resized AVIF/WebP copies (portfolio.derivatives)', null=True),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='image_variants',
+            field=models.JSONField(blank=True, editable=False, help_text='Resized AVIF/WebP copies (portfolio.derivatives)', null=True),
+        ),
+        migrations.AddField(
+            model_name='sitesettings',
+            name='home_avatar_variants',
+            field=models.JSONField(blank=True, editable=False, help_text='Resized AVIF/WebP copies (portfolio.derivatives)', null=True),
+        ),
+    ]
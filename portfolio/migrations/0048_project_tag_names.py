@@ -0,0 +1,25 @@
+from django.db import migrations, models
+
+
+def populate_tag_names(apps, schema_editor):
+    Project = apps.get_model('portfolio', 'Project')
+    projects = list(Project.objects.prefetch_related('tags'))
+    for project in projects:
+        project.tag_names = sorted(tag.name for tag in project.tags.all())
+    Project.objects.bulk_update(projects, ['tag_names'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portfolio', '0047_image_placeholder'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='project',
+            name='tag_names',
+            field=models.JSONField(blank=True, default=list, editable=False),
+        ),
+        migrations.RunPython(populate_tag_names, migrations.RunPython.noop),
+    ]
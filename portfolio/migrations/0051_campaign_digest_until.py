@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portfolio', '0050_campaign'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='campaign',
+            name='digest_until',
+            field=models.DateTimeField(blank=True, editable=False, null=True, unique=True),
+        ),
+    ]
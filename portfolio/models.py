@@ -1,6 +1,7 @@
 from django.db import models
 import uuid
 from django.urls import reverse
+from django.utils import timezone
 
 
 class Message(models.Model):
@@ -40,13 +41,23 @@ class Project(models.Model):
     key = models.UUIDField(default=uuid.uuid4, unique=True, editable=False, null=True)
     description = models.TextField()
     technologies = models.CharField(max_length=200, help_text="Comma-separated list of technologies", blank=True)
+    # Names of `tags`, kept in sync by portfolio.signals so listings need no tag queries
+    tag_names = models.JSONField(default=list, blank=True, editable=False)
     category = models.CharField(max_length=100, blank=True)
     date = models.DateField()
     image = models.ImageField(upload_to='projects/', blank=True, null=True)
+    # Filled from the file on upload (portfolio.images) so pages never open it to size it
+    image_width = models.PositiveIntegerField(blank=True, null=True, editable=False)
+    image_height = models.PositiveIntegerField(blank=True, null=True, editable=False)
+    image_bytes = models.PositiveIntegerField(blank=True, null=True, editable=False)
+    image_color = models.CharField(max_length=7, blank=True, editable=False, help_text="Dominant colour, #rrggbb")
+    image_placeholder = models.TextField(blank=True, editable=False, help_text="Tiny blurred preview as a data: URI, shown while the image loads")
+    image_variants = models.JSONField(blank=True, null=True, editable=False, help_text="Resized AVIF/WebP copies (portfolio.derivatives)")
     url = models.URLField(blank=True)
     # Admin-managed featured selection and ordering
     is_featured = models.BooleanField(default=False, help_text="Show on homepage featured section")
     featured_order = models.PositiveIntegerField(default=0, help_text="Lower = earlier in featured list")
+    updated_at = models.DateTimeField(auto_now=True)
     
     # New: normalized tags for stronger queries/admin
     # Keep the legacy 'technologies' field for backward compatibility and migration
@@ -61,11 +72,23 @@ class Project(models.Model):
         return self.title
 
     def tech_list(self):
-        # Prefer normalized tags if available, else fallback to legacy comma-separated field
-        if hasattr(self, 'tags') and self.tags.exists():
-            return list(self.tags.values_list('name', flat=True))
+        # Prefer normalized tags if available, else fallback to legacy comma-separated field.
+        # Names come from a prefetch_related('tags') cache when there is one, else from the
+        # denormalized tag_names column; neither costs a query per project
+        prefetched = getattr(self, '_prefetched_objects_cache', {})
+        if 'tags' in prefetched:
+            names = [tag.name for tag in prefetched['tags']]
+        else:
+            names = self.tag_names
+        if names:
+            return list(names)
         return [tech.strip() for tech in (self.technologies or '').split(',') if tech.strip()]
 
+    def refresh_tag_names(self):
+        """Re-read tag_names from `tags` and store it without a full save (no signals)."""
+        self.tag_names = list(self.tags.values_list('name', flat=True))
+        Project.objects.filter(pk=self.pk).update(tag_names=self.tag_names)
+
     def get_absolute_url(self):
         return reverse('portfolio:project_detail', args=[self.slug])
 
@@ -91,6 +114,7 @@ class Testimonial(models.Model):
 class Tag(models.Model):
     name = models.CharField(max_length=50, unique=True)
     key = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['name']
@@ -114,6 +138,7 @@ class Profile(models.Model):
     phone = models.CharField(max_length=50, blank=True)
     whatsapp = models.CharField(max_length=50, blank=True)
     avatar = models.ImageField(upload_to='profile/', blank=True, null=True)
+    avatar_variants = models.JSONField(blank=True, null=True, editable=False, help_text="Resized AVIF/WebP copies (portfolio.derivatives)")
     key = models.UUIDField(default=uuid.uuid4, unique=True, editable=False, null=True)
 
     # JSON content
@@ -311,6 +336,7 @@ class SiteSettings(models.Model):
     active_profile = models.ForeignKey('Profile', on_delete=models.SET_NULL, null=True, blank=True, related_name='site_settings', help_text="Select the Profile to use for homepage avatar and global profile data.")
     # Optional override: homepage avatar image directly from Site Settings
     home_avatar = models.ImageField(upload_to='site/', blank=True, null=True, help_text="Override homepage avatar; if set, used instead of Profile.avatar")
+    home_avatar_variants = models.JSONField(blank=True, null=True, editable=False, help_text="Resized AVIF/WebP copies (portfolio.derivatives)")
     # Testimonials section controls
     show_testimonials_home = models.BooleanField(default=True, help_text="Show the 'What clients say' section on the homepage")
     testimonials_home_limit = models.PositiveSmallIntegerField(default=6, help_text="Max number of testimonials to show on the homepage")
@@ -318,6 +344,9 @@ class SiteSettings(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    # Per-process ((pk, updated_at), instance) pair reused while the row is unchanged
+    _solo = None
+
     class Meta:
         verbose_name = "Site Settings"
         verbose_name_plural = "Site Settings"
@@ -325,6 +354,29 @@ class SiteSettings(models.Model):
     def __str__(self):
         return "Site Settings"
 
+    @classmethod
+    def get_solo(cls, request=None):
+        """Return the single SiteSettings row (or None) shared by all callers.
+        The instance is kept in-process and revalidated with one cheap query of the row's
+        (pk, updated_at), so every worker sees admin edits on its next call whatever the
+        cache backend; when a request is given the result is also memoized on it, so that
+        check runs once per request. Treat the returned object as read-only.
+        """
+        if request is not None and hasattr(request, '_site_settings'):
+            return request._site_settings
+        stamp = cls.objects.order_by('pk').values_list('pk', 'updated_at').first()
+        solo = cls._solo
+        if stamp is None:
+            obj = None
+        elif solo is not None and solo[0] == stamp:
+            obj = solo[1]
+        else:
+            obj = cls.objects.filter(pk=stamp[0]).first()
+        cls._solo = (stamp, obj)
+        if request is not None:
+            request._site_settings = obj
+        return obj
+
 
 class Service(models.Model):
     """Services offered, editable via admin and displayed on Services page."""
@@ -337,6 +389,7 @@ class Service(models.Model):
     is_published = models.BooleanField(default=True)
     order = models.PositiveIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['order', 'title']
@@ -375,6 +428,13 @@ class GalleryItem(models.Model):
     """
     title = models.CharField(max_length=200)
     image = models.ImageField(upload_to='gallery/')
+    # Filled from the file on upload (portfolio.images) so pages never open it to size it
+    image_width = models.PositiveIntegerField(blank=True, null=True, editable=False)
+    image_height = models.PositiveIntegerField(blank=True, null=True, editable=False)
+    image_bytes = models.PositiveIntegerField(blank=True, null=True, editable=False)
+    image_color = models.CharField(max_length=7, blank=True, editable=False, help_text="Dominant colour, #rrggbb")
+    image_placeholder = models.TextField(blank=True, editable=False, help_text="Tiny blurred preview as a data: URI, shown while the image loads")
+    image_variants = models.JSONField(blank=True, null=True, editable=False, help_text="Resized AVIF/WebP copies (portfolio.derivatives)")
     key = models.UUIDField(default=uuid.uuid4, unique=True, editable=False, null=True)
     alt_text = models.CharField(max_length=255, blank=True, help_text="Accessible alternative text for screen readers.")
     caption = models.CharField(max_length=300, blank=True)
@@ -423,3 +483,174 @@ class Subscription(models.Model):
 
     def __str__(self):
         return f"{self.email} ({'active' if self.active else 'inactive'})"
+
+
+class SearchDocument(models.Model):
+    """Denormalized, publicly visible copy of searchable content (one row per object),
+    kept up to date by portfolio.signals and queried by the site-wide /search/ page."""
+    KIND_CHOICES = (
+        ('project', 'Projects'),
+        ('post', 'Blog posts'),
+        ('service', 'Services'),
+        ('testimonial', 'Testimonials'),
+        ('gallery', 'Gallery'),
+    )
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    object_id = models.PositiveBigIntegerField()
+    title = models.CharField(max_length=300)
+    keywords = models.TextField(blank=True, help_text="Tags, technologies, category")
+    body = models.TextField(blank=True)
+    url = models.CharField(max_length=500)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'object_id'], name='search_document_unique_object'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()}: {self.title}"
+
+
+class Job(models.Model):
+    """Queued background work (see portfolio.jobs), e.g. measuring and resizing an uploaded
+    image; processed by `manage.py run_media_worker`."""
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = (
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_DONE, 'Done'),
+        (STATUS_FAILED, 'Failed'),
+    )
+    kind = models.CharField(max_length=50)
+    key = models.CharField(max_length=200, help_text="What the job works on; at most one pending job per kind and key")
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_after = models.DateTimeField(default=timezone.now, help_text="Not picked up before this time (retry backoff)")
+    locked_at = models.DateTimeField(blank=True, null=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'run_after'], name='job_status_run_after_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'key'], condition=models.Q(status='pending'),
+                                    name='job_one_pending_per_key'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} {self.key} ({self.status})"
+
+
+class OutboundEmail(models.Model):
+    """An email queued by the site (see portfolio.outbox), written in the same transaction as
+    the change it reports and delivered by `manage.py send_outbox`."""
+    STATUS_PENDING = 'pending'
+    STATUS_SENDING = 'sending'
+    STATUS_SENT = 'sent'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = (
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_SENDING, 'Sending'),
+        (STATUS_SENT, 'Sent'),
+        (STATUS_FAILED, 'Failed'),
+    )
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    html_body = models.TextField(blank=True)
+    from_email = models.CharField(max_length=254, blank=True, help_text="Blank: DEFAULT_FROM_EMAIL")
+    to = models.JSONField(default=list)
+    attachments = models.JSONField(default=list, blank=True, help_text="Storage names of files attached when sending")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    send_after = models.DateTimeField(default=timezone.now, help_text="Not sent before this time (retry backoff)")
+    locked_at = models.DateTimeField(blank=True, null=True)
+    last_error = models.TextField(blank=True)
+    sent_at = models.DateTimeField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'send_after'], name='email_status_send_after_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} → {', '.join(self.to)} ({self.status})"
+
+
+class Campaign(models.Model):
+    """A newsletter mailed to every active Subscription (see portfolio.newsletter). The body
+    is rendered once; only the unsubscribe link differs per recipient."""
+    STATUS_DRAFT = 'draft'
+    STATUS_SENDING = 'sending'
+    STATUS_SENT = 'sent'
+    STATUS_CHOICES = (
+        (STATUS_DRAFT, 'Draft'),
+        (STATUS_SENDING, 'Sending'),
+        (STATUS_SENT, 'Sent'),
+    )
+    subject = models.CharField(max_length=255)
+    body = models.TextField(help_text="Plain-text body")
+    body_html = models.TextField(blank=True, help_text="Optional HTML body; blank: the plain text with line breaks")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_DRAFT, editable=False)
+    site_url = models.CharField(max_length=200, blank=True, editable=False, help_text="Origin unsubscribe links point to; set when sending starts")
+    # Set on automatic digests (portfolio.digest): published_at of the newest post included
+    digest_until = models.DateTimeField(blank=True, null=True, unique=True, editable=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(blank=True, null=True, editable=False)
+    finished_at = models.DateTimeField(blank=True, null=True, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return self.subject
+
+
+class CampaignDelivery(models.Model):
+    """One recipient of a Campaign; its status is the send progress, so an interrupted run
+    resumes where it stopped."""
+    STATUS_PENDING = 'pending'
+    STATUS_SENDING = 'sending'
+    STATUS_SENT = 'sent'
+    STATUS_FAILED = 'failed'
+    STATUS_SKIPPED = 'skipped'
+    STATUS_CHOICES = (
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_SENDING, 'Sending'),
+        (STATUS_SENT, 'Sent'),
+        (STATUS_FAILED, 'Failed'),
+        (STATUS_SKIPPED, 'Skipped'),
+    )
+    campaign = models.ForeignKey(Campaign, related_name='deliveries', on_delete=models.CASCADE)
+    subscription = models.ForeignKey(Subscription, related_name='deliveries', on_delete=models.SET_NULL, null=True, blank=True)
+    email = models.EmailField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    sent_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        ordering = ['pk']
+        indexes = [
+            models.Index(fields=['campaign', 'status'], name='delivery_campaign_status_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['campaign', 'email'], name='delivery_one_per_email'),
+        ]
+
+    def __str__(self):
+        return f"{self.campaign} → {self.email} ({self.status})"
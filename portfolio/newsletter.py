@@ -0,0 +1,163 @@
+"""Newsletter campaigns to the Subscription list.
+
+start_campaign() snapshots the active subscribers into one CampaignDelivery row each and
+marks the Campaign as sending; `manage.py send_campaigns` then works through the pending
+rows. The email is rendered once per campaign with a placeholder for the unsubscribe link,
+which is the only per-recipient part. Deliveries are sent in batches, each over one backend
+connection, at no more than a configurable rate.
+
+Every delivery is claimed (pending -> sending) right before it is sent and marked sent or
+failed right after, so an interrupted run resumes with the next pending row and never sends
+twice. A crash can leave at most the one in-flight delivery as 'sending'; it is not retried
+automatically because it may already have gone out.
+"""
+import time
+import traceback
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import transaction
+from django.db.models import F
+from django.template.loader import render_to_string
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.html import escape
+
+from .models import Campaign, CampaignDelivery, SiteSettings, Subscription
+
+# Deliveries sent per connection
+BATCH_SIZE = 100
+
+# Default ceiling on messages per second (0: unthrottled)
+RATE_PER_SECOND = 5
+
+UNSUBSCRIBE_PLACEHOLDER = '%%UNSUBSCRIBE_URL%%'
+
+
+def start_campaign(campaign, site_url):
+    """Queue `campaign` for every active subscriber; `site_url` (scheme://host) is where
+    unsubscribe links point. Returns False if it was not a draft."""
+    now = timezone.now()
+    with transaction.atomic():
+        started = Campaign.objects.filter(pk=campaign.pk, status=Campaign.STATUS_DRAFT).update(
+            status=Campaign.STATUS_SENDING, site_url=site_url.rstrip('/'), started_at=now, updated_at=now)
+        if not started:
+            return False
+        batch = []
+        for pk, email in Subscription.objects.filter(active=True).order_by('pk').values_list('pk', 'email').iterator(chunk_size=BATCH_SIZE * 10):
+            batch.append(CampaignDelivery(campaign_id=campaign.pk, subscription_id=pk, email=email))
+            if len(batch) >= BATCH_SIZE * 10:
+                CampaignDelivery.objects.bulk_create(batch, ignore_conflicts=True)
+                batch = []
+        CampaignDelivery.objects.bulk_create(batch, ignore_conflicts=True)
+    campaign.refresh_from_db()
+    return True
+
+
+def brand_context(site_url):
+    """Branding for email templates (site_name, brand_name, logo_url, primary_color), from
+    SiteSettings; `site_url` makes the logo URL absolute."""
+    site_name = getattr(settings, 'SITE_NAME', 'Portfolio')
+    ctx = {'site_name': site_name, 'brand_name': site_name, 'logo_url': None, 'primary_color': '#111'}
+    ss = SiteSettings.get_solo()
+    if ss:
+        if getattr(ss, 'brand_name', None):
+            ctx['brand_name'] = ss.brand_name
+        img = getattr(ss, 'logo_light', None) or getattr(ss, 'logo', None)
+        if img:
+            ctx['logo_url'] = img.url if '://' in img.url else site_url + img.url
+        pc = (getattr(ss, 'primary_color', '') or '').strip()
+        if pc:
+            ctx['primary_color'] = pc
+    return ctx
+
+
+def render_campaign(campaign):
+    """Return (text, html) of `campaign` with UNSUBSCRIBE_PLACEHOLDER for the link."""
+    ctx = {
+        **brand_context(campaign.site_url),
+        'subject': campaign.subject,
+        'body': campaign.body,
+        'body_html': campaign.body_html,
+        'unsubscribe_url': UNSUBSCRIBE_PLACEHOLDER,
+    }
+    return render_to_string('emails/campaign.txt', ctx), render_to_string('emails/campaign.html', ctx)
+
+
+def personalize(campaign, rendered, delivery, connection=None):
+    """The message for one recipient: the rendered campaign with their unsubscribe link."""
+    text, html = rendered
+    url = campaign.site_url + reverse('portfolio:unsubscribe', kwargs={'token': str(delivery.subscription.token)})
+    message = EmailMultiAlternatives(
+        campaign.subject, text.replace(UNSUBSCRIBE_PLACEHOLDER, url), None, [delivery.email],
+        connection=connection, headers={'List-Unsubscribe': f'<{url}>'})
+    message.attach_alternative(html.replace(UNSUBSCRIBE_PLACEHOLDER, escape(url)), 'text/html')
+    return message
+
+
+def _finish(delivery, status, error=None):
+    changes = {'status': status}
+    if status == CampaignDelivery.STATUS_SENT:
+        changes['sent_at'] = timezone.now()
+    if error is not None:
+        changes['last_error'] = ''.join(traceback.format_exception(error)).strip()[-4000:]
+    CampaignDelivery.objects.filter(pk=delivery.pk).update(**changes)
+
+
+def send_campaign(campaign, batch_size=BATCH_SIZE, rate=RATE_PER_SECOND):
+    """Send the pending deliveries of a started `campaign`, then mark it sent. Returns a
+    dict of sent/failed/skipped counts for this run."""
+    rendered = render_campaign(campaign)
+    interval = 1 / rate if rate else 0
+    counts = {'sent': 0, 'failed': 0, 'skipped': 0}
+    pending = campaign.deliveries.filter(status=CampaignDelivery.STATUS_PENDING).select_related('subscription')
+    while True:
+        batch = list(pending[:batch_size])
+        if not batch:
+            break
+        connection = get_connection()
+        try:
+            for delivery in batch:
+                claimed = CampaignDelivery.objects.filter(pk=delivery.pk, status=CampaignDelivery.STATUS_PENDING).update(
+                    status=CampaignDelivery.STATUS_SENDING, attempts=F('attempts') + 1)
+                if not claimed:
+                    continue  # another run got it
+                sub = delivery.subscription
+                if sub is None or not sub.active or not sub.token:
+                    # Unsubscribed since the campaign started
+                    _finish(delivery, CampaignDelivery.STATUS_SKIPPED)
+                    counts['skipped'] += 1
+                    continue
+                started = time.monotonic()
+                try:
+                    # No-op while open; reconnects after a failure closed it
+                    connection.open()
+                    if not connection.send_messages([personalize(campaign, rendered, delivery, connection)]):
+                        raise RuntimeError('The email backend did not accept the message')
+                except Exception as exc:
+                    _finish(delivery, CampaignDelivery.STATUS_FAILED, exc)
+                    counts['failed'] += 1
+                    connection.close()
+                else:
+                    _finish(delivery, CampaignDelivery.STATUS_SENT)
+                    counts['sent'] += 1
+                wait = interval - (time.monotonic() - started)
+                if wait > 0:
+                    time.sleep(wait)
+        finally:
+            connection.close()
+    if not campaign.deliveries.filter(status=CampaignDelivery.STATUS_PENDING).exists():
+        now = timezone.now()
+        Campaign.objects.filter(pk=campaign.pk, status=Campaign.STATUS_SENDING).update(
+            status=Campaign.STATUS_SENT, finished_at=now, updated_at=now)
+    return counts
+
+
+def retry_failed(campaign):
+    """Queue the failed deliveries of `campaign` again. Returns how many."""
+    retried = campaign.deliveries.filter(status=CampaignDelivery.STATUS_FAILED).update(
+        status=CampaignDelivery.STATUS_PENDING)
+    if retried:
+        Campaign.objects.filter(pk=campaign.pk).update(
+            status=Campaign.STATUS_SENDING, finished_at=None, updated_at=timezone.now())
+    return retried
@@ -0,0 +1,127 @@
+"""Transactional email outbox.
+
+Views call queue_email() instead of sending: it only inserts an OutboundEmail row, in the
+same transaction as the data the email is about, so a request never waits on SMTP and no
+email goes out for a change that was rolled back. `manage.py send_outbox` claims due
+emails in batches and sends each batch over one reused backend connection. Attachments
+are stored files, read one at a time at send time. A failed send is retried with
+exponential backoff until it has used `max_attempts`, then left as failed with its last
+error for the admin. An email whose sender died mid-batch is claimed again once its lock
+is older than LOCK_SECONDS.
+
+With settings.JOBS_EAGER queued emails are sent as soon as the transaction commits.
+"""
+import os
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import OutboundEmail
+
+# Emails claimed and sent per connection
+BATCH_SIZE = 50
+
+# Delay before the first retry; doubles with every further attempt
+RETRY_SECONDS = 60
+
+# A sending email whose lock is older than this is assumed orphaned and claimed again
+LOCK_SECONDS = 60 * 10
+
+
+def queue_email(subject, body, to, from_email='', html_body='', attachments=()):
+    """Queue an email; `attachments` are names of files in default storage. Returns the
+    OutboundEmail."""
+    email = OutboundEmail.objects.create(
+        subject=subject[:255], body=body, html_body=html_body or '', from_email=from_email or '',
+        to=list(to), attachments=list(attachments))
+    if getattr(settings, 'JOBS_EAGER', False):
+        transaction.on_commit(lambda: send_emails(claim(1, pks=[email.pk])))
+    return email
+
+
+def claim(limit, pks=None):
+    """Mark up to `limit` due emails (optionally only those in `pks`) as sending and return
+    them. Each is taken with a conditional UPDATE, so concurrent senders never send the
+    same one."""
+    now = timezone.now()
+    due = Q(status=OutboundEmail.STATUS_PENDING, send_after__lte=now) | Q(
+        status=OutboundEmail.STATUS_SENDING, locked_at__lt=now - timedelta(seconds=LOCK_SECONDS))
+    candidates = OutboundEmail.objects.filter(due).order_by('send_after', 'pk')
+    if pks is not None:
+        candidates = candidates.filter(pk__in=pks)
+    claimed = []
+    for email in candidates[:limit]:
+        taken = OutboundEmail.objects.filter(pk=email.pk, status=email.status, locked_at=email.locked_at).update(
+            status=OutboundEmail.STATUS_SENDING, locked_at=now, attempts=F('attempts') + 1, updated_at=now)
+        if taken:
+            email.status, email.locked_at, email.attempts = OutboundEmail.STATUS_SENDING, now, email.attempts + 1
+            claimed.append(email)
+    return claimed
+
+
+def build_message(email, connection=None):
+    message = EmailMultiAlternatives(
+        email.subject, email.body, email.from_email or None, email.to, connection=connection)
+    if email.html_body:
+        message.attach_alternative(email.html_body, 'text/html')
+    for name in email.attachments:
+        with default_storage.open(name, 'rb') as f:
+            # Content type is guessed from the file name
+            message.attach(os.path.basename(name), f.read())
+    return message
+
+
+def _sent(email):
+    now = timezone.now()
+    OutboundEmail.objects.filter(pk=email.pk, locked_at=email.locked_at).update(
+        status=OutboundEmail.STATUS_SENT, locked_at=None, last_error='', sent_at=now, updated_at=now)
+
+
+def _failed(email, error):
+    """Record `error` (an exception) and schedule a retry, or give up after max_attempts."""
+    now = timezone.now()
+    message = ''.join(traceback.format_exception(error)).strip()[-4000:]
+    if email.attempts >= email.max_attempts:
+        changes = {'status': OutboundEmail.STATUS_FAILED}
+    else:
+        changes = {'status': OutboundEmail.STATUS_PENDING,
+                   'send_after': now + timedelta(seconds=RETRY_SECONDS * 2 ** (email.attempts - 1))}
+    OutboundEmail.objects.filter(pk=email.pk, locked_at=email.locked_at).update(
+        locked_at=None, last_error=message, updated_at=now, **changes)
+
+
+def send_emails(emails):
+    """Send claimed `emails` over one connection. Returns (sent, failed)."""
+    sent = failed = 0
+    if not emails:
+        return sent, failed
+    connection = get_connection()
+    try:
+        for email in emails:
+            try:
+                # No-op while open; reconnects after a failure closed it
+                connection.open()
+                if not connection.send_messages([build_message(email, connection)]):
+                    raise RuntimeError('The email backend did not accept the message')
+            except Exception as exc:
+                _failed(email, exc)
+                failed += 1
+                # The connection may be broken; start the next email on a fresh one
+                connection.close()
+            else:
+                _sent(email)
+                sent += 1
+    finally:
+        connection.close()
+    return sent, failed
+
+
+def send_pending(limit=BATCH_SIZE):
+    """Claim up to `limit` due emails and send them. Returns (sent, failed)."""
+    return send_emails(claim(limit))
@@ -0,0 +1,389 @@
+"""Rendered-PDF cache for the resume (`about.pdf`) and portfolio (`portfolio.pdf`) downloads.
+
+WeasyPrint and ReportLab need seconds of CPU per render, so each document is rendered once
+per content version and written to settings.PDF_CACHE_DIR as `<document>-<version>.pdf`.
+The version is a hash of everything the document shows (for the resume: the PROFILE and
+SITE template data and the mtimes of its templates and stylesheets; for the portfolio: the
+projects and tags), the origin its links are built for, and ETAG_SALT. Downloads stream
+that file, with the version as ETag.
+
+Content changes queue a 'pdf' job (see portfolio.signals) that re-renders the document in
+`manage.py run_media_worker` from freshly read data; until it has finished, downloads keep
+getting the previous file. Only a document that has never been rendered is rendered inside the request, and
+concurrent requests for it wait for a single render instead of each starting their own.
+Jobs render for settings.PDF_SITE_URL, else for the origin of the last download.
+"""
+import hashlib
+import logging
+import os
+import tempfile
+import time
+from functools import partial
+from pathlib import Path
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+from django.db.models import Prefetch
+from django.http import HttpRequest
+from django.http.request import split_domain_port, validate_host
+from django.template.loader import get_template, render_to_string
+from django.urls import reverse
+
+from .conditional import content_state
+from .context_processors import _calendly_url, build_profile_snapshot, build_site_settings, get_profile_snapshot
+from .jobs import enqueue, register
+from .models import Project, Tag
+
+logger = logging.getLogger(__name__)
+
+PDF_TEMPLATES = ('about.html', 'base.html')
+
+PDF_STYLESHEETS = ('styles.css', 'print.css')
+
+# Download filename of each document
+PDF_FILENAMES = {
+    'about': 'Denis_Lokwo_Resume.pdf',
+    'portfolio': 'Denis_Lokwo_Portfolio.pdf',
+}
+
+# Only one process renders a given version; others wait up to this long for its file
+RENDER_LOCK_SECONDS = 60
+
+RENDER_WAIT_INTERVAL = 0.25
+
+# Times open_pdf() looks again when concurrent re-renders keep replacing the file it picked
+OPEN_ATTEMPTS = 3
+
+# Projects fetched per query (with one tags query each) while rendering the portfolio PDF
+PORTFOLIO_CHUNK_SIZE = 200
+
+# Remembers the origin of the last download, for jobs when PDF_SITE_URL is not set
+ORIGIN_FILE = 'origin'
+
+
+def cache_dir():
+    return Path(getattr(settings, 'PDF_CACHE_DIR', settings.BASE_DIR / 'var' / 'pdf'))
+
+
+def stylesheet_paths():
+    css_dir = settings.BASE_DIR / 'portfolio' / 'static' / 'css'
+    return [css_dir / name for name in PDF_STYLESHEETS if (css_dir / name).exists()]
+
+
+def _mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+def _origin(request):
+    return f'{request.scheme}://{request.get_host()}'
+
+
+def _digest(*state):
+    salted = (getattr(settings, 'ETAG_SALT', ''),) + state
+    return hashlib.sha256(repr(salted).encode()).hexdigest()[:32]
+
+
+def about_pdf_version(request):
+    """Hash of the inputs of the resume PDF; changes whenever its content would."""
+    sources = [get_template(name).origin.name for name in PDF_TEMPLATES] + stylesheet_paths()
+    return _digest(
+        _origin(request),
+        get_profile_snapshot(request),
+        build_site_settings(request),
+        _calendly_url(request),
+        [(str(path), _mtime(path)) for path in sources],
+    )
+
+
+def portfolio_pdf_version(request):
+    """Hash of the inputs of the portfolio PDF (projects and their tags)."""
+    state = content_state([Project.objects.all(), Tag.objects.all()])
+    return _digest(_origin(request), [(m.isoformat() if m else '', n) for m, n in state])
+
+
+def render_about_pdf(request, out):
+    """Render about.html as PDF into the binary file `out` with WeasyPrint (ImportError
+    if it is unavailable)."""
+    import weasyprint  # type: ignore
+    # No flash messages: the file is shared by every visitor
+    html_str = render_to_string('about.html', {'messages': ()}, request=request)
+    stylesheets = [weasyprint.CSS(filename=str(path)) for path in stylesheet_paths()]
+    weasyprint.HTML(string=html_str, base_url=request.build_absolute_uri('/')).write_pdf(
+        out, stylesheets=stylesheets or None)
+
+
+def render_portfolio_pdf(request, out):
+    """Render the project listing as PDF into the binary file `out` with ReportLab
+    (ImportError if it is unavailable). Projects are read in chunks of
+    PORTFOLIO_CHUNK_SIZE with their tags prefetched, so memory and query count stay flat
+    however many there are."""
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfgen import canvas
+    from reportlab.lib.units import mm
+    from reportlab.lib.utils import simpleSplit
+
+    c = canvas.Canvas(out, pagesize=A4)
+    width, height = A4
+
+    # Margins
+    margin_x = 20 * mm
+    margin_y = 20 * mm
+    y = height - margin_y
+
+    # Title
+    c.setFont("Helvetica-Bold", 18)
+    c.drawString(margin_x, y, "Denis Lokwo — Portfolio")
+    y -= 12 * mm
+
+    # Intro
+    c.setFont("Helvetica", 11)
+    intro = (
+        "Selected projects and highlights. For live demos and full details, visit the website."
+    )
+    for line in simpleSplit(intro, "Helvetica", 11, width - 2 * margin_x):
+        c.drawString(margin_x, y, line)
+        y -= 6 * mm
+
+    y -= 4 * mm
+    c.setFont("Helvetica-Bold", 14)
+    c.drawString(margin_x, y, "Projects")
+    y -= 8 * mm
+
+    projects = (Project.objects.order_by('-date')
+                .only('title', 'category', 'date', 'technologies', 'description')
+                .prefetch_related(Prefetch('tags', queryset=Tag.objects.only('name')))
+                .iterator(chunk_size=PORTFOLIO_CHUNK_SIZE))
+    c.setFont("Helvetica", 11)
+    for proj in projects:
+        # Ensure there is space, else new page
+        min_block = 18 * mm
+        if y < margin_y + min_block:
+            c.showPage()
+            y = height - margin_y
+            c.setFont("Helvetica", 11)
+
+        # Title line
+        title = f"{proj.title} — {proj.category or 'General'} ({proj.date:%b %Y})"
+        for line in simpleSplit(title, "Helvetica", 11, width - 2 * margin_x):
+            c.drawString(margin_x, y, line)
+            y -= 6 * mm
+
+        # Technologies
+        tech = ", ".join(proj.tech_list())
+        if tech:
+            for line in simpleSplit(f"Tech: {tech}", "Helvetica", 10, width - 2 * margin_x):
+                c.drawString(margin_x, y, line)
+                y -= 5 * mm
+
+        # Description (short)
+        desc = (proj.description or "").strip()
+        if desc:
+            lines = simpleSplit(desc, "Helvetica", 10, width - 2 * margin_x)
+            for line in lines[:5]:
+                c.drawString(margin_x, y, line)
+                y -= 5 * mm
+
+        y -= 3 * mm
+
+    # Footer note
+    if y < margin_y + 12 * mm:
+        c.showPage()
+        y = height - margin_y
+    c.setFont("Helvetica-Oblique", 9)
+    site_url = request.build_absolute_uri('/')
+    c.drawString(margin_x, margin_y, f"Generated from Denis Lokwo Portfolio — {site_url}")
+
+    c.showPage()
+    c.save()
+
+
+# Document name -> (version function, render function); both take the request, the render
+# function also the binary file to write the PDF into
+DOCUMENTS = {
+    'about': (about_pdf_version, render_about_pdf),
+    'portfolio': (portfolio_pdf_version, render_portfolio_pdf),
+}
+
+
+def pdf_path(document, version):
+    return cache_dir() / f'{document}-{version}.pdf'
+
+
+def pdf_version_of(path):
+    """The version a cached file was rendered for (its ETag)."""
+    return path.stem.rsplit('-', 1)[-1]
+
+
+def latest_pdf(document):
+    """The most recently rendered file of `document`, or None."""
+    files = list(cache_dir().glob(f'{document}-*.pdf'))
+    return max(files, key=lambda path: _mtime(path) or 0) if files else None
+
+
+def _write(document, path, render):
+    """Spool `render`'s output straight to a temporary file next to `path`, move it into
+    place atomically and drop the files of older versions."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix='.tmp-', suffix='.pdf')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            render(f)
+        # mkstemp creates 0600; the web server and the worker may run as different users
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+    for old in path.parent.glob(f'{document}-*.pdf'):
+        if old != path:
+            try:
+                old.unlink()
+            except OSError:
+                pass
+
+
+def render_pdf(document, request, version=None):
+    """Return the path of `document` for `version` (default: the current content),
+    rendering it first if needed. Raises whatever the render function raises when it
+    cannot be rendered."""
+    version_func, render_func = DOCUMENTS[document]
+    version = version or version_func(request)
+    path = pdf_path(document, version)
+    if path.exists():
+        return path
+    lock = f'portfolio:pdf_render:{document}:{version}'
+    deadline = time.monotonic() + RENDER_LOCK_SECONDS
+    while not cache.add(lock, 1, RENDER_LOCK_SECONDS):
+        # Another request or job is rendering this version
+        if path.exists():
+            return path
+        if time.monotonic() > deadline:
+            break
+        time.sleep(RENDER_WAIT_INTERVAL)
+    try:
+        if not path.exists():
+            _write(document, path, partial(render_func, request))
+    finally:
+        cache.delete(lock)
+    return path
+
+
+def open_pdf(document, request):
+    """Open the file to serve for `document`: the current version if it has been rendered,
+    else the previous one while a job re-renders it. Renders inline only when there is no
+    previous file. Each file is opened as it is picked: a re-render that replaces it
+    afterwards only unlinks it, and one that replaced it first sends us looking again."""
+    version = DOCUMENTS[document][0](request)
+    path = pdf_path(document, version)
+    for _ in range(OPEN_ATTEMPTS):
+        try:
+            return open(path, 'rb')
+        except FileNotFoundError:
+            pass
+        remember_origin(request)
+        previous = latest_pdf(document)
+        if previous is None:
+            render_pdf(document, request, version)
+            continue
+        enqueue('pdf', document, {'document': document, 'origin': _origin(request)})
+        # With JOBS_EAGER the job has already rendered the current version
+        for candidate in (path, previous):
+            try:
+                return open(candidate, 'rb')
+            except FileNotFoundError:
+                pass
+    raise FileNotFoundError(f'No {document} PDF could be opened in {cache_dir()}')
+
+
+def site_origin():
+    """The scheme://host jobs render for, or '' before the first download."""
+    configured = getattr(settings, 'PDF_SITE_URL', '')
+    if configured:
+        return configured.rstrip('/')
+    try:
+        return (cache_dir() / ORIGIN_FILE).read_text().strip()
+    except OSError:
+        return ''
+
+
+def remember_origin(request):
+    origin = _origin(request)
+    if origin != site_origin() and not getattr(settings, 'PDF_SITE_URL', ''):
+        cache_dir().mkdir(parents=True, exist_ok=True)
+        (cache_dir() / ORIGIN_FILE).write_text(origin)
+
+
+def origin_allowed(origin):
+    """Whether the host of `origin` (scheme://host[:port]) passes ALLOWED_HOSTS, as
+    request.get_host() checks it (including its DEBUG defaults)."""
+    domain, _ = split_domain_port(origin.partition('://')[2])
+    allowed = settings.ALLOWED_HOSTS
+    if settings.DEBUG and not allowed:
+        allowed = ['.localhost', '127.0.0.1', '[::1]']
+    return bool(domain) and validate_host(domain, allowed)
+
+
+class OfflineRequest(HttpRequest):
+    """A bare GET request for rendering outside the request cycle."""
+    def __init__(self, scheme):
+        super().__init__()
+        self._scheme = scheme
+
+    def _get_scheme(self):
+        return self._scheme
+
+
+def offline_request(origin, document):
+    """A GET request for `document`'s URL on `origin`, to render it outside a request.
+    Raises ImproperlyConfigured when the host is not in ALLOWED_HOSTS, so that is caught
+    before the render instead of as DisallowedHost halfway through it."""
+    if not origin_allowed(origin):
+        raise ImproperlyConfigured(f'The host of {origin!r} is not in ALLOWED_HOSTS; set PDF_SITE_URL')
+    scheme, _, host = origin.partition('://')
+    domain, port = split_domain_port(host)
+    request = OfflineRequest(scheme)
+    request.method = 'GET'
+    request.path = request.path_info = reverse(f'portfolio:{document}_pdf')
+    request.META = {
+        'REQUEST_METHOD': 'GET',
+        'PATH_INFO': request.path_info,
+        'QUERY_STRING': '',
+        'HTTP_HOST': host,
+        'SERVER_NAME': domain,
+        'SERVER_PORT': port or ('443' if scheme == 'https' else '80'),
+    }
+    return request
+
+
+def _queue_render(document):
+    origin = site_origin()
+    if origin and origin_allowed(origin):
+        enqueue('pdf', document, {'document': document, 'origin': origin})
+
+
+def queue_pdfs(*documents):
+    """Re-render `documents` in the background once the current transaction commits. There
+    is one pending job per document, so edits to many rows still cause a single render."""
+    for document in documents:
+        transaction.on_commit(partial(_queue_render, document))
+
+
+@register('pdf')
+def build_pdf(payload):
+    """Job handler: render the current version of the document. The version and the
+    render read the profile from the database, not from this process's cache, which
+    may not have seen the edit that queued the job (SiteSettings.get_solo() checks the
+    row on its own)."""
+    document = payload['document']
+    if not origin_allowed(payload['origin']):
+        # Retrying cannot help; downloads keep the previous file
+        logger.warning('Not rendering %s for %s: host not in ALLOWED_HOSTS', document, payload['origin'])
+        return
+    request = offline_request(payload['origin'], document)
+    request._profile_snapshot = build_profile_snapshot(request)
+    render_pdf(document, request)
@@ -0,0 +1,156 @@
+"""Site-wide search.
+
+Every public Project, Post, Service, featured Testimonial and published GalleryItem has one
+SearchDocument row. portfolio.signals re-indexes an object whenever it (or its tags) is
+saved or deleted, so the index is maintained incrementally; `manage.py
+rebuild_search_index` regenerates it from scratch. The documents table carries its own
+full-text index (portfolio.fulltext).
+"""
+import re
+
+from django.db.models import Count, F, Q, Window
+from django.db.models.functions import RowNumber
+from django.urls import reverse
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from blog.models import Post
+from .fulltext import FullTextIndex
+from .models import GalleryItem, Project, SearchDocument, Service, Testimonial
+
+DOCUMENT_INDEX = FullTextIndex('portfolio_searchdocument', (
+    ('title', 'A', 10.0),
+    ('keywords', 'B', 4.0),
+    ('body', 'D', 1.0),
+))
+
+SNIPPET_CHARS = 180
+
+_TERM_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def _project_document(p):
+    keywords = [p.category, p.technologies, *(t.name for t in p.tags.all())]
+    return {'title': p.title, 'keywords': ' '.join(k for k in keywords if k), 'body': p.description,
+            'url': p.get_absolute_url()}
+
+
+def _post_document(p):
+    if not p.published:
+        return None
+    return {'title': p.title, 'keywords': f'{p.category} {p.tags}'.strip(), 'body': p.content,
+            'url': p.get_absolute_url()}
+
+
+def _service_document(s):
+    if not s.is_published:
+        return None
+    return {'title': s.title, 'keywords': s.price, 'body': s.description, 'url': s.get_absolute_url()}
+
+
+def _testimonial_document(t):
+    if not t.featured:
+        return None
+    return {'title': f'{t.name}, {t.role}' if t.role else t.name, 'keywords': '', 'body': t.content,
+            'url': reverse('portfolio:testimonials')}
+
+
+def _gallery_document(g):
+    if not g.is_published:
+        return None
+    return {'title': g.title, 'keywords': g.alt_text, 'body': f'{g.caption}\n{g.description}'.strip(),
+            'url': reverse('portfolio:gallery')}
+
+
+# model -> (SearchDocument.kind, document builder returning None for non-public objects)
+INDEXED_MODELS = {
+    Project: ('project', _project_document),
+    Post: ('post', _post_document),
+    Service: ('service', _service_document),
+    Testimonial: ('testimonial', _testimonial_document),
+    GalleryItem: ('gallery', _gallery_document),
+}
+
+
+def index_object(instance):
+    """Create, refresh or drop the SearchDocument for `instance`."""
+    kind, build = INDEXED_MODELS[type(instance)]
+    doc = build(instance)
+    if doc is None:
+        SearchDocument.objects.filter(kind=kind, object_id=instance.pk).delete()
+    else:
+        SearchDocument.objects.update_or_create(kind=kind, object_id=instance.pk, defaults=doc)
+
+
+def remove_object(instance):
+    kind, _ = INDEXED_MODELS[type(instance)]
+    SearchDocument.objects.filter(kind=kind, object_id=instance.pk).delete()
+
+
+def rebuild(using='default'):
+    """Regenerate every SearchDocument in the `using` database; returns the number indexed."""
+    docs = []
+    for model, (kind, build) in INDEXED_MODELS.items():
+        qs = model.objects.using(using)
+        if model is Project:
+            qs = qs.prefetch_related('tags')
+        for obj in qs.iterator(chunk_size=500):
+            doc = build(obj)
+            if doc is not None:
+                docs.append(SearchDocument(kind=kind, object_id=obj.pk, **doc))
+    SearchDocument.objects.using(using).all().delete()
+    SearchDocument.objects.using(using).bulk_create(docs, batch_size=500)
+    return len(docs)
+
+
+def snippet(text, q, length=SNIPPET_CHARS):
+    """Plain-text excerpt of `text` around the first query term, terms wrapped in <mark>."""
+    text = ' '.join((text or '').split())
+    terms = _TERM_RE.findall(q)
+    start = 0
+    if terms:
+        hit = re.search('|'.join(re.escape(t) for t in terms), text, re.IGNORECASE)
+        if hit:
+            start = max(0, hit.start() - length // 3)
+    excerpt = text[start:start + length]
+    html = escape(excerpt)
+    if terms:
+        html = re.sub(
+            r'(?i)\b(' + '|'.join(re.escape(escape(t)) for t in terms) + r')',
+            r'<mark>\1</mark>', html,
+        )
+    prefix = '… ' if start else ''
+    suffix = ' …' if start + length < len(text) else ''
+    return mark_safe(prefix + html + suffix)
+
+
+def site_search(q, kind=None, page=1, per_page=10):
+    """Return (results, facets, total) for page `page` of the matches for `q`.
+
+    One query returns the page and the facet counts: window functions number the matches
+    by rank (within `kind` when given) and count them per kind, and the page rows plus
+    the best match of every kind are kept. `facets` maps kind -> count over all kinds.
+    """
+    offset = (page - 1) * per_page
+    matches = DOCUMENT_INDEX.search(SearchDocument.objects.all(), q)
+    rank = DOCUMENT_INDEX.rank_expression(q, using=matches.db)
+    best_first = [rank.desc(), F('pk').desc()]
+    rows = matches.annotate(
+        position=Window(RowNumber(), partition_by=[F('kind')] if kind else None, order_by=best_first),
+        kind_position=Window(RowNumber(), partition_by=[F('kind')], order_by=best_first),
+        kind_count=Window(Count('pk'), partition_by=[F('kind')]),
+    )
+    page_filter = Q(position__gt=offset, position__lte=offset + per_page)
+    if kind:
+        page_filter &= Q(kind=kind)
+    rows = rows.filter(page_filter | Q(kind_position=1))
+    facets = {}
+    results = []
+    for doc in rows:
+        facets[doc.kind] = doc.kind_count
+        if (not kind or doc.kind == kind) and offset < doc.position <= offset + per_page:
+            doc.snippet = snippet(doc.body, q)
+            results.append(doc)
+    results.sort(key=lambda d: d.position)
+    total = facets.get(kind, 0) if kind else sum(facets.values())
+    return results, facets, total
@@ -0,0 +1,151 @@
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete, m2m_changed
+from django.utils import timezone
+
+from blog.models import Post
+from .caching import invalidate_tags
+from .context_processors import invalidate_profile_snapshot
+from .derivatives import VARIANT_FIELDS, prepare_images, queue_images
+from .pdfs import queue_pdfs
+from .search import INDEXED_MODELS, index_object, remove_object
+from .models import (
+    Profile, SiteSettings, ExperienceItem, EducationItem, CertificationItem,
+    AwardItem, AchievementItem, SkillItem, Project, Tag, Testimonial, GalleryItem, Service,
+)
+
+# Rows hanging off a Profile (all have a `profile` FK)
+PROFILE_ITEM_MODELS = (
+    ExperienceItem, EducationItem, CertificationItem, AwardItem, AchievementItem, SkillItem,
+)
+
+# Models whose rows feed the PROFILE snapshot built in context_processors
+PROFILE_SNAPSHOT_MODELS = (Profile, SiteSettings) + PROFILE_ITEM_MODELS
+
+# Response cache tags (see portfolio.caching) purged when a model changes
+CACHE_TAGS = {
+    Post: ('post',),
+    Project: ('project',),
+    Tag: ('project',),
+    Testimonial: ('testimonial',),
+    Service: ('service',),
+    GalleryItem: ('gallery',),
+    SiteSettings: ('site',),
+    **{model: ('profile',) for model in PROFILE_SNAPSHOT_MODELS if model is not SiteSettings},
+}
+
+# Cached PDF downloads (see portfolio.pdfs) re-rendered in the background when a model changes
+PDF_DOCUMENTS = {
+    **{model: ('about',) for model in PROFILE_SNAPSHOT_MODELS},
+    Project: ('portfolio',),
+    Tag: ('portfolio',),
+}
+
+
+def _profile_changed(sender, **kwargs):
+    invalidate_profile_snapshot()
+
+
+def _profile_item_changed(sender, instance, **kwargs):
+    # Items have no updated_at of their own; bump the Profile's so conditional GETs see the edit
+    Profile.objects.filter(pk=instance.profile_id).update(updated_at=timezone.now())
+
+
+def _content_changed(sender, **kwargs):
+    invalidate_tags(*CACHE_TAGS[sender])
+
+
+def _pdf_content_changed(sender, **kwargs):
+    queue_pdfs(*PDF_DOCUMENTS[sender])
+
+
+def _post_tags_changed(sender, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        invalidate_tags('post')
+
+
+def _project_tags_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == 'pre_clear' and reverse:
+        # pk_set is None for clear; remember which projects lose the tag
+        instance._cleared_project_ids = list(instance.projects.values_list('pk', flat=True))
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        invalidate_tags('project')
+        queue_pdfs('portfolio')
+        # The through table has no timestamps; touch the side that was edited (Project or Tag)
+        type(instance).objects.filter(pk=instance.pk).update(updated_at=timezone.now())
+        if reverse:
+            ids = pk_set if action != 'post_clear' else getattr(instance, '_cleared_project_ids', ())
+            projects = Project.objects.filter(pk__in=ids or ())
+        else:
+            projects = [instance]
+        for project in projects:
+            project.refresh_tag_names()
+            # Project search documents list the tag names
+            index_object(project)
+
+
+def _image_saving(sender, instance, **kwargs):
+    prepare_images(instance)
+
+
+def _image_saved(sender, instance, **kwargs):
+    queue_images(instance)
+
+
+def _search_object_saved(sender, instance, **kwargs):
+    index_object(instance)
+
+
+def _search_object_deleted(sender, instance, **kwargs):
+    remove_object(instance)
+
+
+def _tag_saved(sender, instance, created, **kwargs):
+    if not created:
+        for project in instance.projects.all():
+            project.refresh_tag_names()
+            index_object(project)
+
+
+def _tag_deleting(sender, instance, **kwargs):
+    # The tag's project links are gone by post_delete; remember who to re-index
+    instance._search_project_ids = list(instance.projects.values_list('pk', flat=True))
+
+
+def _tag_deleted(sender, instance, **kwargs):
+    for project in Project.objects.filter(pk__in=getattr(instance, '_search_project_ids', ())):
+        project.refresh_tag_names()
+        index_object(project)
+
+
+# First, so with JOBS_EAGER rebuilt pages, search documents and snapshots see the derivatives
+for _model in VARIANT_FIELDS:
+    pre_save.connect(_image_saving, sender=_model, dispatch_uid=f'image_prepare_{_model.__name__}')
+    post_save.connect(_image_saved, sender=_model, dispatch_uid=f'image_queue_{_model.__name__}')
+
+for _model in PROFILE_SNAPSHOT_MODELS:
+    post_save.connect(_profile_changed, sender=_model, dispatch_uid=f'profile_snapshot_save_{_model.__name__}')
+    post_delete.connect(_profile_changed, sender=_model, dispatch_uid=f'profile_snapshot_delete_{_model.__name__}')
+
+for _model in PROFILE_ITEM_MODELS:
+    post_save.connect(_profile_item_changed, sender=_model, dispatch_uid=f'profile_touch_save_{_model.__name__}')
+    post_delete.connect(_profile_item_changed, sender=_model, dispatch_uid=f'profile_touch_delete_{_model.__name__}')
+
+
+# Before the cache-tag receivers, so anything rebuilt after a tag bump sees fresh documents
+for _model in INDEXED_MODELS:
+    post_save.connect(_search_object_saved, sender=_model, dispatch_uid=f'search_index_save_{_model.__name__}')
+    post_delete.connect(_search_object_deleted, sender=_model, dispatch_uid=f'search_index_delete_{_model.__name__}')
+
+for _model in CACHE_TAGS:
+    post_save.connect(_content_changed, sender=_model, dispatch_uid=f'cache_tags_save_{_model.__name__}')
+    post_delete.connect(_content_changed, sender=_model, dispatch_uid=f'cache_tags_delete_{_model.__name__}')
+
+for _model in PDF_DOCUMENTS:
+    post_save.connect(_pdf_content_changed, sender=_model, dispatch_uid=f'pdf_queue_save_{_model.__name__}')
+    post_delete.connect(_pdf_content_changed, sender=_model, dispatch_uid=f'pdf_queue_delete_{_model.__name__}')
+
+post_save.connect(_tag_saved, sender=Tag, dispatch_uid='search_index_tag_rename')
+pre_delete.connect(_tag_deleting, sender=Tag, dispatch_uid='search_index_tag_deleting')
+post_delete.connect(_tag_deleted, sender=Tag, dispatch_uid='search_index_tag_deleted')
+
+m2m_changed.connect(_post_tags_changed, sender=Post.tag_items.through, dispatch_uid='cache_tags_post_tags')
+m2m_changed.connect(_project_tags_changed, sender=Project.tags.through, dispatch_uid='cache_tags_project_tags')
@@ -1,7 +1,6 @@
 from django.contrib.sitemaps import Sitemap
 from django.urls import reverse
-from django.utils.text import slugify
-from blog.models import Post
+from blog.models import Post, Tag as BlogTag
 from .models import Project
 
 
@@ -54,10 +53,10 @@ class BlogCategorySitemap(Sitemap):
     priority = 0.5
 
     def items(self):
-        cats = set()
-        for p in Post.objects.filter(published=True).exclude(category__isnull=True).exclude(category=""):
-            cats.add(slugify(p.category))
-        return sorted(cats)
+        return list(
+            Post.objects.filter(published=True).exclude(category_slug='')
+            .order_by('category_slug').values_list('category_slug', flat=True).distinct()
+        )
 
     def location(self, item):
         return reverse('blog:post_list_by_category', kwargs={'category': item})
@@ -68,11 +67,10 @@ class BlogTagSitemap(Sitemap):
     priority = 0.5
 
     def items(self):
-        tags = set()
-        for p in Post.objects.filter(published=True):
-            for t in (getattr(p, 'tag_list', []) or []):
-                tags.add(slugify(t))
-        return sorted(tags)
+        return list(
+            BlogTag.objects.filter(posts__published=True).distinct()
+            .order_by('slug').values_list('slug', flat=True)
+        )
 
     def location(self, item):
         return reverse('blog:post_list_by_tag', kwargs={'tag': item})
@@ -37,7 +37,9 @@
     img.style.maxWidth = '100%';
     img.style.height = 'auto';
     img.style.display = 'block';
+    img.style.backgroundSize = 'cover';
     img.alt = '';
+    img.addEventListener('load', function(){ img.style.backgroundImage = ''; });
     body.appendChild(img);
 
   const desc = document.createElement('div');
@@ -66,7 +68,18 @@
       else if(e.key === 'ArrowLeft') navigate(-1);
     }
 
-    function openWith(src, alt, link, description){
+    function openWith(src, alt, link, description, thumb){
+      // Until the full image arrives, show the card's image (or its placeholder) stretched
+      // over the final size, so the dialog neither flashes empty nor jumps when it loads
+      const preview = thumb && (thumb.currentSrc || thumb.src);
+      img.style.backgroundImage = preview ? 'url("' + preview + '")' : '';
+      if(thumb && thumb.getAttribute('width') && thumb.getAttribute('height')){
+        img.width = thumb.getAttribute('width');
+        img.height = thumb.getAttribute('height');
+      } else {
+        img.removeAttribute('width');
+        img.removeAttribute('height');
+      }
       img.src = src;
       img.alt = alt || '';
       title.textContent = alt || '';
@@ -105,7 +118,7 @@
         const alt = el.getAttribute('data-title') || el.getAttribute('aria-label') || '';
         const link = el.getAttribute('data-link') || '';
         const description = el.getAttribute('data-desc') || '';
-        openWith(src, alt, link, description);
+        openWith(src, alt, link, description, el.querySelector('img'));
       }
     }
 
@@ -133,7 +146,7 @@
         const src = a.getAttribute('href') || (img && img.getAttribute('src'));
         const link = a.getAttribute('data-link') || '';
         const description = a.getAttribute('data-desc') || '';
-        modal.openWith(src, title, link, description);
+        modal.openWith(src, title, link, description, img);
       });
     });
 
@@ -309,3 +309,113 @@ document.addEventListener('DOMContentLoaded', function(){
 		targets.forEach(el => io.observe(el));
 	})();
 });
+
+// CSRF for forms on shared cached pages: the HTML carries no token, so fill
+// forms marked [data-csrf] from the csrftoken cookie or the /csrf/ endpoint.
+(function(){
+	const script = document.currentScript;
+	const endpoint = (script && script.getAttribute('data-csrf-url')) || '/csrf/';
+	let pending = null;
+	function cookieToken(){
+		const m = document.cookie.match(/(?:^|;\s*)csrftoken=([^;]+)/);
+		return m ? decodeURIComponent(m[1]) : '';
+	}
+	function fetchToken(){
+		const existing = cookieToken();
+		if(existing) return Promise.resolve(existing);
+		if(!pending){
+			pending = fetch(endpoint, { credentials: 'same-origin', headers: { 'Accept': 'application/json' } })
+				.then(r => r.json())
+				.then(data => data.token || '')
+				.catch(() => { pending = null; return ''; });
+		}
+		return pending;
+	}
+	function fill(form, token){
+		const input = form.querySelector('input[name="csrfmiddlewaretoken"]');
+		if(input && token) input.value = token;
+		return !!(input && input.value);
+	}
+	document.addEventListener('DOMContentLoaded', function(){
+		document.querySelectorAll('form[data-csrf]').forEach(function(form){
+			// Warm the token as soon as the visitor shows intent
+			form.addEventListener('focusin', function(){ fetchToken().then(t => fill(form, t)); }, { once: true });
+			form.addEventListener('submit', function(ev){
+				if(fill(form, cookieToken())) return;
+				ev.preventDefault();
+				fetchToken().then(function(t){
+					if(fill(form, t)) form.submit();
+				});
+			});
+		});
+	});
+})();
+
+// Search-as-you-type: inputs marked [data-suggest] show links from /search/suggest.
+(function(){
+	const script = document.currentScript;
+	const endpoint = (script && script.getAttribute('data-suggest-url')) || '/search/suggest';
+	function attach(input){
+		const wrap = document.createElement('span');
+		wrap.className = 'suggest-wrap';
+		input.parentNode.insertBefore(wrap, input);
+		wrap.appendChild(input);
+		const list = document.createElement('ul');
+		list.className = 'suggest-list';
+		list.setAttribute('role', 'listbox');
+		list.hidden = true;
+		wrap.appendChild(list);
+		let timer = null, controller = null, active = -1;
+		function links(){ return Array.from(list.querySelectorAll('a')); }
+		function close(){ list.hidden = true; active = -1; }
+		function highlight(i){
+			const items = links();
+			items.forEach((a, n) => a.classList.toggle('active', n === i));
+			active = i;
+		}
+		function render(items){
+			list.innerHTML = '';
+			items.forEach(function(s){
+				const li = document.createElement('li');
+				const a = document.createElement('a');
+				a.href = s.url;
+				a.setAttribute('role', 'option');
+				const label = document.createElement('span');
+				label.textContent = s.label;
+				const kind = document.createElement('span');
+				kind.className = 'suggest-kind';
+				kind.textContent = s.kind;
+				a.append(label, kind);
+				li.appendChild(a);
+				list.appendChild(li);
+			});
+			list.hidden = !items.length;
+			active = -1;
+		}
+		input.addEventListener('input', function(){
+			clearTimeout(timer);
+			const q = input.value.trim();
+			if(!q){ close(); return; }
+			timer = setTimeout(function(){
+				if(controller) controller.abort();
+				controller = new AbortController();
+				fetch(endpoint + '?q=' + encodeURIComponent(q), { signal: controller.signal, headers: { 'Accept': 'application/json' } })
+					.then(r => r.json())
+					.then(data => { if(input.value.trim() === data.q) render(data.suggestions || []); })
+					.catch(() => {});
+			}, 120);
+		});
+		input.addEventListener('keydown', function(ev){
+			const items = links();
+			if(list.hidden || !items.length) return;
+			if(ev.key === 'ArrowDown'){ ev.preventDefault(); highlight((active + 1) % items.length); }
+			else if(ev.key === 'ArrowUp'){ ev.preventDefault(); highlight((active - 1 + items.length) % items.length); }
+			else if(ev.key === 'Escape'){ close(); }
+			else if(ev.key === 'Enter' && active >= 0){ ev.preventDefault(); window.location = items[active].href; }
+		});
+		input.addEventListener('blur', function(){ setTimeout(close, 150); });
+	}
+	document.addEventListener('DOMContentLoaded', function(){
+		document.querySelectorAll('input[data-suggest]').forEach(attach);
+	});
+})();
@@ -0,0 +1,118 @@
+"""Search-as-you-type suggestions from an in-process prefix index.
+
+The index is a sorted list of (normalized key, entry id) pairs: every title, tag name and
+category is indexed under its full text and under each later word, so "dash" finds
+"Latency dashboard". A lookup is a bisect to the first key >= the prefix and a short
+forward scan, with no database access.
+
+Each process keeps one index together with the cache-tag versions (portfolio.caching) it
+was built from; content changes bump those tags, and the next lookup rebuilds the index
+(a handful of small queries). A per-process cache only sees this process's bumps, so there
+the index is also rebuilt once it is LOCAL_PAGE_CACHE_SECONDS old.
+"""
+import threading
+import time
+from bisect import bisect_left
+
+from django.urls import reverse
+from django.utils.http import urlencode
+from django.utils.text import slugify
+
+from blog.models import Post, Tag as BlogTag
+from .caching import LOCAL_PAGE_CACHE_SECONDS, is_shared_cache, tag_versions
+from .models import Project, SearchDocument, Tag
+
+SUGGEST_TAGS = ('post', 'project', 'service', 'gallery')
+
+SUGGEST_LIMIT = 8
+
+# Prefix matches considered per lookup before ranking
+SUGGEST_SCAN = 200
+
+# Testimonials are quotes, not something visitors type the name of
+SUGGEST_KINDS = ('project', 'post', 'service', 'gallery')
+
+
+def _normalize(text):
+    return ' '.join(slugify(text).split('-'))
+
+
+class PrefixIndex:
+    def __init__(self, entries):
+        self.entries = entries  # [{'label', 'kind', 'url'}]
+        self.normalized = [_normalize(e['label']) for e in entries]
+        keys = []
+        for i, label in enumerate(self.normalized):
+            words = label.split()
+            for start in range(len(words)):
+                keys.append((' '.join(words[start:]), i))
+        keys.sort()
+        self.keys = keys
+
+    def lookup(self, prefix, limit=SUGGEST_LIMIT):
+        prefix = _normalize(prefix)
+        if not prefix:
+            return []
+        found = []
+        seen = set()
+        for pos in range(bisect_left(self.keys, (prefix,)), len(self.keys)):
+            key, i = self.keys[pos]
+            if not key.startswith(prefix):
+                break
+            if i not in seen:
+                seen.add(i)
+                found.append(i)
+                if len(found) == SUGGEST_SCAN:
+                    break
+        # Whole-label matches before mid-label word matches, then shorter labels first
+        found.sort(key=lambda i: (not self.normalized[i].startswith(prefix), len(self.normalized[i])))
+        return [self.entries[i] for i in found[:limit]]
+
+
+def build_index():
+    entries = [
+        {'label': title, 'kind': kind, 'url': url}
+        for kind, title, url in SearchDocument.objects.filter(kind__in=SUGGEST_KINDS)
+        .values_list('kind', 'title', 'url')
+    ]
+    project_list = reverse('portfolio:project_list')
+    for name in Tag.objects.filter(projects__isnull=False).distinct().values_list('name', flat=True):
+        entries.append({'label': name, 'kind': 'tech', 'url': f'{project_list}?{urlencode({"tech": name})}'})
+    for name in Project.objects.exclude(category='').values_list('category', flat=True).distinct():
+        entries.append({'label': name, 'kind': 'category', 'url': f'{project_list}?{urlencode({"category": name})}'})
+    for slug, name in BlogTag.objects.filter(posts__published=True).distinct().values_list('slug', 'name'):
+        entries.append({'label': name, 'kind': 'tag', 'url': reverse('blog:post_list_by_tag', args=[slug])})
+    categories = (
+        Post.objects.filter(published=True).exclude(category_slug='')
+        .values_list('category_slug', 'category').distinct()
+    )
+    for slug, name in dict(categories).items():
+        entries.append({'label': name, 'kind': 'category', 'url': reverse('blog:post_list_by_category', args=[slug])})
+    return PrefixIndex(entries)
+
+
+_lock = threading.Lock()
+_current = (None, 0, None)  # (tag versions, time.monotonic() when built, PrefixIndex)
+
+
+def _is_current(built_for, built_at, versions):
+    if built_for != versions:
+        return False
+    return is_shared_cache() or time.monotonic() - built_at < LOCAL_PAGE_CACHE_SECONDS
+
+
+def get_index():
+    global _current
+    versions = tuple(tag_versions(SUGGEST_TAGS))
+    built_for, built_at, index = _current
+    if not _is_current(built_for, built_at, versions):
+        with _lock:
+            built_for, built_at, index = _current
+            if not _is_current(built_for, built_at, versions):
+                index = build_index()
+                _current = (versions, time.monotonic(), index)
+    return index
+
+
+def suggest(q, limit=SUGGEST_LIMIT):
+    return get_index().lookup(q, limit)
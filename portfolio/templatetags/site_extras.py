@@ -1,7 +1,11 @@
 from django import template
+from django.forms.utils import flatatt
 from django.templatetags.static import static
+from django.utils.html import format_html, format_html_join
 from django.utils.safestring import mark_safe
 
+from portfolio.derivatives import MIME_TYPES, image_source, storage_url
+
 register = template.Library()
 
 @register.simple_tag(takes_context=True)
@@ -170,3 +174,39 @@ def get_item(obj, key):
 
 
 
+
+
+@register.simple_tag
+def responsive_image(image, sizes: str = '100vw', **attrs) -> str:
+    """Render an ImageField file (or a PROFILE/SITE image payload) as a <picture> with AVIF and
+    WebP srcsets from its stored derivatives, falling back to a plain <img> of the original.
+    Width/height and the loading placeholder come from stored columns, never from the file.
+    Extra keyword arguments become <img> attributes.
+    Usage: {% responsive_image project.image sizes="(max-width: 880px) 100vw, 300px" alt=project.title loading="lazy" %}
+    """
+    source = image_source(image)
+    if source is None:
+        return ''
+    img_attrs = {'src': source['url'], 'width': source['width'], 'height': source['height']}
+    if 'style' not in attrs:
+        # Painted until the image arrives: the blurred micro-thumbnail, else the dominant colour
+        if source['placeholder']:
+            layers = [source['color'], f"url({source['placeholder']}) center / cover no-repeat"]
+            img_attrs['style'] = 'background: ' + ' '.join(filter(None, layers))
+        elif source['color']:
+            img_attrs['style'] = f"background-color: {source['color']}"
+    img_attrs.update(attrs)
+    formats = source['variants'].get('formats') or {}
+    if not formats:
+        return format_html('<img{}>', flatatt(img_attrs))
+
+    def srcset(fmt):
+        return ', '.join(f'{storage_url(image, name)} {w}w' for w, name in formats[fmt])
+
+    fallback = next(fmt for fmt in formats if fmt not in ('avif', 'webp'))
+    img_attrs.update(src=storage_url(image, formats[fallback][-1][1]), srcset=srcset(fallback), sizes=sizes)
+    sources = format_html_join(
+        '', '<source type="{}" srcset="{}" sizes="{}">',
+        ((MIME_TYPES[fmt], srcset(fmt), sizes) for fmt in ('avif', 'webp') if fmt in formats),
+    )
+    return format_html('<picture>{}<img{}></picture>', sources, flatatt(img_attrs))
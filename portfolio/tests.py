@@ -1,9 +1,13 @@
-from django.test import TestCase, override_settings
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
 from django.urls import reverse
-from .models import Message, Subscription, Testimonial
+from .models import Message, Subscription, Testimonial, Project
 from django.core import mail
 from django.conf import settings
 from django.core.cache import cache
+import os
+import shutil
+from io import StringIO
+import tempfile
 import time
 
 
@@ -48,16 +52,314 @@ class ContactFormTests(TestCase):
 		resp3 = self.client.post(reverse('portfolio:contact'), data)
 		self.assertEqual(Message.objects.filter(email='carol@example.com').count(), 2)
 
+@override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+				   MIDDLEWARE=[m for m in settings.MIDDLEWARE if m != 'myportfolio.middleware.ratelimit.SimpleRateLimitMiddleware'])
+class OutboxTests(TestCase):
+	def setUp(self):
+		cache.clear()
+		mail.outbox = []
+		self.media = self.settings(MEDIA_ROOT=tempfile.mkdtemp(), JOBS_EAGER=False)
+		self.media.enable()
+
+	def tearDown(self):
+		self.media.disable()
+		shutil.rmtree(self.media.options['MEDIA_ROOT'], ignore_errors=True)
+
+	def test_contact_emails_are_queued_and_sent_by_the_worker(self):
+		from django.core.files.uploadedfile import SimpleUploadedFile
+		from django.core.management import call_command
+		from .models import OutboundEmail
+		data = {'name': 'Dana', 'email': 'dana@example.com', 'message': 'Hi', 'hp': '',
+				'attachment': SimpleUploadedFile('brief.pdf', b'%PDF-1.4 brief', content_type='application/pdf')}
+		resp = self.client.post(reverse('portfolio:contact'), data)
+		self.assertRedirects(resp, reverse('portfolio:contact'))
+		# Nothing is sent inside the request
+		self.assertEqual(mail.outbox, [])
+		self.assertEqual(OutboundEmail.objects.filter(status='pending').count(), 2)
+		call_command('send_outbox', '--once', stdout=StringIO())
+		self.assertEqual(OutboundEmail.objects.filter(status='sent').count(), 2)
+		notify = next(m for m in mail.outbox if m.subject == 'Portfolio contact from Dana')
+		self.assertEqual([(name, content) for name, content, _ in notify.attachments], [('brief.pdf', b'%PDF-1.4 brief')])
+		ack = next(m for m in mail.outbox if m.to == ['dana@example.com'])
+		self.assertEqual(ack.alternatives[0][1], 'text/html')
+
+	@override_settings(CONTACT_EMAIL='', DEFAULT_FROM_EMAIL='')
+	def test_contact_without_recipient_queues_only_the_acknowledgement(self):
+		from .models import OutboundEmail
+		data = {'name': 'Eve', 'email': 'eve@example.com', 'message': 'Hi', 'hp': ''}
+		with self.assertLogs('portfolio.views', 'WARNING'):
+			resp = self.client.post(reverse('portfolio:contact'), data)
+		self.assertRedirects(resp, reverse('portfolio:contact'))
+		self.assertEqual(Message.objects.count(), 1)
+		self.assertEqual([e.to for e in OutboundEmail.objects.all()], [['eve@example.com']])
+
+	def test_failed_send_is_retried_with_backoff(self):
+		from datetime import timedelta
+		from unittest import mock
+		from django.utils import timezone
+		from .models import OutboundEmail
+		from .outbox import RETRY_SECONDS, queue_email, send_pending
+		email = queue_email('Hello', 'Body', ['x@example.com'])
+		with mock.patch('django.core.mail.backends.locmem.EmailBackend.send_messages', side_effect=OSError('SMTP down')):
+			self.assertEqual(send_pending(), (0, 1))
+		email.refresh_from_db()
+		self.assertEqual((email.status, email.attempts), ('pending', 1))
+		self.assertIn('SMTP down', email.last_error)
+		self.assertGreater(email.send_after, timezone.now() + timedelta(seconds=RETRY_SECONDS - 5))
+		# Not due yet
+		self.assertEqual(send_pending(), (0, 0))
+		OutboundEmail.objects.filter(pk=email.pk).update(send_after=timezone.now(), attempts=email.max_attempts - 1)
+		with mock.patch('django.core.mail.backends.locmem.EmailBackend.send_messages', side_effect=OSError('SMTP down')):
+			send_pending()
+		email.refresh_from_db()
+		self.assertEqual(email.status, 'failed')
+		self.assertEqual(mail.outbox, [])
+
+@override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend')
+class NewsletterTests(TestCase):
+	def setUp(self):
+		mail.outbox = []
+		self.subs = [Subscription.objects.create(email=f's{i}@example.com') for i in range(4)]
+		Subscription.objects.create(email='off@example.com', active=False)
+
+	def test_campaign_is_personalized_batched_and_resumable(self):
+		from unittest import mock
+		from django.core.mail.backends.locmem import EmailBackend
+		from . import newsletter
+		from .models import Campaign, CampaignDelivery
+		campaign = Campaign.objects.create(subject='News', body='Hello subscribers')
+		self.assertTrue(newsletter.start_campaign(campaign, 'https://example.com/'))
+		self.assertFalse(newsletter.start_campaign(campaign, 'https://example.com/'))
+		self.assertEqual(campaign.deliveries.count(), 4)
+		# Unsubscribed after the campaign started
+		Subscription.objects.filter(pk=self.subs[3].pk).update(active=False)
+		real_send = EmailBackend.send_messages
+		calls = []
+
+		def send_then_crash(backend, messages):
+			calls.append(messages)
+			if len(calls) == 2:
+				raise KeyboardInterrupt
+			return real_send(backend, messages)
+
+		with mock.patch.object(EmailBackend, 'send_messages', send_then_crash), self.assertRaises(KeyboardInterrupt):
+			newsletter.send_campaign(campaign, batch_size=10, rate=0)
+		statuses = dict(campaign.deliveries.values_list('email', 'status'))
+		self.assertEqual(statuses, {'s0@example.com': 'sent', 's1@example.com': 'sending',
+									's2@example.com': 'pending', 's3@example.com': 'pending'})
+		with mock.patch.object(newsletter, 'get_connection', wraps=newsletter.get_connection) as connections:
+			counts = newsletter.send_campaign(campaign, batch_size=10, rate=0)
+		self.assertEqual(counts, {'sent': 1, 'failed': 0, 'skipped': 1})
+		self.assertEqual(connections.call_count, 1)
+		# The in-doubt delivery is not sent again
+		self.assertEqual([m.to for m in mail.outbox], [['s0@example.com'], ['s2@example.com']])
+		for message, sub in zip(mail.outbox, (self.subs[0], self.subs[2])):
+			url = f'https://example.com/unsubscribe/{sub.token}/'
+			self.assertIn(url, message.body)
+			self.assertIn(url, message.alternatives[0][0])
+			self.assertEqual(message.extra_headers['List-Unsubscribe'], f'<{url}>')
+			self.assertIn('Hello subscribers', message.body)
+		campaign.refresh_from_db()
+		self.assertEqual(campaign.status, Campaign.STATUS_SENT)
+		self.assertEqual(CampaignDelivery.objects.filter(status='skipped').get().email, 's3@example.com')
+
+@override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend')
+class DigestTests(TestCase):
+	def post(self, slug, days_ago, **kwargs):
+		from datetime import timedelta
+		from django.utils import timezone
+		from blog.models import Post
+		when = timezone.now() - timedelta(days=days_ago)
+		return Post.objects.create(title=slug.title(), slug=slug, author='A', content='<p>Body of the post</p>',
+								   created_at=when, published_at=when, **kwargs)
+
+	def test_digest_lists_posts_since_the_last_one(self):
+		from . import digest, newsletter
+		Subscription.objects.create(email='reader@example.com')
+		self.assertIsNone(digest.queue_digest('https://example.com'))
+		self.post('ancient', 30)
+		draft = self.post('draft', 3, published=False)
+		self.assertIsNone(draft.published_at)
+		first = self.post('first', 2)
+		campaign = digest.queue_digest('https://example.com/')
+		self.assertEqual(campaign.subject, 'New on Portfolio: First')
+		self.assertEqual(campaign.digest_until, first.published_at)
+		self.assertIn('https://example.com/blog/first/', campaign.body)
+		self.assertNotIn('Ancient', campaign.body)
+		self.assertEqual(campaign.deliveries.count(), 1)
+		# Nothing new: the watermark and new-posts queries only
+		with self.assertNumQueries(2):
+			self.assertIsNone(digest.queue_digest('https://example.com'))
+		# Written before the last digest but published after it
+		draft.published = True
+		draft.save(update_fields=['published'])
+		self.assertIsNotNone(draft.published_at)
+		self.post('third', 0)
+		later = digest.queue_digest('https://example.com')
+		self.assertEqual(later.subject, '2 new posts on Portfolio')
+		self.assertIn('https://example.com/blog/draft/', later.body)
+		self.assertNotIn('/blog/first/', later.body)
+		newsletter.send_campaign(later, rate=0)
+		self.assertEqual(len(mail.outbox), 1)
+		self.assertIn('https://example.com/blog/third/', mail.outbox[0].alternatives[0][0])
+		self.assertIn('Body of the post', mail.outbox[0].body)
+
+
 class PortfolioPDFTests(TestCase):
+	def setUp(self):
+		cache.clear()
+		self.pdf_dir = self.settings(PDF_CACHE_DIR=tempfile.mkdtemp(), JOBS_EAGER=False)
+		self.pdf_dir.enable()
+
+	def tearDown(self):
+		self.pdf_dir.disable()
+		shutil.rmtree(self.pdf_dir.options['PDF_CACHE_DIR'], ignore_errors=True)
+
 	def test_portfolio_pdf_endpoint(self):
 		url = reverse('portfolio:portfolio_pdf')
 		resp = self.client.get(url)
 		self.assertEqual(resp.status_code, 200)
 		self.assertEqual(resp['Content-Type'], 'application/pdf')
 		# PDF should not be empty; expect some bytes
-		self.assertGreater(len(resp.content), 100)
+		self.assertGreater(len(b''.join(resp.streaming_content)), 100)
+
+	def test_render_query_count_does_not_grow_with_projects(self):
+		from io import BytesIO
+		from unittest import mock
+		from django.test import RequestFactory
+		from . import pdfs
+		from .models import Tag
+		python = Tag.objects.create(name='Python')
+		for i in range(12):
+			p = Project.objects.create(title=f'P{i}', slug=f'p{i}', description='d', date='2024-03-01', technologies='Legacy')
+			if i % 2:
+				p.tags.add(python)
+		request = RequestFactory().get(reverse('portfolio:portfolio_pdf'))
+		out = BytesIO()
+		# One projects query fetched in chunks of 5, plus one tags query per chunk
+		with mock.patch.object(pdfs, 'PORTFOLIO_CHUNK_SIZE', 5), self.assertNumQueries(4):
+			pdfs.render_portfolio_pdf(request, out)
+		self.assertTrue(out.getvalue().startswith(b'%PDF'))
+
+
+	def test_file_replaced_while_being_picked_is_not_lost(self):
+		from unittest import mock
+		from django.test import RequestFactory
+		from . import pdfs
+		pdfs.cache_dir().mkdir(parents=True, exist_ok=True)
+		old, newer = pdfs.pdf_path('portfolio', 'old'), pdfs.pdf_path('portfolio', 'newer')
+		old.write_bytes(b'%PDF old')
+		real_latest = pdfs.latest_pdf
+
+		def racing_latest(document):
+			found = real_latest(document)
+			if found == old:
+				# A concurrent re-render swaps in a newer version right after the listing
+				newer.write_bytes(b'%PDF newer')
+				old.unlink()
+			return found
+		request = RequestFactory().get(reverse('portfolio:portfolio_pdf'))
+		with mock.patch.object(pdfs, 'latest_pdf', side_effect=racing_latest), \
+				mock.patch.object(pdfs, 'render_pdf') as render:
+			with pdfs.open_pdf('portfolio', request) as f:
+				self.assertEqual(f.read(), b'%PDF newer')
+		render.assert_not_called()
+
+	@override_settings(ALLOWED_HOSTS=['example.com'])
+	def test_offline_request_is_checked_against_allowed_hosts(self):
+		from unittest import mock
+		from django.core.exceptions import ImproperlyConfigured
+		from . import pdfs
+		request = pdfs.offline_request('https://example.com', 'portfolio')
+		self.assertEqual(request.build_absolute_uri('/'), 'https://example.com/')
+		self.assertEqual(request.get_host(), 'example.com')
+		self.assertEqual(request.path, reverse('portfolio:portfolio_pdf'))
+		with self.assertRaises(ImproperlyConfigured):
+			pdfs.offline_request('https://evil.example', 'portfolio')
+		# A job for a disallowed origin gives up at once instead of failing on every retry
+		with mock.patch.object(pdfs, 'render_pdf') as render, self.assertLogs('portfolio.pdfs', 'WARNING'):
+			pdfs.build_pdf({'document': 'portfolio', 'origin': 'https://evil.example'})
+		render.assert_not_called()
+
+class PDFPrerenderTests(TransactionTestCase):
+	"""Re-render jobs are queued on commit, so these need real transactions."""
+	def setUp(self):
+		cache.clear()
+		self.pdf_dir = self.settings(PDF_CACHE_DIR=tempfile.mkdtemp(), JOBS_EAGER=False)
+		self.pdf_dir.enable()
+
+	def tearDown(self):
+		self.pdf_dir.disable()
+		shutil.rmtree(self.pdf_dir.options['PDF_CACHE_DIR'], ignore_errors=True)
+
+	def test_previous_pdf_served_until_background_render_finishes(self):
+		from django.db import transaction
+		from .jobs import run_pending
+		from .models import Job
+		project = Project.objects.create(title='First', slug='first', description='d', date='2024-03-01')
+		url = reverse('portfolio:portfolio_pdf')
+		first = self.client.get(url)
+		first_bytes = b''.join(first.streaming_content)
+		with transaction.atomic():
+			project.title = 'Renamed'
+			project.save()
+			Project.objects.create(title='Second', slug='second', description='d', date='2024-04-01')
+		# One render queued for the whole transaction
+		job = Job.objects.get(kind='pdf')
+		self.assertEqual((job.key, job.payload), ('portfolio', {'document': 'portfolio', 'origin': 'http://testserver'}))
+		stale = self.client.get(url)
+		self.assertEqual(stale['ETag'], first['ETag'])
+		self.assertEqual(b''.join(stale.streaming_content), first_bytes)
+		self.assertEqual(run_pending(['pdf']), 1)
+		fresh = self.client.get(url)
+		self.assertNotEqual(fresh['ETag'], first['ETag'])
+		self.assertNotEqual(b''.join(fresh.streaming_content), first_bytes)
+		self.assertEqual(sorted(p.endswith('.pdf') for p in os.listdir(self.pdf_dir.options['PDF_CACHE_DIR'])), [False, True])
+
+
+class ProjectTechListTests(TestCase):
+	def make_project(self, slug, **kwargs):
+		return Project.objects.create(title=slug, slug=slug, description='d', date='2024-03-01', **kwargs)
+
+	def test_tag_names_follow_tag_changes(self):
+		from .models import Tag
+		django, python = Tag.objects.create(name='Django'), Tag.objects.create(name='Python')
+		project = self.make_project('tagged', technologies='Legacy')
+		self.assertEqual(project.tech_list(), ['Legacy'])
+		project.tags.add(python, django)
+		self.assertEqual(project.tag_names, ['Django', 'Python'])
+		fresh = Project.objects.get(pk=project.pk)
+		with self.assertNumQueries(0):
+			self.assertEqual(fresh.tech_list(), ['Django', 'Python'])
+		python.name = 'CPython'
+		python.save()
+		self.assertEqual(Project.objects.get(pk=project.pk).tag_names, ['CPython', 'Django'])
+		django.projects.clear()
+		self.assertEqual(Project.objects.get(pk=project.pk).tag_names, ['CPython'])
+		python.delete()
+		self.assertEqual(Project.objects.get(pk=project.pk).tech_list(), ['Legacy'])
+
+	def test_prefetched_tags_are_used(self):
+		from .models import Tag
+		tag = Tag.objects.create(name='Go')
+		for i in range(3):
+			self.make_project(f'p{i}').tags.add(tag)
+		# Stale column: the prefetch cache wins
+		Project.objects.update(tag_names=['Stale'])
+		projects = list(Project.objects.prefetch_related('tags'))
+		with self.assertNumQueries(0):
+			self.assertEqual([p.tech_list() for p in projects], [['Go']] * 3)
 
 class AboutPDFTests(TestCase):
+	def setUp(self):
+		cache.clear()
+		self.pdf_dir = self.settings(PDF_CACHE_DIR=tempfile.mkdtemp(), JOBS_EAGER=True)
+		self.pdf_dir.enable()
+
+	def tearDown(self):
+		self.pdf_dir.disable()
+		shutil.rmtree(self.pdf_dir.options['PDF_CACHE_DIR'], ignore_errors=True)
+
 	def test_about_pdf_endpoint(self):
 		url = reverse('portfolio:about_pdf')
 		# Do not follow redirects so we can validate fallback targets even when static serving is disabled in tests
@@ -79,6 +381,66 @@ class AboutPDFTests(TestCase):
 				msg=f"Unexpected redirect target: {loc}"
 			)
 
+	def test_rendered_pdf_is_reused_until_content_changes(self):
+		from unittest import mock
+		from . import pdfs
+		from .models import Profile
+		profile = Profile.objects.create(name='Resume Person')
+		url = reverse('portfolio:about_pdf')
+		render = mock.Mock(side_effect=lambda request, out: out.write(b'%PDF-1.7 first'))
+		with mock.patch.dict(pdfs.DOCUMENTS, about=(pdfs.about_pdf_version, render)):
+			first = self.client.get(url)
+			self.assertEqual(b''.join(first.streaming_content), b'%PDF-1.7 first')
+			self.assertEqual(first['Content-Length'], str(len(b'%PDF-1.7 first')))
+			self.assertIn('attachment', first['Content-Disposition'])
+			etag = first['ETag']
+			# Repeat downloads stream the stored file
+			second = self.client.get(url)
+			self.assertEqual(b''.join(second.streaming_content), b'%PDF-1.7 first')
+			self.assertEqual(second['ETag'], etag)
+			self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+			self.assertEqual(render.call_count, 1)
+		profile.name = 'Renamed Person'
+		profile.save()
+		# The re-render job runs inline (JOBS_EAGER), so the new version is served at once
+		render = mock.Mock(side_effect=lambda request, out: out.write(b'%PDF-1.7 second'))
+		with mock.patch.dict(pdfs.DOCUMENTS, about=(pdfs.about_pdf_version, render)):
+			third = self.client.get(url)
+			self.assertEqual(b''.join(third.streaming_content), b'%PDF-1.7 second')
+			self.assertNotEqual(third['ETag'], etag)
+			self.assertEqual(render.call_count, 1)
+		# Only the current version is kept on disk
+		self.assertEqual(len([p for p in os.listdir(self.pdf_dir.options['PDF_CACHE_DIR']) if p.endswith('.pdf')]), 1)
+
+	def test_worker_renders_edits_its_own_cache_has_not_seen(self):
+		from unittest import mock
+		from . import pdfs
+		from .context_processors import PROFILE_SNAPSHOT_CACHE_KEY, get_profile_snapshot
+		from .jobs import run_pending
+		from .models import Profile
+		profile = Profile.objects.create(name='Resume Person')
+		url = reverse('portfolio:about_pdf')
+		seen = []
+
+		def render(request, out):
+			seen.append(get_profile_snapshot(request)['name'])
+			out.write(f'%PDF-1.7 {seen[-1]}'.encode())
+		with self.settings(JOBS_EAGER=False), mock.patch.dict(pdfs.DOCUMENTS, about=(pdfs.about_pdf_version, render)):
+			first = self.client.get(url)
+			worker_snapshot = cache.get(PROFILE_SNAPSHOT_CACHE_KEY)
+			profile.name = 'Renamed Person'
+			profile.save()
+			# The web process has seen the edit: it serves the old file and queues a render
+			self.assertEqual(self.client.get(url)['ETag'], first['ETag'])
+			# The worker's own cache still holds the snapshot from before the edit
+			cache.clear()
+			cache.set(PROFILE_SNAPSHOT_CACHE_KEY, worker_snapshot)
+			self.assertEqual(run_pending(['pdf']), 1)
+			cache.clear()
+			fresh = self.client.get(url)
+			self.assertNotEqual(fresh['ETag'], first['ETag'])
+			self.assertEqual(b''.join(fresh.streaming_content), b'%PDF-1.7 Renamed Person')
+		self.assertEqual(seen, ['Resume Person', 'Renamed Person'])
 
 @override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
 				   MIDDLEWARE=[m for m in settings.MIDDLEWARE if m != 'myportfolio.middleware.ratelimit.SimpleRateLimitMiddleware'])
@@ -185,3 +547,746 @@ class HomePageTests(TestCase):
 		# Contains next back to testimonials
 		self.assertIn('next=' + reverse('portfolio:testimonials'), resp.content.decode('utf-8'))
 
+
+class ProfileSnapshotTests(TestCase):
+	def setUp(self):
+		cache.clear()
+
+	def test_snapshot_is_cached_between_requests(self):
+		from .context_processors import profile
+		from .models import Profile
+		Profile.objects.create(name='Snapshot Person')
+		first = profile(None)['PROFILE']
+		self.assertEqual(first['name'], 'Snapshot Person')
+		# Second call is served from the cache without touching the DB
+		with self.assertNumQueries(0):
+			self.assertEqual(profile(None)['PROFILE']['name'], 'Snapshot Person')
+
+	def test_snapshot_lifetime_follows_the_cache_backend(self):
+		from unittest import mock
+		from .caching import LOCAL_PAGE_CACHE_SECONDS
+		from .context_processors import PROFILE_SNAPSHOT_CACHE_KEY, get_profile_snapshot
+		with mock.patch.object(cache, 'set', wraps=cache.set) as cache_set:
+			get_profile_snapshot()
+		cache_set.assert_called_once_with(PROFILE_SNAPSHOT_CACHE_KEY, mock.ANY, LOCAL_PAGE_CACHE_SECONDS)
+
+	def test_snapshot_rebuilt_after_related_item_change(self):
+		from .context_processors import profile
+		from .models import Profile, ExperienceItem
+		p = Profile.objects.create(name='Snapshot Person')
+		self.assertEqual(profile(None)['PROFILE']['experience'], [])
+		ExperienceItem.objects.create(profile=p, role='Engineer', company='Acme')
+		exp = profile(None)['PROFILE']['experience']
+		self.assertEqual([e['role'] for e in exp], ['Engineer'])
+		p.name = 'Renamed'
+		p.save()
+		self.assertEqual(profile(None)['PROFILE']['name'], 'Renamed')
+
+	def test_richest_profile_query_count_is_constant(self):
+		from django.db import connection
+		from django.test.utils import CaptureQueriesContext
+		from .context_processors import build_profile_snapshot
+		from .models import Profile, ExperienceItem, AwardItem
+		rich = Profile.objects.create(name='Rich')
+		ExperienceItem.objects.create(profile=rich, role='Engineer')
+		AwardItem.objects.create(profile=rich, name='Award')
+		Profile.objects.create(name='Sparse')
+		build_profile_snapshot()  # warm the SiteSettings singleton
+		with CaptureQueriesContext(connection) as few:
+			snapshot = build_profile_snapshot()
+		self.assertEqual(snapshot['name'], 'Rich')
+		for i in range(10):
+			Profile.objects.create(name=f'Empty {i}')
+		with CaptureQueriesContext(connection) as many:
+			snapshot = build_profile_snapshot()
+		self.assertEqual(snapshot['name'], 'Rich')
+		self.assertEqual(len(few.captured_queries), len(many.captured_queries))
+
+	def test_richest_profile_is_single_query(self):
+		from .context_processors import richest_profile
+		from .models import Profile, EducationItem
+		for i in range(5):
+			Profile.objects.create(name=f'Profile {i}')
+		best = Profile.objects.create(name='Educated')
+		EducationItem.objects.create(profile=best, degree='BSc')
+		with self.assertNumQueries(1):
+			self.assertEqual(richest_profile(Profile).name, 'Educated')
+
+
+class SiteSettingsSoloTests(TestCase):
+	def setUp(self):
+		cache.clear()
+
+	def test_get_solo_reuses_instance_until_saved(self):
+		from .models import SiteSettings
+		ss = SiteSettings.objects.create(brand_name='First')
+		first = SiteSettings.get_solo()
+		self.assertEqual(first.brand_name, 'First')
+		# Only the (pk, updated_at) check
+		with self.assertNumQueries(1):
+			self.assertIs(SiteSettings.get_solo(), first)
+		ss.brand_name = 'Second'
+		ss.save()
+		self.assertEqual(SiteSettings.get_solo().brand_name, 'Second')
+
+	def test_get_solo_reloads_after_an_edit_in_another_process(self):
+		from django.utils import timezone
+		from .models import SiteSettings
+		ss = SiteSettings.objects.create(brand_name='Brand')
+		SiteSettings.get_solo()
+		# No signals and no shared cache: only the row itself changes
+		SiteSettings.objects.filter(pk=ss.pk).update(brand_name='Elsewhere', updated_at=timezone.now())
+		with self.assertNumQueries(2):
+			self.assertEqual(SiteSettings.get_solo().brand_name, 'Elsewhere')
+		SiteSettings.objects.all().delete()
+		self.assertIsNone(SiteSettings.get_solo())
+
+	def test_get_solo_is_memoized_on_request(self):
+		from django.test import RequestFactory
+		from .models import SiteSettings
+		SiteSettings.objects.create(brand_name='Brand')
+		request = RequestFactory().get('/')
+		obj = SiteSettings.get_solo(request)
+		cache.clear()
+		with self.assertNumQueries(0):
+			self.assertIs(SiteSettings.get_solo(request), obj)
+
+
+class LazyContextProcessorTests(TestCase):
+	def setUp(self):
+		cache.clear()
+
+	def test_context_processors_defer_db_access(self):
+		from django.test import RequestFactory
+		from .context_processors import analytics, profile, site_settings
+		request = RequestFactory().get('/')
+		with self.assertNumQueries(0):
+			ctx = {**analytics(request), **profile(request), **site_settings(request)}
+		# First access builds the value (SiteSettings + profile queries) ...
+		self.assertTrue(ctx['PROFILE']['name'])
+		self.assertIn('brand_name', ctx['SITE'])
+		# ... and later accesses reuse it for the rest of the request
+		with self.assertNumQueries(0):
+			ctx['PROFILE']['name']
+			ctx['SITE']['logo_url']
+			str(ctx['CALENDLY_URL'])
+
+	def test_plain_template_does_not_query(self):
+		with self.assertNumQueries(0):
+			resp = self.client.get('/robots.txt')
+		self.assertEqual(resp.status_code, 200)
+
+
+class TaggedPageCacheTests(TestCase):
+	def setUp(self):
+		cache.clear()
+
+	def test_blog_list_served_from_cache_until_post_changes(self):
+		from blog.models import Post
+		Post.objects.create(title='First post', slug='first-post', author='Me', content='Hello')
+		url = reverse('blog:post_list')
+		self.assertContains(self.client.get(url), 'First post')
+		# Only the conditional GET aggregate (not memoized with a per-process cache)
+		with self.assertNumQueries(1):
+			self.assertContains(self.client.get(url), 'First post')
+		Post.objects.create(title='Second post', slug='second-post', author='Me', content='Hi')
+		self.assertContains(self.client.get(url), 'Second post')
+
+	def test_unrelated_change_keeps_entry(self):
+		url = reverse('portfolio:testimonials')
+		self.client.get(url)
+		Project.objects.create(title='P', slug='p', description='d', date='2024-01-01')
+		with self.assertNumQueries(0):
+			self.client.get(url)
+		Testimonial.objects.create(name='Client', content='Great', featured=True)
+		self.assertContains(self.client.get(url), 'Great')
+
+	def test_project_tag_change_invalidates_project_list(self):
+		from .models import Tag
+		p = Project.objects.create(title='Tagged', slug='tagged', description='d', date='2024-01-01')
+		url = reverse('portfolio:project_list')
+		self.assertNotContains(self.client.get(url), 'Rustacean')
+		p.tags.add(Tag.objects.create(name='Rustacean'))
+		self.assertContains(self.client.get(url), 'Rustacean')
+
+
+	def test_page_lifetime_depends_on_cache_backend(self):
+		from .caching import LOCAL_PAGE_CACHE_SECONDS, PAGE_CACHE_SECONDS, page_cache_seconds
+		# Local memory: other workers miss the invalidations, so keep pages briefly
+		self.assertEqual(page_cache_seconds(), LOCAL_PAGE_CACHE_SECONDS)
+		shared = {'default': {'BACKEND': 'django.core.cache.backends.db.DatabaseCache', 'LOCATION': 'cache'}}
+		with self.settings(CACHES=shared):
+			self.assertEqual(page_cache_seconds(), PAGE_CACHE_SECONDS)
+
+	def test_deploy_check_requires_a_shared_cache_for_the_worker(self):
+		from .checks import check_shared_cache
+		with self.settings(JOBS_EAGER=False):
+			self.assertEqual([e.id for e in check_shared_cache(None)], ['portfolio.E001'])
+		with self.settings(JOBS_EAGER=True):
+			self.assertEqual(check_shared_cache(None), [])
+		shared = {'default': {'BACKEND': 'django.core.cache.backends.db.DatabaseCache', 'LOCATION': 'cache'}}
+		with self.settings(JOBS_EAGER=False, CACHES=shared):
+			self.assertEqual(check_shared_cache(None), [])
+
+class PageCacheStampedeTests(SimpleTestCase):
+	def setUp(self):
+		cache.clear()
+
+	def test_expired_entry_is_rebuilt_once_under_concurrency(self):
+		import threading
+		from django.http import HttpResponse
+		from django.test import RequestFactory
+		from .caching import cache_page_tagged
+		calls = []
+		lock = threading.Lock()
+
+		@cache_page_tagged(timeout=1, tags=('post',))
+		def slow_view(request):
+			with lock:
+				calls.append(1)
+				n = len(calls)
+			time.sleep(0.3)
+			return HttpResponse(f'render {n}')
+
+		factory = RequestFactory()
+		self.assertEqual(slow_view(factory.get('/hot/')).content, b'render 1')
+		time.sleep(1.1)  # past the soft expiry; the stale copy is still stored
+
+		barrier = threading.Barrier(8)
+		bodies = []
+
+		def hit():
+			barrier.wait()
+			resp = slow_view(factory.get('/hot/'))
+			with lock:
+				bodies.append(resp.content)
+
+		threads = [threading.Thread(target=hit) for _ in range(8)]
+		for t in threads:
+			t.start()
+		for t in threads:
+			t.join()
+		# One request rebuilt the page; the others were served the stale copy
+		self.assertEqual(len(calls), 2)
+		self.assertEqual(bodies.count(b'render 2'), 1)
+		self.assertEqual(bodies.count(b'render 1'), 7)
+		self.assertEqual(slow_view(factory.get('/hot/')).content, b'render 2')
+
+
+@override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+				   MIDDLEWARE=[m for m in settings.MIDDLEWARE if m != 'myportfolio.middleware.ratelimit.SimpleRateLimitMiddleware'])
+class SharedPageCsrfTests(TestCase):
+	def setUp(self):
+		cache.clear()
+
+	def test_home_html_is_shared_across_visitors(self):
+		resp = self.client.get(reverse('portfolio:home'))
+		self.assertEqual(resp.status_code, 200)
+		# The footer form ships without a token; main.js fills it per visitor
+		self.assertNotRegex(resp.content.decode(), r'name="csrfmiddlewaretoken" value="[^"]+"')
+		self.assertNotIn('csrftoken', resp.cookies)
+		self.assertFalse(resp.has_header('Vary') and 'Cookie' in resp['Vary'])
+		other = self.client_class()
+		other.cookies['csrftoken'] = 'x' * 32
+		with self.assertNumQueries(0):
+			self.assertEqual(other.get(reverse('portfolio:home')).content, resp.content)
+
+	def test_footer_form_posts_with_token_from_endpoint(self):
+		client = self.client_class(enforce_csrf_checks=True)
+		page = client.get(reverse('portfolio:home'))
+		self.assertContains(page, 'data-csrf')
+		token = client.get(reverse('portfolio:csrf_token')).json()['token']
+		self.assertIn('csrftoken', client.cookies)
+		resp = client.post(reverse('portfolio:subscribe'), {
+			'email': 'footer@example.com', 'hp': '', 'next': '/', 'csrfmiddlewaretoken': token,
+		})
+		self.assertEqual(resp.status_code, 302)
+		self.assertTrue(Subscription.objects.filter(email='footer@example.com').exists())
+
+	def test_flash_messages_are_not_cached(self):
+		self.client.get(reverse('portfolio:home'))
+		self.client.post(reverse('portfolio:subscribe'), {'email': 'flash@example.com', 'hp': '', 'next': '/'})
+		self.assertContains(self.client.get(reverse('portfolio:home')), 'check your email')
+		# The next visitor gets the shared copy without someone else's message
+		self.assertNotContains(self.client_class().get(reverse('portfolio:home')), 'check your email')
+
+
+class ConditionalGetTests(TestCase):
+	def setUp(self):
+		cache.clear()
+		from blog.models import Post
+		self.post = Post.objects.create(title='Validated', slug='validated', author='Me', content='Body')
+
+	def test_unchanged_page_returns_304_without_rendering(self):
+		url = reverse('blog:post_detail', args=['validated'])
+		resp = self.client.get(url)
+		self.assertEqual(resp.status_code, 200)
+		self.assertTrue(resp.has_header('Last-Modified'))
+		etag = resp['ETag']
+		# A per-process cache may have missed other processes' edits: one aggregate query
+		with self.assertNumQueries(1):
+			again = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+		self.assertEqual(again.status_code, 304)
+		self.assertEqual(again.content, b'')
+		since = self.client.get(url, HTTP_IF_MODIFIED_SINCE=resp['Last-Modified'])
+		self.assertEqual(since.status_code, 304)
+		# With a shared cache the validators are memoized and revalidation costs no queries
+		from unittest import mock
+		with mock.patch('portfolio.conditional.is_shared_cache', return_value=True):
+			self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+			with self.assertNumQueries(0):
+				self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+	def test_edit_made_by_another_process_is_seen(self):
+		from django.utils import timezone
+		from blog.models import Post
+		url = reverse('blog:post_detail', args=['validated'])
+		etag = self.client.get(url)['ETag']
+		# No signals: this process's tag versions are not bumped
+		Post.objects.filter(pk=self.post.pk).update(content='Edited elsewhere', updated_at=timezone.now())
+		self.assertContains(self.client.get(url, HTTP_IF_NONE_MATCH=etag), 'Edited elsewhere')
+
+	def test_validators_only_for_public_200_responses(self):
+		from django.contrib.auth.models import User
+		from .models import Service
+		Service.objects.create(title='Draft service', slug='draft-service', description='d', is_published=False)
+		url = reverse('portfolio:service_detail', args=['draft-service'])
+		missing = self.client.get(url)
+		self.assertEqual(missing.status_code, 404)
+		self.assertFalse(missing.has_header('ETag'))
+		self.client.force_login(User.objects.create_user('staff', password='x', is_staff=True))
+		staff = self.client.get(url)
+		self.assertEqual(staff.status_code, 200)
+		self.assertFalse(staff.has_header('ETag'))
+		self.assertFalse(staff.has_header('Last-Modified'))
+
+	def test_edits_and_deletions_change_the_etag(self):
+		url = reverse('blog:post_list')
+		etag = self.client.get(url)['ETag']
+		self.post.title = 'Renamed'
+		self.post.save()
+		resp = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+		self.assertContains(resp, 'Renamed')
+		etag = resp['ETag']
+		from blog.models import Post
+		Post.objects.create(title='Other', slug='other', author='Me', content='x')
+		etag = self.client.get(url)['ETag']
+		Post.objects.filter(slug='other').delete()
+		self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+	def test_profile_item_and_tag_edits_are_seen(self):
+		from .models import Profile, SkillItem, Tag
+		profile = Profile.objects.create(name='Dev')
+		about = reverse('portfolio:about')
+		etag = self.client.get(about)['ETag']
+		SkillItem.objects.create(profile=profile, name='Go')
+		self.assertEqual(self.client.get(about, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+		p = Project.objects.create(title='P', slug='p', description='d', date='2024-01-01')
+		url = reverse('portfolio:project_detail', args=['p'])
+		etag = self.client.get(url)['ETag']
+		p.tags.add(Tag.objects.create(name='Rust'))
+		self.assertContains(self.client.get(url, HTTP_IF_NONE_MATCH=etag), 'Rust')
+
+	def test_etag_differs_per_page(self):
+		a = self.client.get(reverse('blog:post_list'))['ETag']
+		b = self.client.get(reverse('blog:post_list') + '?page=2')['ETag']
+		self.assertNotEqual(a, b)
+
+
+class BlogCategorySlugTests(TestCase):
+	def setUp(self):
+		cache.clear()
+
+	def test_category_slug_is_kept_in_sync(self):
+		from blog.models import Post
+		post = Post.objects.create(title='ML', slug='ml', author='Me', content='x', category='Machine Learning')
+		self.assertEqual(post.category_slug, 'machine-learning')
+		post.category = 'Data & AI'
+		post.save(update_fields=['category'])
+		post.refresh_from_db()
+		self.assertEqual(post.category_slug, 'data-ai')
+
+	def test_category_page_filters_in_sql(self):
+		from blog.models import Post
+		Post.objects.create(title='In category', slug='in', author='Me', content='x', category='Machine Learning')
+		Post.objects.create(title='Elsewhere', slug='out', author='Me', content='x', category='Web')
+		Post.objects.create(title='Draft', slug='draft', author='Me', content='x', category='Machine Learning', published=False)
+		resp = self.client.get(reverse('blog:post_list_by_category', args=['machine-learning']))
+		self.assertContains(resp, 'In category')
+		self.assertNotContains(resp, 'Elsewhere')
+		self.assertNotContains(resp, 'Draft')
+		self.assertEqual(resp.context['page_obj'].paginator.count, 1)
+
+
+class BlogTagTests(TestCase):
+	def setUp(self):
+		cache.clear()
+
+	def test_tag_items_follow_the_text_field(self):
+		from blog.models import Post
+		post = Post.objects.create(title='T', slug='t', author='Me', content='x', tags='Django, Web Perf, django')
+		self.assertEqual(sorted(post.tag_items.values_list('slug', flat=True)), ['django', 'web-perf'])
+		post.tags = 'Testing'
+		post.save(update_fields=['tags'])
+		self.assertEqual(list(post.tag_items.values_list('name', flat=True)), ['Testing'])
+
+	def test_tag_page_and_sitemaps_query_the_tag_table(self):
+		from blog.models import Post
+		Post.objects.create(title='Tagged post', slug='a', author='Me', content='x', tags='Web Perf')
+		Post.objects.create(title='Other post', slug='b', author='Me', content='x', tags='Django')
+		Post.objects.create(title='Hidden', slug='c', author='Me', content='x', tags='Secret', published=False)
+		resp = self.client.get(reverse('blog:post_list_by_tag', args=['web-perf']))
+		self.assertContains(resp, 'Tagged post')
+		self.assertNotContains(resp, 'Other post')
+		from .sitemaps import BlogTagSitemap
+		with self.assertNumQueries(1):
+			self.assertEqual(BlogTagSitemap().items(), ['django', 'web-perf'])
+		html = self.client.get(reverse('portfolio:html_sitemap'))
+		self.assertEqual([t['slug'] for t in html.context['tags']], ['django', 'web-perf'])
+
+
+class BlogSearchTests(TestCase):
+	def setUp(self):
+		cache.clear()
+		from blog.models import Post
+		Post.objects.create(title='Caching in Django', slug='caching', author='Me', content='Tag versions and stale pages.')
+		Post.objects.create(title='Notes', slug='notes', author='Me', content='A short aside about caching layers.')
+		Post.objects.create(title='Unrelated', slug='unrelated', author='Me', content='Nothing to see.')
+
+	def test_results_are_ranked(self):
+		resp = self.client.get(reverse('blog:post_list'), {'q': 'caching'})
+		titles = [p.title for p in resp.context['posts']]
+		# The title hit outranks the body-only hit
+		self.assertEqual(titles, ['Caching in Django', 'Notes'])
+
+	def test_index_follows_edits_and_deletes(self):
+		from blog.models import Post
+		from blog.search import search_posts
+		post = Post.objects.get(slug='unrelated')
+		post.content = 'Now it mentions profiling.'
+		post.save()
+		self.assertEqual([p.slug for p in search_posts(Post.objects.all(), 'profil')], ['unrelated'])
+		post.delete()
+		self.assertFalse(search_posts(Post.objects.all(), 'profiling').exists())
+
+	def test_query_syntax_is_not_interpreted(self):
+		from blog.models import Post
+		from blog.search import search_posts
+		self.assertEqual(search_posts(Post.objects.all(), '"caching")(^').count(), 2)
+		self.assertFalse(search_posts(Post.objects.all(), '***').exists())
+
+
+class SiteSearchTests(TestCase):
+	def setUp(self):
+		cache.clear()
+		from blog.models import Post
+		from .models import Service
+		Project.objects.create(title='Latency dashboard', slug='latency', description='Grafana panels for latency.', date='2024-01-01')
+		Post.objects.create(title='Cutting latency', slug='cutting-latency', author='Me', content='How we cut p99 latency in half.')
+		Post.objects.create(title='Draft on latency', slug='draft', author='Me', content='latency', published=False)
+		Service.objects.create(title='Performance audit', description='Find latency hot spots.')
+		Testimonial.objects.create(name='Ada', content='Great work on latency.', featured=True)
+
+	def test_results_snippets_and_facets(self):
+		resp = self.client.get(reverse('portfolio:search'), {'q': 'latency'})
+		self.assertEqual(resp.status_code, 200)
+		counts = {f['kind']: f['count'] for f in resp.context['facets']}
+		self.assertEqual(counts, {'project': 1, 'post': 1, 'service': 1, 'testimonial': 1})
+		self.assertNotContains(resp, 'Draft on latency')
+		self.assertContains(resp, '<mark>latency</mark>', html=False)
+
+	def test_type_filter_keeps_all_facets(self):
+		resp = self.client.get(reverse('portfolio:search'), {'q': 'latency', 'type': 'post'})
+		self.assertEqual([d.title for d in resp.context['results']], ['Cutting latency'])
+		self.assertEqual(resp.context['facet_total'], 4)
+
+	def test_page_and_facets_come_from_one_query(self):
+		from .search import site_search
+		site_search('warm')  # resolve the backend once
+		with self.assertNumQueries(1):
+			results, facets, total = site_search('latency', per_page=2)
+		self.assertEqual(len(results), 2)
+		self.assertEqual(total, 4)
+
+	def test_index_is_updated_on_save_and_delete(self):
+		from .models import SearchDocument, Tag
+		from .search import site_search
+		p = Project.objects.get(slug='latency')
+		p.tags.add(Tag.objects.create(name='Prometheus'))
+		self.assertEqual([d.object_id for d in site_search('prometheus')[0]], [p.pk])
+		Testimonial.objects.filter(name='Ada').get().delete()
+		self.assertFalse(SearchDocument.objects.filter(kind='testimonial').exists())
+
+
+	def test_first_migrate_fills_the_index_of_the_migrated_database(self):
+		from unittest import mock
+		from .apps import _prepare_search
+		from .models import SearchDocument
+		SearchDocument.objects.all().delete()
+		with mock.patch('portfolio.search.rebuild') as rebuild:
+			_prepare_search(sender=None, using='default')
+		rebuild.assert_called_once_with('default')
+		# The rebuild writes to the alias it is given
+		from .search import rebuild as real_rebuild
+		with mock.patch.object(SearchDocument.objects, 'using', wraps=SearchDocument.objects.using) as using:
+			self.assertEqual(real_rebuild(using='default'), 4)
+		self.assertEqual({c.args for c in using.call_args_list}, {('default',)})
+
+class SearchSuggestTests(TestCase):
+	def setUp(self):
+		cache.clear()
+		from .models import Tag
+		p = Project.objects.create(title='Latency dashboard', slug='latency', description='d', date='2024-01-01', category='Observability')
+		p.tags.add(Tag.objects.create(name='Prometheus'))
+
+	def test_prefix_matches_titles_tags_and_categories(self):
+		url = reverse('portfolio:search_suggest')
+		labels = [s['label'] for s in self.client.get(url, {'q': 'dash'}).json()['suggestions']]
+		self.assertEqual(labels, ['Latency dashboard'])
+		kinds = {s['label']: s['kind'] for s in self.client.get(url, {'q': 'pro'}).json()['suggestions']}
+		self.assertEqual(kinds, {'Prometheus': 'tech'})
+		self.assertEqual(self.client.get(url, {'q': 'obs'}).json()['suggestions'][0]['kind'], 'category')
+
+	def test_lookups_skip_the_database_until_content_changes(self):
+		from blog.models import Post
+		from .suggest import suggest
+		suggest('warm')
+		with self.assertNumQueries(0):
+			self.assertEqual(suggest('lat')[0]['label'], 'Latency dashboard')
+		Post.objects.create(title='Latency budgets', slug='budgets', author='Me', content='x')
+		self.assertIn('Latency budgets', [s['label'] for s in suggest('lat')])
+
+
+	def test_index_expires_under_a_per_process_cache(self):
+		from unittest import mock
+		from blog.models import Post
+		from . import suggest as suggest_module
+		suggest_module.suggest('warm')
+		# Published by another process: no tag bump reaches this one
+		with mock.patch('portfolio.signals.invalidate_tags'):
+			Post.objects.create(title='Latency budgets', slug='budgets', author='Me', content='x')
+		self.assertNotIn('Latency budgets', [s['label'] for s in suggest_module.suggest('lat')])
+		later = time.monotonic() + suggest_module.LOCAL_PAGE_CACHE_SECONDS
+		with mock.patch.object(suggest_module.time, 'monotonic', return_value=later):
+			self.assertIn('Latency budgets', [s['label'] for s in suggest_module.suggest('lat')])
+
+class GalleryPaginationTests(TestCase):
+	def setUp(self):
+		cache.clear()
+		from django.core.files.uploadedfile import SimpleUploadedFile
+		from django.utils import timezone
+		from blog.models import Post
+		from .models import GalleryItem
+		self.media = self.settings(MEDIA_ROOT=tempfile.mkdtemp(), JOBS_EAGER=True)
+		self.media.enable()
+		gif = b'GIF89a\x01\x00\x01\x00\x80\x00\x00\x00\x00\x00\xff\xff\xff!\xf9\x04\x01\x00\x00\x00\x00,\x00\x00\x00\x00\x01\x00\x01\x00\x00\x02\x02D\x01\x00;'
+		for i in range(6):
+			Project.objects.create(title=f'Project {i}', slug=f'p{i}', description='d', date=f'2024-01-0{i + 1}',
+								   image=SimpleUploadedFile(f'p{i}.gif', gif, content_type='image/gif'))
+		for i in range(4):
+			Post.objects.create(title=f'Post {i}', slug=f'post-{i}', author='Me', content='x',
+								created_at=timezone.now() - timezone.timedelta(days=i),
+								thumbnail=SimpleUploadedFile(f'b{i}.gif', gif, content_type='image/gif'))
+		GalleryItem.objects.create(title='Custom shot', image=SimpleUploadedFile('c.gif', gif, content_type='image/gif'))
+
+	def tearDown(self):
+		self.media.disable()
+		shutil.rmtree(self.media.options['MEDIA_ROOT'], ignore_errors=True)
+
+	def test_newest_first_across_sources_with_db_pagination(self):
+		resp = self.client.get(reverse('portfolio:gallery'))
+		titles = [it['title'] for it in resp.context['items']]
+		self.assertEqual(len(titles), 8)
+		self.assertEqual(titles[:2], ['Custom shot', 'Post 0'])
+		self.assertEqual(resp.context['paginator'].count, 11)
+		page2 = [it['title'] for it in self.client.get(reverse('portfolio:gallery'), {'page': 2}).context['items']]
+		self.assertEqual(page2, ['Project 2', 'Project 1', 'Project 0'])
+
+	def test_source_filter(self):
+		resp = self.client.get(reverse('portfolio:gallery'), {'src': 'blog'})
+		self.assertEqual([it['source'] for it in resp.context['items']], ['Blog'] * 4)
+		resp = self.client.get(reverse('portfolio:gallery'), {'src': 'custom'})
+		self.assertEqual([it['title'] for it in resp.context['items']], ['Custom shot'])
+
+	def test_image_metadata_stored_on_upload(self):
+		p = Project.objects.get(slug='p0')
+		self.assertEqual((p.image_width, p.image_height), (1, 1))
+		self.assertEqual(p.image_bytes, p.image.size)
+		self.assertRegex(p.image_color, r'^#[0-9a-f]{6}$')
+		# Transparent images get no placeholder; it would show through
+		self.assertEqual(p.image_placeholder, '')
+		p.image = None
+		p.save()
+		p.refresh_from_db()
+		self.assertEqual((p.image_width, p.image_bytes, p.image_color, p.image_placeholder), (None, None, '', ''))
+
+	def test_gallery_does_not_open_image_files(self):
+		# With the files gone, sizes can only come from the stored columns
+		shutil.rmtree(self.media.options['MEDIA_ROOT'])
+		resp = self.client.get(reverse('portfolio:gallery'))
+		self.assertEqual({(it['width'], it['height']) for it in resp.context['items']}, {(1, 1)})
+		self.assertContains(resp, 'height="1"', count=8)
+		self.assertContains(resp, 'width="1"', count=8)
+
+	def test_backfill_image_metadata(self):
+		from io import StringIO
+		from django.core.management import call_command
+		Project.objects.update(image_width=None, image_height=None, image_bytes=None, image_color='')
+		before = Project.objects.latest('updated_at').updated_at
+		call_command('backfill_image_metadata', stdout=StringIO())
+		self.assertFalse(Project.objects.filter(image_width__isnull=True).exists())
+		self.assertEqual(set(Project.objects.values_list('image_height', flat=True)), {1})
+		# Conditional GET validators must change with the markup
+		self.assertFalse(Project.objects.filter(updated_at__lte=before).exists())
+
+	def test_variants_generated_on_upload(self):
+		from io import BytesIO
+		from PIL import Image
+		from django.core.files.storage import default_storage
+		from django.core.files.uploadedfile import SimpleUploadedFile
+		buf = BytesIO()
+		Image.new('RGB', (700, 350), (200, 40, 40)).save(buf, 'PNG')
+		p = Project.objects.create(title='Wide', slug='wide', description='d', date='2024-02-01',
+								   image=SimpleUploadedFile('wide.png', buf.getvalue(), content_type='image/png'))
+		variants = Project.objects.get(pk=p.pk).image_variants
+		self.assertEqual(variants['source'], p.image.name)
+		self.assertEqual((variants['width'], variants['height']), (700, 350))
+		self.assertEqual(sorted(variants['formats']), ['avif', 'jpeg', 'webp'])
+		self.assertEqual([w for w, _ in variants['formats']['webp']], [160, 320, 640, 700])
+		for files in variants['formats'].values():
+			self.assertTrue(all(default_storage.exists(name) for _, name in files))
+		with default_storage.open(variants['formats']['webp'][0][1]) as f:
+			self.assertEqual(Image.open(f).size, (160, 80))
+
+	def test_missing_or_failing_encoders_are_skipped(self):
+		from io import BytesIO
+		from unittest import mock
+		from PIL import Image
+		from django.core.files.uploadedfile import SimpleUploadedFile
+		from . import derivatives
+		buf = BytesIO()
+		Image.new('RGB', (200, 100), (20, 120, 40)).save(buf, 'PNG')
+		real_encode = derivatives._encode
+
+		def encode(img, fmt):
+			if fmt == 'webp':
+				raise OSError('encoder error')
+			return real_encode(img, fmt)
+		# No AVIF in this Pillow build, and WebP fails
+		with mock.patch.object(derivatives.features, 'check', side_effect=lambda fmt: fmt != 'avif'), \
+				mock.patch.object(derivatives, '_encode', side_effect=encode):
+			p = Project.objects.create(title='Plain', slug='plain', description='d', date='2024-02-01',
+									   image=SimpleUploadedFile('plain.png', buf.getvalue(), content_type='image/png'))
+		p.refresh_from_db()
+		self.assertEqual(sorted(p.image_variants['formats']), ['jpeg'])
+		# The metadata is stored whatever happened to the derivatives
+		self.assertEqual((p.image_width, p.image_height), (200, 100))
+		self.assertNotEqual(p.image_placeholder, '')
+
+	def test_responsive_image_tag(self):
+		from django.template import Context, Template
+		p = Project.objects.get(slug='p0')
+		html = Template('{% load site_extras %}{% responsive_image p.image sizes="50vw" alt="Shot" loading="lazy" %}').render(Context({'p': p}))
+		self.assertTrue(html.startswith('<picture><source type="image/avif" srcset="'))
+		self.assertIn('<source type="image/webp"', html)
+		self.assertIn('sizes="50vw"', html)
+		self.assertIn('alt="Shot"', html)
+		self.assertIn('width="1"', html)
+		self.assertNotIn(f'src="{p.image.url}"', html)
+		plain = Template('{% load site_extras %}{% responsive_image url alt="x" %}').render(Context({'url': '/media/a.png'}))
+		self.assertEqual(plain, '<img alt="x" src="/media/a.png">')
+
+	def test_generate_image_variants_command(self):
+		from io import StringIO
+		from django.core.management import call_command
+		Project.objects.update(image_variants=None)
+		before = Project.objects.latest('updated_at').updated_at
+		call_command('generate_image_variants', stdout=StringIO())
+		self.assertFalse(Project.objects.filter(image_variants__isnull=True).exists())
+		self.assertFalse(Project.objects.filter(updated_at__lte=before).exists())
+		self.assertContains(self.client.get(reverse('portfolio:gallery')), '<picture>', count=8)
+
+
+class JobQueueTests(TestCase):
+	def setUp(self):
+		self.media = self.settings(MEDIA_ROOT=tempfile.mkdtemp(), JOBS_EAGER=False)
+		self.media.enable()
+
+	def tearDown(self):
+		self.media.disable()
+		shutil.rmtree(self.media.options['MEDIA_ROOT'], ignore_errors=True)
+
+	def test_upload_is_processed_by_a_job(self):
+		from io import BytesIO
+		from PIL import Image
+		from django.core.files.uploadedfile import SimpleUploadedFile
+		from .jobs import run_pending
+		from .models import Job
+		buf = BytesIO()
+		Image.new('RGB', (400, 200), (10, 120, 200)).save(buf, 'JPEG')
+		p = Project.objects.create(title='Queued', slug='queued', description='d', date='2024-03-01',
+								   image=SimpleUploadedFile('q.jpg', buf.getvalue(), content_type='image/jpeg'))
+		p.save()  # a second save does not queue a second job
+		job = Job.objects.get()
+		self.assertEqual((job.kind, job.status, job.key), ('image', 'pending', f'portfolio.project:{p.pk}'))
+		p.refresh_from_db()
+		self.assertIsNone(p.image_variants)
+		self.assertIsNone(p.image_width)
+		# Until the job has run, pages use the original file
+		resp = self.client.get(reverse('portfolio:project_detail', args=['queued']))
+		self.assertContains(resp, f'src="{p.image.url}"')
+		self.assertNotContains(resp, '<picture>')
+
+		self.assertEqual(run_pending(), 1)
+		job.refresh_from_db()
+		self.assertEqual(job.status, 'done')
+		p.refresh_from_db()
+		self.assertEqual((p.image_width, p.image_height), (400, 200))
+		self.assertTrue(p.image_placeholder.startswith('data:image/webp;base64,'))
+		self.assertLess(len(p.image_placeholder), 600)
+		self.assertEqual([w for w, _ in p.image_variants['formats']['jpeg']], [160, 320, 400])
+		self.assertFalse(Job.objects.filter(status='pending').exists())
+		resp = self.client.get(reverse('portfolio:project_detail', args=['queued']))
+		self.assertContains(resp, '<picture>')
+		# The placeholder is painted inline behind the image
+		self.assertContains(resp, f'style="background: {p.image_color} url({p.image_placeholder}) center / cover no-repeat"')
+
+	def test_failed_job_is_retried_with_backoff_then_given_up(self):
+		from django.utils import timezone
+		from . import jobs
+		from .models import Job
+		calls = []
+		def flaky(payload):
+			calls.append(payload)
+			raise RuntimeError('boom')
+		jobs.HANDLERS['test-flaky'] = flaky
+		self.addCleanup(jobs.HANDLERS.pop, 'test-flaky')
+		job = jobs.enqueue('test-flaky', 'x', {'n': 1})
+		Job.objects.filter(pk=job.pk).update(max_attempts=2)
+		self.assertEqual(jobs.run_pending(['test-flaky']), 0)
+		job.refresh_from_db()
+		self.assertEqual((job.status, job.attempts), ('pending', 1))
+		self.assertIn('RuntimeError: boom', job.last_error)
+		self.assertGreater(job.run_after, timezone.now())
+		# Not due yet
+		self.assertEqual(jobs.claim(['test-flaky'], 10), [])
+		Job.objects.filter(pk=job.pk).update(run_after=timezone.now())
+		jobs.run_pending(['test-flaky'])
+		job.refresh_from_db()
+		self.assertEqual((job.status, job.attempts), ('failed', 2))
+		self.assertEqual(calls, [{'n': 1}, {'n': 1}])
+
+	def test_orphaned_running_job_is_reclaimed(self):
+		from datetime import timedelta
+		from django.utils import timezone
+		from . import jobs
+		from .models import Job
+		job = Job.objects.create(kind='image', key='k', status='running', attempts=1,
+								 locked_at=timezone.now() - timedelta(seconds=30))
+		self.assertEqual(jobs.claim(['image'], 10), [])
+		Job.objects.filter(pk=job.pk).update(locked_at=timezone.now() - timedelta(seconds=jobs.LOCK_SECONDS + 1))
+		claimed = jobs.claim(['image'], 10)
+		self.assertEqual([j.pk for j in claimed], [job.pk])
+		self.assertEqual(claimed[0].attempts, 2)
+		self.assertEqual(jobs.claim(['image'], 10), [])
@@ -15,7 +15,10 @@ urlpatterns = [
     path('unsubscribe/<uuid:token>/', views.unsubscribe, name='unsubscribe'),
     path('recommend/', views.recommend, name='recommend'),
     path('sitemap/', views.html_sitemap, name='html_sitemap'),
+    path('search/', views.search, name='search'),
+    path('search/suggest', views.search_suggest, name='search_suggest'),
     path('contact/', views.contact, name='contact'),
+    path('csrf/', views.csrf_token, name='csrf_token'),
     path('privacy/', views.privacy, name='privacy'),
     path('terms/', views.terms, name='terms'),
     path('gallery/', views.gallery, name='gallery'),
@@ -1,27 +1,39 @@
+import logging
+import os
+from pathlib import Path
+
 from django.shortcuts import render, redirect
-from django.http import HttpResponse
+from django.http import FileResponse, HttpResponse, JsonResponse
 from django.urls import reverse
-from django.core.mail import send_mail, EmailMessage
+from django.core.mail import send_mail
 from django.contrib import messages
 from django.conf import settings
 from django.utils import timezone
-from datetime import datetime, date, time as dtime
-from blog.models import Post
-from .models import Message, Project, Testimonial, Tag, GalleryItem, Subscription, MessageAttachment, Service
-from django.db import models
+from blog.models import Post, Tag as BlogTag
+from .models import Message, Project, Testimonial, Tag, GalleryItem, Subscription, MessageAttachment, Service, SiteSettings, SearchDocument
+from django.db import models, transaction
 from django.db.models import Count
+from django.db.models.functions import Cast, Lower
 from .forms import ContactForm, SubscribeForm, TestimonialForm
 from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
 from django.shortcuts import get_object_or_404
 from django.template.loader import render_to_string
-from django.views.decorators.cache import cache_page
-from django.utils.text import slugify
-from django.apps import apps
-
-
-# Shorter cache for homepage while developing; keep 5 minutes in production
-HOME_CACHE_SECONDS = (60 if settings.DEBUG else 60 * 5)
-@cache_page(HOME_CACHE_SECONDS)
+from .caching import cache_page_tagged
+from .conditional import conditional_page
+from .outbox import queue_email
+from . import pdfs
+from .search import site_search
+from .suggest import suggest
+from django.middleware.csrf import get_token
+from django.views.decorators.cache import never_cache
+from django.views.decorators.csrf import ensure_csrf_cookie
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+logger = logging.getLogger(__name__)
+
+
+@cache_page_tagged(tags=('post', 'project', 'testimonial'))
 def home(request):
 	# simply render the homepage which contains the form
 	posts = Post.objects.filter(published=True).order_by('-created_at')[:3]
@@ -35,8 +47,7 @@ def home(request):
 		projects = featured_list
 	# Site settings control for testimonials visibility and limit
 	try:
-		SiteSettings = apps.get_model('portfolio', 'SiteSettings')
-		ss = SiteSettings.objects.first()
+		ss = SiteSettings.get_solo(request)
 		show_t = True if (not ss or getattr(ss, 'show_testimonials_home', True)) else False
 		limit_t = (getattr(ss, 'testimonials_home_limit', 6) or 6)
 	except Exception:
@@ -75,7 +86,7 @@ def home(request):
 	})
 
 
-@cache_page(60 * 10)
+@cache_page_tagged(tags=('testimonial',))
 def testimonials(request):
 	"""Public testimonials listing page with simple pagination; shows featured testimonials."""
 	qs = Testimonial.objects.filter(featured=True).order_by('order','-created_at','id')
@@ -94,6 +105,7 @@ def testimonials(request):
 	})
 
 
+@conditional_page()
 def about(request):
 	"""Simple About page.
 	Uses existing styles to present a bio, skills, and highlights.
@@ -101,12 +113,14 @@ def about(request):
 	return render(request, 'about.html')
 
 
+@conditional_page(Service.objects.filter(is_published=True), tags=('service',))
 def services(request):
 	"""Public services listing page."""
 	services = Service.objects.filter(is_published=True).order_by('order','title')
 	return render(request, 'services.html', {'services': services})
 
 
+@conditional_page(Service.objects.all(), tags=('service',), staff_sees_more=True)
 def service_detail(request, slug: str):
 	"""Public service detail page; shows unpublished only to staff/superuser."""
 	svc = get_object_or_404(Service, slug=slug)
@@ -119,44 +133,38 @@ def service_detail(request, slug: str):
 	return render(request, 'service.html', {'service': svc, 'related': related})
 
 
+def _cached_pdf_response(request, document):
+	"""Stream the cached file of `document` (see portfolio.pdfs), or 304 when the client
+	already holds it."""
+	f = pdfs.open_pdf(document, request)
+	etag = f'"{pdfs.pdf_version_of(Path(f.name))}"'
+	not_modified = get_conditional_response(request, etag=etag)
+	if not_modified is not None:
+		f.close()
+		return not_modified
+	response = FileResponse(f, as_attachment=True,
+		filename=pdfs.PDF_FILENAMES[document], content_type='application/pdf')
+	response['ETag'] = etag
+	response['Last-Modified'] = http_date(os.fstat(f.fileno()).st_mtime)
+	return response
+
+
 def about_pdf(request):
-	"""Render the About (resume) page as a downloadable PDF using WeasyPrint when possible.
+	"""Serve the About (resume) page as a downloadable PDF rendered with WeasyPrint.
+	The rendered file is cached on disk per content version and re-rendered in the
+	background after edits (see portfolio.pdfs); the version doubles as the ETag.
 	Fallbacks:
 	  1) If WeasyPrint not available or PDF gen fails → redirect to uploaded resume (if configured)
 	  2) Else redirect to static resume file (if present)
 	  3) Else redirect to portfolio PDF (ReportLab)
 	"""
-	# Attempt WeasyPrint generation
 	try:
-		import weasyprint  # type: ignore
-		html_str = render_to_string('about.html', request=request)
-		base_url = request.build_absolute_uri('/')
-		stylesheets = []
-		try:
-			from django.conf import settings as _settings
-			css_dir = _settings.BASE_DIR / 'portfolio' / 'static' / 'css'
-			style_files = []
-			# Prefer site styles then print overrides
-			for name in ('styles.css', 'print.css'):
-				path = css_dir / name
-				if path.exists():
-					style_files.append(weasyprint.CSS(filename=str(path)))
-			stylesheets = style_files
-		except Exception:
-			stylesheets = []
-
-		pdf_bytes = weasyprint.HTML(string=html_str, base_url=base_url).write_pdf(stylesheets=stylesheets or None)
-		response = HttpResponse(pdf_bytes, content_type='application/pdf')
-		# Force download for clarity
-		response['Content-Disposition'] = 'attachment; filename="Denis_Lokwo_Resume.pdf"'
-		return response
+		return _cached_pdf_response(request, 'about')
 	except Exception:
 		# Graceful fallbacks
 		try:
 			# Prefer uploaded resume file from SiteSettings if available
-			from django.apps import apps as _apps
-			SiteSettings = _apps.get_model('portfolio', 'SiteSettings')
-			obj = SiteSettings.objects.first()
+			obj = SiteSettings.get_solo(request)
 			if obj and getattr(obj, 'resume_file', None) and getattr(obj.resume_file, 'url', None):
 				return redirect(obj.resume_file.url)
 		except Exception:
@@ -188,14 +196,6 @@ def contact(request):
 			email = form.cleaned_data['email']
 			message_text = form.cleaned_data['message']
 
-			# save to DB
-			msg_obj = Message.objects.create(
-				name=name,
-				email=email,
-				message=message_text,
-				attachment=form.cleaned_data.get('attachment')
-			)
-
 			# Handle additional attachments (multiple files input named "attachments")
 			extra_attachments = []
 			try:
@@ -218,55 +218,54 @@ def contact(request):
 				except Exception:
 					continue
 
-			# Persist extra attachments to DB
-			for f in filtered_extras:
-				try:
-					MessageAttachment.objects.create(message=msg_obj, file=f)
-				except Exception:
-					pass
-
-			subject = f'Portfolio contact from {name}'
-			body = f'From: {name} <{email}>\n\n{message_text}'
-			recipient = getattr(settings, 'CONTACT_EMAIL', None) or getattr(settings, 'DEFAULT_FROM_EMAIL', None)
-			try:
-				# Always use EmailMessage so we can include multiple attachments
-				email_msg = EmailMessage(subject, body, None, [recipient])
-				# Primary single attachment from form
-				primary_att = form.cleaned_data.get('attachment')
-				if primary_att:
-					email_msg.attach(primary_att.name, primary_att.read(), getattr(primary_att, 'content_type', None))
-				# Additional attachments
+			# The message and its emails are saved together; send_outbox delivers the emails,
+			# so the request never waits on SMTP
+			with transaction.atomic():
+				# save to DB
+				msg_obj = Message.objects.create(
+					name=name,
+					email=email,
+					message=message_text,
+					attachment=form.cleaned_data.get('attachment')
+				)
+				stored = [msg_obj.attachment.name] if msg_obj.attachment else []
+
+				# Persist extra attachments to DB
 				for f in filtered_extras:
 					try:
-						email_msg.attach(f.name, f.read(), getattr(f, 'content_type', None))
+						with transaction.atomic():
+							stored.append(MessageAttachment.objects.create(message=msg_obj, file=f).file.name)
 					except Exception:
-						continue
-				email_msg.send(fail_silently=False)
+						pass
+
+				subject = f'Portfolio contact from {name}'
+				body = f'From: {name} <{email}>\n\n{message_text}'
+				recipient = getattr(settings, 'CONTACT_EMAIL', None) or getattr(settings, 'DEFAULT_FROM_EMAIL', None)
+				if recipient:
+					# Attachments are read from storage when the email is sent
+					queue_email(subject, body, [recipient], attachments=stored)
+				else:
+					# Nowhere to deliver it; the message is still in the admin
+					logger.warning('Contact message %s not emailed: set CONTACT_EMAIL or DEFAULT_FROM_EMAIL', msg_obj.pk)
+
 				# Send acknowledgment to user (no attachments)
+				brand = getattr(settings, 'SITE_NAME', 'Portfolio')
+				from_addr = getattr(settings, 'DEFAULT_FROM_EMAIL', None)
+				ack_subject = f"Thanks for reaching out — {brand}"
+				# Try rendering templates first
+				ctx = {'name': name, 'message': message_text, 'brand_name': brand}
 				try:
-					brand = getattr(settings, 'SITE_NAME', 'Portfolio')
-					from_addr = getattr(settings, 'DEFAULT_FROM_EMAIL', None)
-					ack_subject = f"Thanks for reaching out — {brand}"
-					# Try rendering templates first
-					ctx = {'name': name, 'message': message_text, 'brand_name': brand}
-					try:
-						text_body = render_to_string('emails/contact_ack.txt', ctx)
-						html_body = render_to_string('emails/contact_ack.html', ctx)
-					except Exception:
-						text_body = (
-							f"Hi {name},\n\n"
-							"Thanks for getting in touch. I received your message and will reply within 24–48 hours.\n\n"
-							"Your message:\n" + message_text + "\n\nBest regards,\n" + brand
-						)
-						html_body = None
-					send_mail(ack_subject, text_body, from_addr, [email], fail_silently=True, html_message=html_body)
+					text_body = render_to_string('emails/contact_ack.txt', ctx)
+					html_body = render_to_string('emails/contact_ack.html', ctx)
 				except Exception:
-					pass
-			except Exception:
-				# still show success but message remains in DB for inspection
-				messages.warning(request, 'Received — but email delivery failed. Message saved.')
-			else:
-				messages.success(request, 'Thanks — your message was sent. I will get back to you soon.')
+					text_body = (
+						f"Hi {name},\n\n"
+						"Thanks for getting in touch. I received your message and will reply within 24–48 hours.\n\n"
+						"Your message:\n" + message_text + "\n\nBest regards,\n" + brand
+					)
+					html_body = None
+				queue_email(ack_subject, text_body, [email], from_email=from_addr, html_body=html_body)
+			messages.success(request, 'Thanks — your message was sent. I will get back to you soon.')
 
 			request.session['last_contact'] = str(now)
 			# Redirect back to contact page (tests expect exact URL without query params)
@@ -276,6 +275,15 @@ def contact(request):
 	return render(request, 'contact.html', {'form': form})
 
 
+@never_cache
+@ensure_csrf_cookie
+def csrf_token(request):
+	"""Return a CSRF token (and set the cookie) for forms embedded in shared cached pages.
+	Cached HTML carries no token; main.js fills `data-csrf` forms from the cookie or this endpoint.
+	"""
+	return JsonResponse({'token': get_token(request)})
+
+
 def privacy(request):
 	return render(request, 'privacy.html')
 
@@ -311,8 +319,7 @@ def subscribe(request):
 				logo_url = None
 				primary_color = '#111'
 				try:
-					SiteSettings = apps.get_model('portfolio', 'SiteSettings')
-					ss = SiteSettings.objects.first()
+					ss = SiteSettings.get_solo(request)
 					if ss:
 						if getattr(ss, 'brand_name', None):
 							brand_name = ss.brand_name
@@ -381,8 +388,7 @@ def subscribe_confirm(request, token: str):
 		logo_url = None
 		primary_color = '#111'
 		try:
-			SiteSettings = apps.get_model('portfolio', 'SiteSettings')
-			ss = SiteSettings.objects.first()
+			ss = SiteSettings.get_solo(request)
 			if ss:
 				if getattr(ss, 'brand_name', None):
 					brand_name = ss.brand_name
@@ -490,7 +496,43 @@ def recommend(request):
 	return render(request, 'recommend.html', {'form': form})
 
 
-@cache_page(60 * 10)
+SEARCH_PER_PAGE = 10
+
+
+def search(request):
+	"""Site-wide search over projects, posts, services, testimonials and gallery items,
+	with per-type facet counts (see portfolio.search)."""
+	q = (request.GET.get('q') or '').strip()[:200]
+	labels = dict(SearchDocument.KIND_CHOICES)
+	kind = request.GET.get('type')
+	if kind not in labels:
+		kind = None
+	try:
+		page = max(1, int(request.GET.get('page') or 1))
+	except ValueError:
+		page = 1
+	results, counts, total = site_search(q, kind=kind, page=page, per_page=SEARCH_PER_PAGE) if q else ([], {}, 0)
+	facets = [{'kind': k, 'label': label, 'count': counts[k]} for k, label in SearchDocument.KIND_CHOICES if k in counts]
+	return render(request, 'search.html', {
+		'q': q,
+		'kind': kind,
+		'results': results,
+		'facets': facets,
+		'facet_total': sum(counts.values()),
+		'total': total,
+		'page': page,
+		'num_pages': max(1, -(-total // SEARCH_PER_PAGE)),
+	})
+
+
+def search_suggest(request):
+	"""JSON suggestions for search-as-you-type, answered from the in-process prefix index."""
+	q = (request.GET.get('q') or '').strip()[:100]
+	return JsonResponse({'q': q, 'suggestions': suggest(q) if q else []})
+
+
+@conditional_page(Project.objects.all(), Tag.objects.all(), tags=('project',))
+@cache_page_tagged(tags=('project',))
 def project_list(request):
 	projects = Project.objects.all().prefetch_related('tags')
 	tech = request.GET.get('tech')
@@ -561,14 +603,12 @@ def project_list(request):
 
 
 def portfolio_pdf(request):
-	"""Generate a simple portfolio PDF with a project listing.
+	"""Serve a simple portfolio PDF with a project listing, rendered with ReportLab and
+	cached like the About PDF.
 	If reportlab is not installed, return a helpful message.
 	"""
 	try:
-		from reportlab.lib.pagesizes import A4
-		from reportlab.pdfgen import canvas
-		from reportlab.lib.units import mm
-		from reportlab.lib.utils import simpleSplit
+		import reportlab  # noqa: F401
 	except Exception as exc:
 		# Fallback: return a minimal PDF-like payload so endpoint remains available for tests/environments without ReportLab
 		placeholder = b"%PDF-1.4\n" + (b"0" * 256) + b"\n%%EOF"
@@ -577,81 +617,10 @@ def portfolio_pdf(request):
 		return resp
 
 	try:
-		# Prepare response
-		response = HttpResponse(content_type='application/pdf')
-		response['Content-Disposition'] = 'attachment; filename="Denis_Lokwo_Portfolio.pdf"'
-		c = canvas.Canvas(response, pagesize=A4)
-		width, height = A4
-
-		# Margins
-		margin_x = 20 * mm
-		margin_y = 20 * mm
-		y = height - margin_y
-
-		# Title
-		c.setFont("Helvetica-Bold", 18)
-		c.drawString(margin_x, y, "Denis Lokwo — Portfolio")
-		y -= 12 * mm
-
-		# Intro
-		c.setFont("Helvetica", 11)
-		intro = (
-			"Selected projects and highlights. For live demos and full details, visit the website."
-		)
-		for line in simpleSplit(intro, "Helvetica", 11, width - 2 * margin_x):
-			c.drawString(margin_x, y, line)
-			y -= 6 * mm
-
-		y -= 4 * mm
-		c.setFont("Helvetica-Bold", 14)
-		c.drawString(margin_x, y, "Projects")
-		y -= 8 * mm
-
-		projects = Project.objects.order_by('-date')
-		c.setFont("Helvetica", 11)
-		for proj in projects:
-			# Ensure there is space, else new page
-			min_block = 18 * mm
-			if y < margin_y + min_block:
-				c.showPage()
-				y = height - margin_y
-				c.setFont("Helvetica", 11)
-
-			# Title line
-			title = f"{proj.title} — {proj.category or 'General'} ({proj.date:%b %Y})"
-			for line in simpleSplit(title, "Helvetica", 11, width - 2 * margin_x):
-				c.drawString(margin_x, y, line)
-				y -= 6 * mm
-
-			# Technologies
-			tech = ", ".join(proj.tech_list())
-			if tech:
-				for line in simpleSplit(f"Tech: {tech}", "Helvetica", 10, width - 2 * margin_x):
-					c.drawString(margin_x, y, line)
-					y -= 5 * mm
-
-			# Description (short)
-			desc = (proj.description or "").strip()
-			if desc:
-				lines = simpleSplit(desc, "Helvetica", 10, width - 2 * margin_x)
-				for line in lines[:5]:
-					c.drawString(margin_x, y, line)
-					y -= 5 * mm
-
-			y -= 3 * mm
-
-		# Footer note
-		if y < margin_y + 12 * mm:
-			c.showPage()
-			y = height - margin_y
-		c.setFont("Helvetica-Oblique", 9)
-		site_url = request.build_absolute_uri('/')
-		c.drawString(margin_x, margin_y, f"Generated from Denis Lokwo Portfolio — {site_url}")
-
-		c.showPage()
-		c.save()
-		return response
+		return _cached_pdf_response(request, 'portfolio')
 	except Exception:
+		from reportlab.lib.pagesizes import A4
+		from reportlab.pdfgen import canvas
 		# Graceful fallback: minimal one-page PDF so endpoint remains available even if a rendering error occurs
 		fallback = HttpResponse(content_type='application/pdf')
 		fallback['Content-Disposition'] = 'attachment; filename="Denis_Lokwo_Portfolio.pdf"'
@@ -664,12 +633,12 @@ def portfolio_pdf(request):
 		c.save()
 		return fallback
 
-
+@conditional_page(Project.objects.all(), Tag.objects.all(), tags=('project',))
 def project_detail(request, slug: str):
 	project = get_object_or_404(Project, slug=slug)
 	# gather related projects via shared tags (optional small touch)
 	related = Project.objects.exclude(pk=project.pk)
-	if hasattr(project, 'tags') and project.tags.exists():
+	if project.tag_names:
 		related = related.filter(tags__in=project.tags.all()).distinct()[:3]
 	else:
 		related = related.order_by('-date')[:3]
@@ -679,84 +648,76 @@ def project_detail(request, slug: str):
 	})
 
 
-@cache_page(60 * 15)
+GALLERY_PER_PAGE = 8
+
+
+def _gallery_card(kind, obj):
+	"""Template dict for one gallery entry."""
+	if kind == 'project':
+		image, url, alt, desc, source = obj.image, obj.get_absolute_url(), obj.title, obj.description, 'Project'
+	elif kind == 'blog':
+		image, url, alt, desc, source = obj.thumbnail, obj.get_absolute_url(), obj.title, obj.content, 'Blog'
+	else:
+		image, url, source = obj.image, obj.link_url() or '#', obj.source_label()
+		alt = obj.alt_text or obj.caption or obj.title
+		desc = obj.description or obj.caption
+	return {
+		'title': obj.title,
+		'url': url,
+		'img': getattr(image, 'url', ''),
+		'image': image,
+		# Stored on upload (portfolio.images); reading image.width would open the file
+		'width': getattr(obj, f'{image.field.name}_width'),
+		'height': getattr(obj, f'{image.field.name}_height'),
+		'color': getattr(obj, f'{image.field.name}_color'),
+		'alt': (alt or '').strip(),
+		'desc': (desc or '').strip(),
+		'source': source,
+	}
+
+
+def gallery_entries(src='all'):
+	"""(kind, pk, sort_at) rows for every gallery image, newest first, as one UNION ALL query.
+	Project dates are promoted to midnight so they sort alongside post/item timestamps."""
+	sources = {
+		'projects': Project.objects.exclude(image__isnull=True).exclude(image='')
+			.annotate(sort_at=Cast('date', models.DateTimeField()), kind=models.Value('project')),
+		'blog': Post.objects.filter(published=True).exclude(thumbnail__isnull=True).exclude(thumbnail='')
+			.annotate(sort_at=models.F('created_at'), kind=models.Value('blog')),
+		'custom': GalleryItem.objects.filter(is_published=True)
+			.annotate(sort_at=models.F('created_at'), kind=models.Value('custom')),
+	}
+	parts = [qs.order_by().values_list('kind', 'pk', 'sort_at') for name, qs in sources.items() if src in ('all', name)]
+	entries = parts[0].union(*parts[1:], all=True) if len(parts) > 1 else parts[0]
+	return entries.order_by('-sort_at', 'kind', '-pk')
+
+
+@cache_page_tagged(tags=('project', 'post', 'gallery'))
 def gallery(request):
-	"""Unified gallery showing project images, blog thumbnails, and admin-managed GalleryItems with a simple source filter."""
+	"""Unified gallery showing project images, blog thumbnails, and admin-managed GalleryItems with a simple source filter.
+	Sorting and pagination happen in the database; only the current page is loaded."""
 	src = request.GET.get('src', 'all')  # all | projects | blog | custom
-	items = []
-	# Projects
-	if src in ('all', 'projects'):
-		proj_qs = Project.objects.exclude(image__isnull=True).exclude(image='').order_by('-date')
-		for p in proj_qs:
-			items.append({
-				'title': p.title,
-				'url': p.get_absolute_url(),
-				'img': getattr(p.image, 'url', ''),
-				'width': getattr(p.image, 'width', None),
-				'height': getattr(p.image, 'height', None),
-				'alt': p.title,
-				'desc': (p.description or '').strip(),
-				'source': 'Project',
-				'date': getattr(p, 'date', None),
-			})
-	# Blog posts
-	if src in ('all', 'blog'):
-		post_qs = Post.objects.filter(published=True).exclude(thumbnail__isnull=True).exclude(thumbnail='').order_by('-created_at')
-		for b in post_qs:
-			items.append({
-				'title': b.title,
-				'url': b.get_absolute_url(),
-				'img': getattr(b.thumbnail, 'url', ''),
-				'width': getattr(b.thumbnail, 'width', None),
-				'height': getattr(b.thumbnail, 'height', None),
-				'alt': b.title,
-				'desc': (b.content or '').strip(),
-				'source': 'Blog',
-				'date': getattr(b, 'created_at', None),
-			})
-	# Admin-managed custom Gallery items
-	if src in ('all', 'custom'):
-		gqs = GalleryItem.objects.filter(is_published=True).select_related('project','post').order_by('order', '-created_at')
-		for g in gqs:
-			items.append({
-				'title': g.title,
-				'url': g.link_url() or '#',
-				'img': getattr(g.image, 'url', ''),
-				'width': getattr(g.image, 'width', None),
-				'height': getattr(g.image, 'height', None),
-				'alt': (g.alt_text or g.caption or g.title or '').strip(),
-				'desc': (g.description or g.caption or '').strip(),
-				'source': g.source_label(),
-				'date': getattr(g, 'created_at', None),
-			})
-	# Sort by date desc where available, normalizing to aware datetimes to avoid
-	# TypeError when mixing datetime.date and datetime.datetime values.
-	def _sort_key(x):
-		d = x.get('date')
-		if d is None:
-			# Items without dates sort last when reverse=True; use numeric sentinel to avoid cross-type comparison
-			return (0, 0)
-		if isinstance(d, datetime):
-			# Ensure aware
-			if timezone.is_naive(d):
-				d = timezone.make_aware(d, timezone.get_current_timezone())
-			return (1, d)
-		if isinstance(d, date):
-			# Promote date to start-of-day aware datetime
-			dt = datetime.combine(d, dtime.min)
-			dt = timezone.make_aware(dt, timezone.get_current_timezone())
-			return (1, dt)
-		# Fallback: treat as no-date
-		return (0, 0)
-
-	items.sort(key=_sort_key, reverse=True)
-
-	# Paginate
-	paginator = Paginator(items, 8)
-	page_number = request.GET.get('page')
-	page_obj = paginator.get_page(page_number)
+	if src not in ('all', 'projects', 'blog', 'custom'):
+		src = 'all'
+	paginator = Paginator(gallery_entries(src), GALLERY_PER_PAGE)
+	page_obj = paginator.get_page(request.GET.get('page'))
+	# Load the page's objects with one query per source
+	rows = list(page_obj.object_list)
+	wanted = {}
+	for kind, pk, _ in rows:
+		wanted.setdefault(kind, []).append(pk)
+	loaded = {}
+	for kind, pks in wanted.items():
+		if kind == 'project':
+			qs = Project.objects.filter(pk__in=pks)
+		elif kind == 'blog':
+			qs = Post.objects.filter(pk__in=pks)
+		else:
+			qs = GalleryItem.objects.filter(pk__in=pks).select_related('project', 'post')
+		loaded.update({(kind, obj.pk): obj for obj in qs})
+	items = [_gallery_card(kind, loaded[(kind, pk)]) for kind, pk, _ in rows if (kind, pk) in loaded]
 	return render(request, 'gallery.html', {
-		'items': page_obj.object_list,
+		'items': items,
 		'page_obj': page_obj,
 		'paginator': paginator,
 		'src': src,
@@ -783,21 +744,14 @@ def html_sitemap(request):
 
 	# Blog categories/tags (slugs + labels)
 	cat_map = {}
-	for p in Post.objects.filter(published=True).exclude(category__isnull=True).exclude(category=''):
-		s = slugify(p.category)
-		if s and s not in cat_map:
-			cat_map[s] = p.category
+	for s, label in Post.objects.filter(published=True).exclude(category_slug='').values_list('category_slug', 'category'):
+		cat_map.setdefault(s, label)
 	categories = [{'slug': s, 'label': lbl, 'url': reverse('blog:post_list_by_category', kwargs={'category': s})}
 				  for s, lbl in sorted(cat_map.items(), key=lambda x: x[1].lower())]
 
-	tag_map = {}
-	for p in Post.objects.filter(published=True):
-		for t in (getattr(p, 'tag_list', []) or []):
-			s = slugify(t)
-			if s and s not in tag_map:
-				tag_map[s] = t
+	tag_rows = BlogTag.objects.filter(posts__published=True).distinct().order_by(Lower('name')).values_list('slug', 'name')
 	tags = [{'slug': s, 'label': lbl, 'url': reverse('blog:post_list_by_tag', kwargs={'tag': s})}
-			for s, lbl in sorted(tag_map.items(), key=lambda x: x[1].lower())]
+			for s, lbl in tag_rows]
 
 	# Recent projects
 	projects = Project.objects.order_by('-date')[:30]